@@ -1,21 +1,32 @@
 import api from "./axiosClient";
 
+// Frames go up as JPEG files (no base64: a third smaller); the server
+// downscales them before recognition.
+const FRAME_QUALITY = 0.85;
+
+const captureFrame = (webcamRef) =>
+  new Promise((resolve) => {
+    const canvas = webcamRef.current?.getCanvas();
+    if (!canvas) return resolve(null);
+    canvas.toBlob(resolve, "image/jpeg", FRAME_QUALITY);
+  });
+
 export const captureAndSend = async (
   webcamRef,
   selectedSubject,
   setDetections
 ) => {
-  console.log("captureAndSend triggered");
-  const image = webcamRef.current?.getScreenshot();
-  if (!image || !selectedSubject) return;
+  if (!selectedSubject) return;
+  const frame = await captureFrame(webcamRef);
+  if (!frame) return;
+
+  const form = new FormData();
+  form.append("image", frame, "frame.jpg");
+  form.append("subject_id", selectedSubject);
 
   try {
-    const res = await api.post("/api/attendance/mark", {
-      image,
-      subject_id: selectedSubject,
-    });
+    const res = await api.post("/api/attendance/mark", form);
 
-    console.log("Attendance response:", res.data);
     setDetections(res.data.faces);
   } catch (err) {
     console.error(
@@ -24,3 +35,13 @@ export const captureAndSend = async (
     );
   }
 };
+
+/**
+ * Upload sessions reviewed while offline in one request.
+ * Each session: { idempotency_key, subject_id, date, period?, present_students, absent_students }.
+ * Keep the same idempotency_key when retrying: already recorded sessions come back as "already_applied".
+ */
+export const confirmAttendanceBulk = async (sessions) => {
+  const res = await api.post("/api/attendance/confirm/bulk", { sessions });
+  return res.data;
+};
@@ -11,7 +11,10 @@ export const fetchMyStudentProfile = async () => {
   return res.data;
 }
 
-export const uploadFaceImage = async (file) => {
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Enrollment runs as a background job: submit, then poll until it finishes
+export const uploadFaceImage = async (file, { intervalMs = 1000, timeoutMs = 120000 } = {}) => {
   const formData = new FormData();
   formData.append("file", file);
 
@@ -21,7 +24,20 @@ export const uploadFaceImage = async (file) => {
     {headers: {"Content-Type": "multipart/form-data"}}
   );
 
-  return res.data;
+  let job = res.data;
+  const deadline = Date.now() + timeoutMs;
+  while (job.status === "queued" || job.status === "processing") {
+    if (Date.now() > deadline) {
+      throw new Error("Face enrollment is taking longer than expected. Please check back later.");
+    }
+    await sleep(intervalMs);
+    job = (await api.get(`/students/me/face-image/jobs/${job.job_id}`)).data;
+  }
+
+  if (job.status === "failed") {
+    throw new Error(job.error || "Face enrollment failed");
+  }
+  return job;
 }
 
 export const fetchAvailableSubjects = async () => {
@@ -29,6 +45,14 @@ export const fetchAvailableSubjects = async () => {
   return res.data;
 };
 
+// One page of the subject catalogue, optionally filtered by code/name prefix
+export const fetchSubjectCatalogue = async ({ q, cursor, limit = 20 } = {}) => {
+  const res = await api.get("/subjects/catalogue", {
+    params: { q: q || undefined, cursor, limit },
+  });
+  return res.data;
+};
+
 export const addSubjectToStudent = async (subjectid) => {
   const res = await api.post("/students/me/subjects", null, {
     params: {subject_id: subjectid}
@@ -5,8 +5,39 @@ export const fetchMySubjects = async () => {
     return res.data;
 };
 
+// Lean roster (no face embeddings), fetched page by page
+export const fetchSubjectRosterPage = async (subjectId, { cursor, limit = 200, q, fields } = {}) => {
+    const res = await api.get(`/settings/subjects/${subjectId}/roster`, {
+        params: { cursor, limit, q, fields },
+    });
+    return res.data;
+};
+
 export const fetchSubjectStudents = async (subjectId) => {
-    const res = await api.get(`/settings/teachers/subjects/${subjectId}/students`);
+    const students = [];
+    let cursor;
+    do {
+        const page = await fetchSubjectRosterPage(subjectId, { cursor });
+        students.push(...page.students);
+        cursor = page.next_cursor;
+    } while (cursor);
+    return students;
+};
+
+// Server-side attendance figures for a subject (no embeddings in the payload)
+export const fetchSubjectAnalytics = async (subjectId, { start, end } = {}) => {
+    const res = await api.get(`/analytics/subjects/${subjectId}`, {
+        params: { start, end },
+    });
+    return res.data;
+};
+
+// Streams from the server; resolves once the whole file is downloaded
+export const exportAttendance = async ({ subjectId, start, end, format = "csv" } = {}) => {
+    const res = await api.get("/reports/export", {
+        params: { subject_id: subjectId, start, end, format },
+        responseType: "blob",
+    });
     return res.data;
 };
 
@@ -0,0 +1,13 @@
+import { useEffect, useState } from "react";
+
+// `value`, updated only once it has stopped changing for `delay` ms
+export function useDebouncedValue(value, delay = 300) {
+  const [debounced, setDebounced] = useState(value);
+
+  useEffect(() => {
+    const timer = setTimeout(() => setDebounced(value), delay);
+    return () => clearTimeout(timer);
+  }, [value, delay]);
+
+  return debounced;
+}
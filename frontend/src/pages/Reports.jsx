@@ -8,7 +8,7 @@ import {
   Search,
   Filter
 } from "lucide-react";
-import { fetchMySubjects, fetchSubjectStudents } from "../api/teacher";
+import { fetchMySubjects, fetchSubjectAnalytics, exportAttendance } from "../api/teacher";
 import DateRange from '../components/DateRange.jsx';
 import 'react-datepicker/dist/react-datepicker.css';
 
@@ -28,12 +28,18 @@ export default function Reports() {
 
   useEffect(() => {
     if(!selectedSubject) return;
-    fetchSubjectStudents(selectedSubject).then(setStudents);
+    fetchSubjectAnalytics(selectedSubject).then((data) => setStudents(data.students));
   }, [selectedSubject])
 
-  const verifiedStudents = students.filter(
-    (s) => s.verified === true
-  );
+  const handleExport = async (format) => {
+    const blob = await exportAttendance({ subjectId: selectedSubject || undefined, format });
+    const url = URL.createObjectURL(blob);
+    const link = document.createElement("a");
+    link.href = url;
+    link.download = `attendance.${format}`;
+    link.click();
+    URL.revokeObjectURL(url);
+  };
 
   const getStatusColor = (color) => {
     switch (color) {
@@ -44,12 +50,9 @@ export default function Reports() {
     }
   };
 
-  const enhancedStudents = verifiedStudents.map(s => {
-    const present = s.attendance?.present || 0;
-    const absent = s.attendance?.absent || 0;
-
-    const total = present + absent;
-    const percentage = total === 0 ? 0 : Math.round((present / total) * 100);
+  // Totals and percentages come from the analytics endpoint
+  const enhancedStudents = students.map(s => {
+    const percentage = Math.round(s.percentage);
 
     const status = percentage >= threshold ? "OK" : "At Risk";
     const color = percentage >= threshold 
@@ -60,7 +63,6 @@ export default function Reports() {
 
     return {
       ...s,
-      total,
       percentage,
       status,
       color
@@ -78,7 +80,7 @@ export default function Reports() {
           <p className="text-[var(--text-body)]">Generate and export attendance reports for your classes</p>
         </div>
         <div className="flex items-center gap-3">
-          <button className="px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700 font-medium flex items-center gap-2 shadow-sm transition cursor-pointer">
+          <button onClick={() => handleExport("csv")} className="px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700 font-medium flex items-center gap-2 shadow-sm transition cursor-pointer">
             <FileText size={18} />
             Export CSV
           </button>
@@ -183,15 +185,15 @@ export default function Reports() {
             </thead>
             <tbody className="divide-y divide-gray-50">
               {enhancedStudents.map((row) => (
-                <tr key={row.id} className="hover:bg-gray-50 transition-colors">
+                <tr key={row.student_id} className="hover:bg-gray-50 transition-colors">
                   <td className="px-6 py-4">
                     <div>
                       <div className="font-semibold text-[var(--text-main)]">{row.name}</div>
-                      <div className="text-xs text-gray-400">ID: {row.roll} • {row.branch.toUpperCase()}</div>
+                      <div className="text-xs text-gray-400">ID: {row.roll} • {row.branch?.toUpperCase()}</div>
                     </div>
                   </td>
-                  <td className="px-6 py-4 text-sm text-[var(--text-body)]">{row.attendance.present + row.attendance.absent}</td>
-                  <td className="px-6 py-4 text-sm text-[var(--text-body)]">{row.attendance.present}</td>
+                  <td className="px-6 py-4 text-sm text-[var(--text-body)]">{row.total}</td>
+                  <td className="px-6 py-4 text-sm text-[var(--text-body)]">{row.present}</td>
                   <td className="px-6 py-4 text-sm font-bold text-[var(--text-main)]">{row.percentage}%</td>
                   <td className="px-6 py-4">
                     <span className={`px-3 py-1 rounded-full text-xs font-bold ${getStatusColor(row.color)}`}>
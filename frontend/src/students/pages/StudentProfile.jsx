@@ -1,7 +1,7 @@
 import React, { useState } from "react";
-import { useQuery, useMutation, useQueryClient  } from "@tanstack/react-query";
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient  } from "@tanstack/react-query";
 import { fetchMyStudentProfile } from "../../api/auth.js";
-import {fetchAvailableSubjects, addSubjectToStudent, removeSubjectFromStudent } from "../../api/students.js"
+import {fetchSubjectCatalogue, addSubjectToStudent, removeSubjectFromStudent } from "../../api/students.js"
 
 import { 
   ArrowLeft, 
@@ -22,10 +22,12 @@ import StudentNavigation from "../components/StudentNavigation"
 import { Link } from "react-router-dom";
 import { uploadFaceImage } from "../../api/students"
 import { useRef } from "react";
+import { useDebouncedValue } from "../../hooks/useDebouncedValue";
 
 export default function StudentProfile() {
   const [open, setOpen] = useState(false);
   const [selectedSub, setSelectedSub] = useState(null);
+  const [subjectSearch, setSubjectSearch] = useState("");
 
   const {data, isLoading, isError, error} = useQuery({
     queryKey: ["myStudentProfile"],
@@ -33,11 +35,22 @@ export default function StudentProfile() {
     retry: false,
   });
 
-  const {data: availableSubjects} = useQuery({
-    queryKey: ["availableSubjects"],
-    queryFn: fetchAvailableSubjects,
+  // Query once typing pauses, not on every keystroke
+  const debouncedSearch = useDebouncedValue(subjectSearch.trim(), 300);
+
+  const {
+    data: catalogue,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
+    queryKey: ["subjectCatalogue", debouncedSearch],
+    queryFn: ({ pageParam }) => fetchSubjectCatalogue({ q: debouncedSearch, cursor: pageParam }),
+    initialPageParam: undefined,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
     enabled: open,
   })
+  const availableSubjects = catalogue?.pages.flatMap((page) => page.subjects);
 
   const fileRef = useRef(null);
   const queryClient = useQueryClient();
@@ -199,6 +212,12 @@ export default function StudentProfile() {
               )}
 
             </div>
+            {uploadMutation.isPending && (
+              <p className="text-xs text-slate-500">Processing your photo...</p>
+            )}
+            {uploadMutation.isError && (
+              <p className="text-xs text-red-600">{uploadMutation.error?.message}</p>
+            )}
             <div className="bg-gray-50 text-slate-500 text-[10px] px-3 py-2 rounded-lg inline-block font-medium border border-gray-100">
               Tips: Use good lighting, look straight at the camera, avoid masks, caps, or filters.
             </div>
@@ -248,16 +267,34 @@ export default function StudentProfile() {
               <div className="bg-white rounded-xl p-6 w-80 space-y-4">
                 <h3 className="font-bold text-lg">Add Subject</h3>
 
+                <input
+                  type="text"
+                  value={subjectSearch}
+                  onChange={(e) => setSubjectSearch(e.target.value)}
+                  placeholder="Search by code or name"
+                  className="w-full px-3 py-2 border rounded-lg text-sm"
+                />
+
                 {availableSubjects?.map(sub => (
                   <button
                     key={sub._id}
                     onClick={() => addSubjectMutation.mutate(sub._id)}
                     className="w-full text-left px-4 py-2 border rounded-lg hover:bg-gray-50"
                   >
-                    {sub.name}
+                    {sub.name} ({sub.code})
                   </button>
                 ))}
 
+                {hasNextPage && (
+                  <button
+                    onClick={() => fetchNextPage()}
+                    disabled={isFetchingNextPage}
+                    className="w-full text-sm text-blue-600 disabled:text-gray-400"
+                  >
+                    {isFetchingNextPage ? "Loading..." : "Load more"}
+                  </button>
+                )}
+
                 <button
                   onClick={() => setOpen(false)}
                   className="text-sm text-gray-500"
@@ -1,16 +1,28 @@
 # backend/app/api/deps.py
 
-from fastapi import Depends, HTTPException, status
+import secrets
+
+from fastapi import Depends, HTTPException, Header, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from bson import ObjectId
 
+from app.core.config import ADMIN_TOKEN
 from app.db.mongo import db
-from app.utils.jwt_token import decode_jwt
+from app.db.loaders import Loaders
+from app.services.principal_cache import principal_cache
+from app.utils.jwt_token import decode_jwt, token_id
 
 security = HTTPBearer(auto_error=False)
 
+
+async def get_loaders() -> Loaders:
+    """Fresh batching loaders per request (shared by all dependencies of that request)"""
+    return Loaders()
+
+
 async def get_current_teacher(
     credentials: HTTPAuthorizationCredentials = Depends(security),
+    loaders: Loaders = Depends(get_loaders),
 ):
     if credentials is None:
         raise HTTPException(status_code=401, detail="Authorization header missing")
@@ -37,9 +49,15 @@ async def get_current_teacher(
             detail="Invalid token payload",
         )
 
+    # Verified above on every request; only the lookups below are cached
+    tid = token_id(token, payload)
+    principal = principal_cache.get(tid)
+    if principal is not None:
+        return principal
+
     oid = ObjectId(user_id)
 
-    user = await db.users.find_one({"_id": oid})
+    user = await loaders.users().load(oid)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -53,9 +71,19 @@ async def get_current_teacher(
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher profile not found")
 
-
-    return {
+    principal = {
         "id": oid,
         "user": user,
         "teacher": teacher,
     }
+    principal_cache.set(tid, principal)
+    return principal
+
+
+async def require_admin(x_admin_token: str = Header(None)):
+    # Admin surface is off entirely unless ADMIN_TOKEN is configured
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_admin
+from app.core.profiling import profiler
+from app.core.security import password_hasher
+from app.schemas.admin import ProfilingConfig
+from app.services import roster_cache
+from app.services.analytics import analytics_cache
+from app.services.enrollment_jobs import QUEUED, enrollment_workers, jobs_col
+from app.services.email_outbox import PENDING, SENDING, email_outbox, outbox_col
+from app.services.login_throttle import throttle_stats
+from app.services.ml_client import ml_client
+from app.services.principal_cache import principal_cache
+from app.utils.http_cache import http_stats
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+# ---------------- PROFILING ----------------
+@router.get("/profiling")
+async def get_profiling():
+    return profiler.status()
+
+
+@router.put("/profiling")
+async def configure_profiling(payload: ProfilingConfig):
+    """
+    payload: {"enabled": bool, "sample_rate": 0..1, "interval_ms": float} (all optional)
+    """
+    profiler.configure(
+        enabled=payload.enabled,
+        sample_rate=payload.sample_rate,
+        interval_ms=payload.interval_ms,
+    )
+    return profiler.status()
+
+
+@router.get("/profiling/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """Collapsed stacks, ready for flamegraph.pl / speedscope"""
+    collapsed = profiler.collapsed(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return collapsed
+
+
+# ---------------- CACHES ----------------
+@router.get("/caches")
+async def get_cache_stats():
+    """Size and hit-rate counters of the in-process caches"""
+    return {
+        "roster": roster_cache.stats(),
+        "analytics": [analytics_cache.stats()],
+        "http": http_stats.stats(),
+        "auth": principal_cache.stats(),
+    }
+
+
+# ---------------- AUTH ----------------
+@router.get("/auth")
+async def get_auth_stats():
+    """Password hashing pool and login throttling counters"""
+    return {
+        "password_hashing": password_hasher.stats(),
+        "login_throttle": throttle_stats.stats(),
+    }
+
+
+# ---------------- EMAIL ----------------
+@router.get("/email")
+async def get_email_outbox_stats():
+    """Outbox worker counters and current queue depth"""
+    return {
+        **email_outbox.stats(),
+        "queued": await outbox_col.count_documents({"status": {"$in": [PENDING, SENDING]}}),
+    }
+
+
+# ---------------- ENROLLMENT ----------------
+@router.get("/enrollment")
+async def get_enrollment_stats():
+    """Enrollment worker counters and current backlog"""
+    return {
+        **enrollment_workers.stats(),
+        "queued": await jobs_col.count_documents({"status": QUEUED}),
+    }
+
+
+# ---------------- ML CLIENT ----------------
+@router.get("/ml")
+async def get_ml_client_stats():
+    """Per-endpoint circuit breaker state, retries, hedges and latency"""
+    return ml_client.stats()
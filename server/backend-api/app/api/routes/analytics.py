@@ -0,0 +1,76 @@
+from datetime import date
+from typing import Optional
+
+from bson import ObjectId, errors as bson_errors
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.deps import get_current_teacher, get_loaders
+from app.db.loaders import Loaders
+from app.services.analytics import subject_analytics
+from app.services.roster_cache import get_subject
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def _parse_day(value: Optional[str], field_name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{field_name} must be YYYY-MM-DD")
+
+
+@router.get("/subjects/{subject_id}")
+async def get_subject_analytics(
+    subject_id: str,
+    start: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    current_user: dict = Depends(get_current_teacher),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """
+    Daily and weekly attendance rates, per-student distribution and at-risk
+    counts for a subject, against the teacher's thresholds.
+    """
+    try:
+        subject_oid = ObjectId(subject_id)
+    except bson_errors.InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid subject_id")
+
+    start, end = _parse_day(start, "start"), _parse_day(end, "end")
+
+    subject = await get_subject(subject_oid)
+    if not subject or current_user["id"] not in subject.get("professor_ids", []):
+        raise HTTPException(status_code=404, detail="Subject not found or access denied")
+
+    thresholds = (current_user.get("teacher") or {}).get("thresholds") or {}
+    analytics = await subject_analytics(
+        subject_oid,
+        start,
+        end,
+        warning=thresholds.get("warningVal", 75),
+        safe=thresholds.get("safeVal", 85),
+        verified=[s["student_id"] for s in subject.get("students", []) if s.get("verified", False)],
+    )
+
+    users = await loaders.users("name", "roll", "branch").load_many(
+        row["student_id"] for row in analytics["students"]
+    )
+
+    students = []
+    for row in analytics["students"]:
+        user = users.get(row["student_id"], {})
+        students.append({
+            **row,
+            "student_id": str(row["student_id"]),
+            "name": user.get("name"),
+            "roll": user.get("roll"),
+            "branch": user.get("branch"),
+        })
+
+    return {
+        "subject": {"id": subject_id, "name": subject.get("name"), "code": subject.get("code")},
+        **analytics,
+        "students": students,
+    }
@@ -1,45 +1,156 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+from fastapi import APIRouter, HTTPException, Depends, Request
+from starlette.datastructures import UploadFile
+from typing import Dict, List, Tuple
+import asyncio
 import base64
+import logging
+from datetime import date, timedelta
 from bson import ObjectId
-from datetime import date
+from bson.errors import InvalidId
 
+from app.api.deps import get_current_teacher, get_loaders
+from app.core.config import (
+    FRAME_MAX_UPLOAD_BYTES,
+    ML_BREAKER_RESET_SECONDS,
+    ML_CONFIDENT_THRESHOLD,
+    ML_UNCERTAIN_THRESHOLD,
+)
+from app.core.security import get_current_user
 from app.db.mongo import db
-from app.services.ml_client import ml_client
+from app.db.loaders import Loaders
+from app.services.ml_client import MLServiceUnavailable, ml_client
+from app.services.vote_tally import TallyLimitReached, tallies
+from app.services.live_sessions import live_sessions, load_roster, process_frame
+from app.services.roster_cache import get_subject, get_students, embedding_lists
+from app.schemas.attendance import BulkConfirmRequest
+from app.services.attendance_events import bind_sync_keys, record_session, record_sessions, session_fingerprint
+from app.utils.frames import FrameError, normalize_frame, scale_box
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/attendance", tags=["Attendance"])
 
 # distance thresholds
-CONFIDENT_TH = 0.50
-UNCERTAIN_TH = 0.60
+CONFIDENT_TH = ML_CONFIDENT_THRESHOLD
+UNCERTAIN_TH = ML_UNCERTAIN_THRESHOLD
+
+
+def ml_unavailable(e: MLServiceUnavailable) -> HTTPException:
+    """The ML client's circuit is open: tell the client when to come back"""
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(int(ML_BREAKER_RESET_SECONDS))},
+    )
+
+
+def _payload_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Image too large. Max {FRAME_MAX_UPLOAD_BYTES // (1024 * 1024)}MB")
+
+
+def _decode_data_url(image: str) -> bytes:
+    # Strip base64 header
+    if "," in image:
+        _, image = image.split(",", 1)
+    try:
+        return base64.b64decode(image)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid base64 image")
+
+
+async def _read_frame(request: Request) -> Tuple[bytes, dict]:
+    """
+    Frame bytes and the other fields of a frame upload, sent as either:
+    - multipart/form-data: an `image` file part, other fields as form fields;
+    - a raw image body (image/jpeg, ...), other fields in the query string;
+    - JSON with the image as a base64 data URL (older clients).
+    """
+    length = request.headers.get("content-length", "")
+    # base64 in JSON is 4/3 of the image
+    if length.isdigit() and int(length) > FRAME_MAX_UPLOAD_BYTES * 4 // 3 + 64 * 1024:
+        raise _payload_too_large()
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "multipart/form-data":
+        form = await request.form()
+        fields = {k: v for k, v in form.items() if isinstance(v, str)}
+        image = form.get("image")
+        if isinstance(image, UploadFile):
+            data = await image.read()
+        else:
+            data = _decode_data_url(image) if image else b""
+    elif content_type.startswith("image/") or content_type == "application/octet-stream":
+        fields = dict(request.query_params)
+        data = await request.body()
+    else:
+        try:
+            fields = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(fields, dict):
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        data = _decode_data_url(fields["image"]) if fields.get("image") else b""
+
+    if len(data) > FRAME_MAX_UPLOAD_BYTES:
+        raise _payload_too_large()
+    return data, fields
+
+
+async def _compact_frame(image_bytes: bytes):
+    try:
+        return await normalize_frame(image_bytes)
+    except FrameError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/mark")
-async def mark_attendance(payload: Dict):
+async def mark_attendance(
+    request: Request,
+    current: dict = Depends(get_current_teacher),
+    loaders: Loaders = Depends(get_loaders),
+):
     """
     Mark attendance by detecting faces in classroom image
-    
-    payload:
+
+    Preferred: multipart/form-data with an `image` file (JPEG) and
+    `subject_id` / `session_id` fields, or the raw JPEG as the body with
+    ?subject_id=...&session_id=... . Still accepted, JSON:
     {
       "image": "data:image/jpeg;base64,...",
-      "subject_id": "..."
+      "subject_id": "...",
+      "session_id": "..."   # optional, enables server-side vote aggregation
     }
+
+    The frame is downscaled and re-encoded before it goes to the ML
+    service; face boxes are returned in the coordinates of the frame sent.
     """
 
-    image_b64 = payload.get("image")
+    image_bytes, payload = await _read_frame(request)
     subject_id = payload.get("subject_id")
+    session_id = payload.get("session_id")
     
-    if not image_b64 or not subject_id:
+    if not image_bytes or not subject_id:
         raise HTTPException(status_code=400, detail="image and subject_id required")
-    
-    # Load subject
-    subject = await db.subjects.find_one(
-        {"_id": ObjectId(subject_id)},
-        {"students": 1}
-    )
-    
-    if not subject:
-        raise HTTPException(404, "Subject not found")
+
+    # Load subject; only its teachers may mark attendance (and open tallies)
+    try:
+        subject = await get_subject(ObjectId(subject_id))
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid subject_id")
+
+    if not subject or current["id"] not in subject.get("professor_ids", []):
+        raise HTTPException(status_code=404, detail="Subject not found or access denied")
+
+    tally = None
+    if session_id:
+        try:
+            tally = tallies.get_or_create(session_id, subject_id, str(current["id"]))
+        except TallyLimitReached:
+            raise HTTPException(status_code=503, detail="Too many live sessions, try again later")
+        if tally.teacher_id != str(current["id"]):
+            raise HTTPException(status_code=404, detail="Session not found or expired")
+        if tally.subject_id != subject_id:
+            raise HTTPException(status_code=409, detail="Session belongs to another subject")
     
     student_user_ids = [
         s["student_id"]
@@ -47,19 +158,27 @@ async def mark_attendance(payload: Dict):
         if s.get("verified", False)
     ]
 
-    # Strip base64 header
-    if "," in image_b64:
-        _, image_b64 = image_b64.split(",", 1)
+    if tally is not None:
+        tally.ensure_roster(
+            {"id": str(s["student_id"]), "name": s.get("name")}
+            for s in subject["students"]
+            if s.get("verified", False)
+        )
+
+    # Start loading the roster's embeddings now so it overlaps with
+    # downscaling and detection
+    students_task = asyncio.create_task(get_students(student_user_ids))
 
     try:
-        image_bytes = base64.b64decode(image_b64)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid base64 image")
+        frame = await _compact_frame(image_bytes)
+    except HTTPException:
+        students_task.cancel()
+        raise
 
     # Call ML service to detect faces
     try:
         ml_response = await ml_client.detect_faces(
-            image_base64=image_b64,
+            image_base64=frame.base64,
             min_face_area_ratio=0.04,
             num_jitters=3,
             model="hog"
@@ -73,30 +192,34 @@ async def mark_attendance(payload: Dict):
         
         detected_faces = ml_response.get("faces", [])
         
+    except MLServiceUnavailable as e:
+        students_task.cancel()
+        raise ml_unavailable(e)
     except Exception as e:
+        students_task.cancel()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to detect faces: {str(e)}"
         )
 
     if not detected_faces:
+        students_task.cancel()
+        if tally is not None:
+            tally.add_frame([])
+            return {"faces": [], "count": 0, "session": {"id": session_id, "version": tally.version}}
         return {"faces": [], "count": 0}
 
-    # Load students of this subject with embeddings
-    students_cursor = db.students.find({
-        "userId": {"$in": student_user_ids},
-        "verified": True,
-        "face_embeddings": {"$exists": True, "$ne": []}
-    })
-
-    students = await students_cursor.to_list(length=500)
+    students = [
+        s for s in (await students_task).values()
+        if s["verified"] and s["face_embeddings"]
+    ]
     
     # Prepare candidate embeddings for batch matching
     candidate_embeddings = []
     for student in students:
         candidate_embeddings.append({
             "student_id": str(student["userId"]),
-            "embeddings": student["face_embeddings"]
+            "embeddings": embedding_lists(student)
         })
 
     # Call ML service to match faces
@@ -116,6 +239,8 @@ async def mark_attendance(payload: Dict):
         
         matches = match_response.get("matches", [])
         
+    except MLServiceUnavailable as e:
+        raise ml_unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -125,7 +250,14 @@ async def mark_attendance(payload: Dict):
     # Build results
     results = []
     
-    print(f"Faces detected: {len(detected_faces)}")
+    students_by_id = {str(s["userId"]): s for s in students}
+
+    # Rolls of every matched student in one query
+    users = await loaders.users("roll").load_many(
+        students_by_id[m["student_id"]]["userId"]
+        for m in matches
+        if m.get("student_id") in students_by_id
+    )
 
     for i, (face, match) in enumerate(zip(detected_faces, matches)):
         student_id = match.get("student_id")
@@ -133,9 +265,7 @@ async def mark_attendance(payload: Dict):
         status = match.get("status")  # "present" or "unknown"
         
         # Find student details
-        best_match = None
-        if student_id:
-            best_match = next((s for s in students if str(s["userId"]) == student_id), None)
+        best_match = students_by_id.get(student_id) if student_id else None
         
         # Determine status based on distance
         if distance < CONFIDENT_TH:
@@ -146,30 +276,17 @@ async def mark_attendance(payload: Dict):
             status = "unknown"
             best_match = None
         
-        print(
-            "MATCH:",
-            best_match["name"] if best_match else "NONE",
-            "distance:",
-            distance
+        logger.debug(
+            "face match",
+            extra={"student_id": student_id if best_match else None, "distance": distance, "status": status},
         )
         
         # Get user details
-        user = None
-        if best_match:
-            user = await db.users.find_one(
-                {"_id": best_match["userId"]},
-                {"name": 1, "roll": 1}
-            )
+        user = users.get(best_match["userId"]) if best_match else None
 
         # Build result
-        location = face.get("location", {})
         results.append({
-            "box": {
-                "top": location.get("top"),
-                "right": location.get("right"),
-                "bottom": location.get("bottom"),
-                "left": location.get("left")
-            },
+            "box": scale_box(face.get("location", {}), frame.scale),
             "status": status,
             "distance": None if not best_match else round(distance, 4),
             "confidence": None if not best_match else round(
@@ -182,14 +299,166 @@ async def mark_attendance(payload: Dict):
             }
         })
     
-    return {
+    response = {
         "faces": results,
         "count": len(results)
     }
 
+    if tally is not None:
+        tally.add_frame([
+            {
+                "student_id": r["student"]["id"],
+                "distance": r["distance"],
+                "status": r["status"],
+                "name": r["student"]["name"],
+                "roll": r["student"]["roll"],
+            }
+            for r in results
+            if r["student"] and r["status"] in ("present", "uncertain")
+        ])
+        response["session"] = {"id": session_id, "version": tally.version}
+
+    return response
+
+
+# ============================
+# LIVE SESSIONS
+# ============================
+@router.post("/sessions")
+async def start_session(
+    payload: Dict,
+    current: dict = Depends(get_current_teacher),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """
+    Start a live attendance session
+    
+    payload: {"subject_id": "..."}
+
+    Resolves the roster, publishes the gallery to the ML service and pins
+    both (plus thresholds) in memory, so frames need no database queries.
+    """
+    subject_id = payload.get("subject_id")
+    if not subject_id:
+        raise HTTPException(status_code=400, detail="subject_id required")
+
+    try:
+        subject_oid = ObjectId(subject_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid subject_id")
+
+    subject, roster, candidates = await load_roster(subject_oid, loaders)
+    if not subject or current["id"] not in subject.get("professor_ids", []):
+        raise HTTPException(status_code=404, detail="Subject not found or access denied")
+
+    try:
+        session = await live_sessions.start(subject_id, str(current["id"]), roster, candidates)
+    except MLServiceUnavailable as e:
+        raise ml_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to prepare ML gallery: {str(e)}")
+
+    return {
+        "session_id": session.id,
+        "subject_id": subject_id,
+        "gallery_version": session.gallery_version,
+        "thresholds": {
+            "confident": session.confident_threshold,
+            "uncertain": session.uncertain_threshold,
+        },
+        "roster": session.tally.delta(0),
+    }
+
+
+def _get_owned_session(session_id: str, current_user: dict):
+    session = live_sessions.get(session_id)
+    if session is None or session.teacher_id != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+
+@router.post("/sessions/{session_id}/frames")
+async def session_frame(
+    session_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Process one frame of a live session
+
+    Same upload formats as /mark (multipart `image` file, raw JPEG body, or
+    JSON with a data URL), plus:
+      "since": 12   # optional, roster version the client already has
+    """
+    # JWT-only auth: no database round trips per frame
+    session = _get_owned_session(session_id, current_user)
+
+    image_bytes, payload = await _read_frame(request)
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="image required")
+    try:
+        since = int(payload.get("since") or 0)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="since must be an integer")
+
+    frame = await _compact_frame(image_bytes)
+
+    try:
+        results = await process_frame(session, frame.base64, scale=frame.scale)
+    except MLServiceUnavailable as e:
+        raise ml_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to recognize faces: {str(e)}")
+
+    return {
+        "faces": results,
+        "count": len(results),
+        "session": {"id": session.id, "version": session.tally.version},
+        "roster": session.tally.delta(since),
+    }
+
+
+@router.post("/sessions/{session_id}/stop")
+async def stop_session(session_id: str, current_user: dict = Depends(get_current_user)):
+    """End a session and return the final roster for review and /confirm"""
+    session = _get_owned_session(session_id, current_user)
+    live_sessions.stop(session_id)
+
+    roster = session.tally.delta(0)
+    return {
+        "subject_id": session.subject_id,
+        "roster": roster,
+        "present_students": [s["student_id"] for s in roster["students"] if s["status"] == "present"],
+        "absent_students": [s["student_id"] for s in roster["students"] if s["status"] == "absent"],
+        "uncertain_students": [s["student_id"] for s in roster["students"] if s["status"] == "uncertain"],
+    }
+
+
+def _get_owned_tally(session_id: str, current: dict):
+    tally = tallies.get(session_id)
+    if tally is None or tally.teacher_id != str(current["id"]):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return tally
+
+
+@router.get("/sessions/{session_id}/roster")
+async def get_session_roster(
+    session_id: str,
+    since: int = 0,
+    current: dict = Depends(get_current_teacher),
+):
+    """
+    Running present/uncertain/absent roster for a `/mark` session.
+
+    Pass the last seen `version` as `since` to receive only changed students.
+    """
+    tally = _get_owned_tally(session_id, current)
+
+    return tally.delta(since)
+
 
 @router.post("/confirm")
-async def confirm_attendance(payload: Dict):
+async def confirm_attendance(payload: Dict, current: dict = Depends(get_current_teacher)):
     """
     Confirm attendance for students after manual review
     
@@ -197,55 +466,173 @@ async def confirm_attendance(payload: Dict):
     {
       "subject_id": "...",
       "present_students": ["id1", "id2", ...],
-      "absent_students": ["id3", "id4", ...]
+      "absent_students": ["id3", "id4", ...],
+      "session_id": "..."   # optional, defaults to today's date
     }
+
+    Only the subject's teachers may confirm, and only for enrolled students.
     """
     subject_id = payload.get("subject_id")
     present_students: List[str] = payload.get("present_students", [])
     absent_students: List[str] = payload.get("absent_students", [])
     
-    print("absent students", absent_students)
-    
     if not subject_id:
         raise HTTPException(status_code=400, detail="subject_id required")
     
-    today = date.today().isoformat()
-    subject_oid = ObjectId(subject_id)
-    present_oids = [ObjectId(sid) for sid in present_students]
-    absent_oids = [ObjectId(sid) for sid in absent_students]
-    
-    # Mark PRESENT students
-    await db.subjects.update_one(
-        {"_id": subject_oid},
-        {
-            "$inc": {"students.$[p].attendance.present": 1},
-            "$set": {"students.$[p].attendance.lastMarkedAt": today}
-        },
-        array_filters=[
-            {
-                "p.student_id": {"$in": present_oids},
-                "p.attendance.lastMarkedAt": {"$ne": today}
-            }
-        ]
-    )
+    try:
+        subject_oid = ObjectId(subject_id)
+        present_oids = [ObjectId(sid) for sid in dict.fromkeys(present_students)]
+        absent_oids = [ObjectId(sid) for sid in dict.fromkeys(absent_students)]
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid subject or student id")
+
+    subject = await get_subject(subject_oid)
+    if not subject or current["id"] not in subject.get("professor_ids", []):
+        raise HTTPException(status_code=404, detail="Subject not found or access denied")
+
+    if set(present_oids) & set(absent_oids):
+        raise HTTPException(status_code=400, detail="A student is both present and absent")
+    roster = {s["student_id"] for s in subject["students"]}
+    if any(oid not in roster for oid in present_oids + absent_oids):
+        raise HTTPException(status_code=400, detail="Student not enrolled in this subject")
     
-    # Mark ABSENT students
-    await db.subjects.update_one(
-        {"_id": subject_oid},
-        {
-            "$inc": {"students.$[a].attendance.absent": 1},
-            "$set": {"students.$[a].attendance.lastMarkedAt": today}
-        },
-        array_filters=[
-            {
-                "a.student_id": {"$in": absent_oids},
-                "a.attendance.lastMarkedAt": {"$ne": today}
-            }
-        ]
+    # One event per student; students already marked in this session are skipped
+    inserted = await record_session(
+        subject_oid,
+        present_oids,
+        absent_oids,
+        session_id=payload.get("session_id"),
+        marked_by=current["id"],
     )
 
     return {
         "ok": True,
-        "present_updated": len(present_students),
-        "absent_updated": len(absent_students)
+        "present_updated": sum(1 for e in inserted if e["status"] == "present"),
+        "absent_updated": sum(1 for e in inserted if e["status"] == "absent")
+    }
+
+
+@router.post("/confirm/bulk")
+async def confirm_attendance_bulk(
+    payload: BulkConfirmRequest,
+    current: dict = Depends(get_current_teacher),
+):
+    """
+    Confirm many reviewed sessions at once (offline sync)
+
+    payload:
+    {
+      "sessions": [
+        {
+          "idempotency_key": "...",   # unique per session, kept across retries
+          "subject_id": "...",
+          "date": "2024-01-20",
+          "period": 3,                # optional
+          "present_students": ["id1", ...],
+          "absent_students": ["id3", ...]
+        },
+        ...
+      ]
     }
+
+    The key is the session id of the recorded events, so re-sending a
+    session records nothing twice. A key is bound to the session it was
+    first sent with: reusing it for a different subject, date, period or
+    student list is rejected. Valid sessions are written with one
+    bulk_write; each gets its own result, in request order:
+    "applied", "already_applied", "rejected" (with the reason) or "failed".
+    """
+    results: List[dict] = [None] * len(payload.sessions)
+    latest = date.today() + timedelta(days=1)  # clients a timezone ahead
+
+    subject_oids = set()
+    for item in payload.sessions:
+        try:
+            subject_oids.add(ObjectId(item.subject_id))
+        except InvalidId:
+            pass
+    subjects = dict(zip(subject_oids, await asyncio.gather(*(get_subject(oid) for oid in subject_oids))))
+
+    pending, seen_keys = [], set()
+    for i, item in enumerate(payload.sessions):
+        key = item.idempotency_key
+
+        def reject(reason: str):
+            results[i] = {"idempotency_key": key, "status": "rejected", "error": reason}
+
+        if key in seen_keys:
+            reject("Duplicate idempotency_key in this request")
+            continue
+        seen_keys.add(key)
+
+        try:
+            subject = subjects.get(ObjectId(item.subject_id))
+        except InvalidId:
+            subject = None
+        if not subject or current["id"] not in subject.get("professor_ids", []):
+            reject("Subject not found or access denied")
+            continue
+        if item.date > latest:
+            reject("Date is in the future")
+            continue
+
+        try:
+            present_oids = [ObjectId(sid) for sid in dict.fromkeys(item.present_students)]
+            absent_oids = [ObjectId(sid) for sid in dict.fromkeys(item.absent_students)]
+        except InvalidId:
+            reject("Invalid student id")
+            continue
+        if set(present_oids) & set(absent_oids):
+            reject("A student is both present and absent")
+            continue
+        roster = {s["student_id"] for s in subject["students"]}
+        if any(oid not in roster for oid in present_oids + absent_oids):
+            reject("Student not enrolled in this subject")
+            continue
+
+        pending.append((i, {
+            "subject_id": subject["_id"],
+            "present": present_oids,
+            "absent": absent_oids,
+            "session_id": key,
+            "date": item.date.isoformat(),
+            "period": item.period,
+            "marked_by": current["id"],
+        }))
+
+    bound = await bind_sync_keys({session["session_id"]: session_fingerprint(session) for _, session in pending})
+    accepted = []
+    for i, session in pending:
+        if bound[session["session_id"]]:
+            accepted.append((i, session))
+        else:
+            results[i] = {
+                "idempotency_key": session["session_id"],
+                "status": "rejected",
+                "error": "idempotency_key was already used for a different session",
+            }
+    pending = accepted
+
+    outcomes = await record_sessions([session for _, session in pending])
+    for (i, _), outcome in zip(pending, outcomes):
+        inserted = outcome["inserted"]
+        if outcome["error"]:
+            status = "failed"
+        elif inserted:
+            status = "applied"
+        else:
+            status = "already_applied"
+        results[i] = {
+            "idempotency_key": payload.sessions[i].idempotency_key,
+            "status": status,
+            "present_updated": sum(1 for e in inserted if e["status"] == "present"),
+            "absent_updated": sum(1 for e in inserted if e["status"] == "absent"),
+        }
+        if outcome["error"]:
+            results[i]["error"] = outcome["error"]
+
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {"results": results, "counts": counts}
+
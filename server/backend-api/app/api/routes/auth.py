@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Depends, Request
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from fastapi.responses import RedirectResponse
 from authlib.integrations.starlette_client import OAuth
 from bson import ObjectId
@@ -9,16 +9,18 @@ from app.utils.jwt_token import create_jwt
 from urllib.parse import quote
 
 from ...schemas.auth import RegisterRequest, UserResponse, LoginRequest
-from ...core.security import hash_password, verify_password
-from ...core.email import send_verification_email
+from ...core.security import password_hasher
 from ...core.config import BACKEND_BASE_URL
 from ...db.mongo import db
+from ...services.email_outbox import enqueue_verification_email
+from ...services.login_throttle import register_attempt, register_success
+from ...utils.client_ip import client_ip
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 oauth = OAuth()
 
 @router.post("/register", response_model=UserResponse)
-async def register(payload: RegisterRequest, background_tasks: BackgroundTasks):
+async def register(payload: RegisterRequest):
     
     if len(payload.password.encode("utf-8")) > 72:
         raise HTTPException(
@@ -39,7 +41,7 @@ async def register(payload: RegisterRequest, background_tasks: BackgroundTasks):
     user_doc = {
         "name": payload.name,
         "email": payload.email,
-        "password_hash": hash_password(payload.password),
+        "password_hash": await password_hasher.hash(payload.password),
         "role": payload.role,
         "is_verified": False,  # Changed to False for email verification flow
         "verification_token": verification_token,  # Store the actual token
@@ -109,7 +111,8 @@ async def register(payload: RegisterRequest, background_tasks: BackgroundTasks):
     # Build Verification link
     verify_link = f"{BACKEND_BASE_URL}/auth/verify-email?token={verification_token}"
     
-    send_verification_email(
+    # Persisted and sent by the outbox worker; SMTP is never on this path
+    await enqueue_verification_email(
         to_email=payload.email,
         verification_link=verify_link,
     )
@@ -130,9 +133,13 @@ async def register(payload: RegisterRequest, background_tasks: BackgroundTasks):
 
 
 @router.post("/login", response_model=UserResponse)
-async def login(payload: LoginRequest):
+async def login(payload: LoginRequest, request: Request):
     email = payload.email
     password = payload.password
+
+    # Before any lookup or hashing, so throttled requests cost one counter update
+    ip = client_ip(request) or "unknown"
+    await register_attempt(ip, email)
     
     user = await db.users.find_one({"email": payload.email})
 
@@ -141,9 +148,16 @@ async def login(payload: LoginRequest):
         raise HTTPException(status_code=401, detail="User not found")
     
     # 2. Verify the password of the user
-    if not verify_password(payload.password, user["password_hash"]):
+    valid, new_hash = await password_hasher.verify_and_update(password, user["password_hash"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Wrong Password")
 
+    # Stored with an outdated bcrypt cost: upgrade it now that we know the password
+    if new_hash:
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"password_hash": new_hash}})
+
+    await register_success(ip, email)
+
     # 3. Check if user is verified or not
     if not user.get("is_verified", False):
         raise HTTPException(status_code=403, detail="Please verify your email first..")
@@ -154,8 +168,6 @@ async def login(payload: LoginRequest):
         role=user["role"],
         email=user["email"]
     )
-    
-    print(token)
 
     return {
         "user_id": str(user["_id"]),
@@ -0,0 +1,98 @@
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import METRICS_ENABLED, METRICS_TOKEN
+from app.core.metrics import registry
+from app.core.security import password_hasher
+from app.services import roster_cache
+from app.services.analytics import analytics_cache
+from app.services.email_outbox import email_outbox
+from app.services.enrollment_jobs import enrollment_workers
+from app.services.login_throttle import throttle_stats
+from app.services.ml_client import ml_client
+from app.services.principal_cache import principal_cache
+from app.utils.http_cache import http_stats
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------------- COLLECTORS ----------------
+# The components below already count what matters in their stats(); these
+# read those counters at scrape time.
+def _caches():
+    return [*roster_cache.stats(), analytics_cache.stats(), principal_cache.stats()]
+
+
+def _per_cache(field: str):
+    return lambda: (({"cache": s["name"]}, s[field]) for s in _caches())
+
+
+def _field(source, field: str):
+    return lambda: [({}, source.stats()[field])]
+
+
+registry.collector("cache_hits_total", "counter", "In-process cache hits", _per_cache("hits"))
+registry.collector("cache_misses_total", "counter", "In-process cache misses", _per_cache("misses"))
+registry.collector("cache_evictions_total", "counter", "In-process cache LRU evictions", _per_cache("evictions"))
+registry.collector("cache_entries", "gauge", "In-process cache entries", _per_cache("size"))
+
+registry.collector("http_conditional_requests_total", "counter", "Requests carrying If-None-Match", _field(http_stats, "conditional_requests"))
+registry.collector("http_not_modified_total", "counter", "304 responses", _field(http_stats, "not_modified"))
+registry.collector("http_response_bytes_uncompressed_total", "counter", "Response bytes before compression", _field(http_stats, "bytes_uncompressed"))
+registry.collector("http_response_bytes_sent_total", "counter", "Response bytes after compression", _field(http_stats, "bytes_sent"))
+
+registry.collector("password_hash_calls_total", "counter", "bcrypt hash/verify calls", _field(password_hasher, "calls"))
+registry.collector("password_hash_rejected_total", "counter", "Hash calls refused because the pool queue was full", _field(password_hasher, "rejected"))
+registry.collector("login_throttled_total", "counter", "Login attempts refused by throttling", _field(throttle_stats, "throttled"))
+
+registry.collector(
+    "email_outbox_messages_total", "counter", "Outbox messages by outcome",
+    lambda: (({"outcome": k}, email_outbox.stats()[k]) for k in ("enqueued", "sent", "retried", "failed")),
+)
+registry.collector(
+    "enrollment_jobs_total", "counter", "Face enrollment jobs by outcome",
+    lambda: (({"outcome": k}, enrollment_workers.stats()[k]) for k in ("submitted", "succeeded", "rejected", "retried", "failed")),
+)
+
+
+def _ml_endpoints(field: str):
+    return lambda: (
+        ({"endpoint": name}, s[field]) for name, s in ml_client.stats()["endpoints"].items()
+    )
+
+
+def _ml_breakers(field: str):
+    return lambda: (({"endpoint": name}, getattr(b, field)) for name, b in ml_client.breakers.items())
+
+
+registry.collector(
+    "ml_circuit_state", "gauge", "ML circuit breaker state per endpoint (1 for the current one)",
+    lambda: (
+        ({"endpoint": name, "state": state}, int(b.state == state))
+        for name, b in ml_client.breakers.items()
+        for state in ("closed", "half_open", "open")
+    ),
+)
+registry.collector("ml_circuit_opens_total", "counter", "Times an ML endpoint's circuit opened", _ml_breakers("opens"))
+registry.collector("ml_short_circuited_total", "counter", "ML calls refused while their circuit was open", _ml_breakers("short_circuited"))
+registry.collector("ml_retries_total", "counter", "ML call retries", _ml_endpoints("retries"))
+registry.collector("ml_timeouts_total", "counter", "ML call attempts that timed out", _ml_endpoints("timeouts"))
+registry.collector("ml_hedges_total", "counter", "Hedged ML requests sent", _ml_endpoints("hedges"))
+registry.collector("ml_hedge_wins_total", "counter", "Hedged ML requests that answered first", _ml_endpoints("hedge_wins"))
+
+
+# ---------------- ROUTE ----------------
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(authorization: str = Header(None)):
+    """Prometheus text exposition of this worker's metrics"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN:
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Metrics token required")
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
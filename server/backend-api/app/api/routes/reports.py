@@ -0,0 +1,180 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional
+
+import xlsxwriter
+from bson import ObjectId, errors as bson_errors
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.api.deps import get_current_teacher
+from app.db.mongo import db
+from app.services.roster_cache import get_subject, get_teacher_subjects
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+# Rows per cursor batch; student names are looked up once per batch
+BATCH_SIZE = 1000
+
+# Exactly the (subject_id, date) index, so rows stream in index order
+# without an in-memory SORT (checked by app.db.index_check, HOT_SORTS)
+EXPORT_SORT = [("subject_id", 1), ("date", 1)]
+
+COLUMNS = ["date", "session_id", "subject_code", "subject_name", "student_id", "roll", "name", "status", "marked_at"]
+
+
+def _parse_day(value: Optional[str], field_name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{field_name} must be YYYY-MM-DD")
+
+
+async def _export_subjects(current_user: dict, subject_id: Optional[str]) -> Dict[ObjectId, dict]:
+    if subject_id is None:
+        return {s["_id"]: s for s in await get_teacher_subjects(current_user["id"])}
+
+    try:
+        subject_oid = ObjectId(subject_id)
+    except bson_errors.InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid subject_id")
+
+    subject = await get_subject(subject_oid)
+    if not subject or current_user["id"] not in subject.get("professor_ids", []):
+        raise HTTPException(status_code=404, detail="Subject not found or access denied")
+    return {subject_oid: subject}
+
+
+async def _rows(subjects: Dict[ObjectId, dict], start: Optional[str], end: Optional[str]) -> AsyncIterator[List[list]]:
+    """Export rows in batches of BATCH_SIZE, ordered by subject and date"""
+    query = {"subject_id": {"$in": list(subjects)}}
+    if start or end:
+        query["date"] = {k: v for k, v in (("$gte", start), ("$lte", end)) if v}
+
+    cursor = db.attendance_events.find(
+        query,
+        {"subject_id": 1, "student_id": 1, "session_id": 1, "date": 1, "status": 1, "marked_at": 1},
+    ).sort(EXPORT_SORT).batch_size(BATCH_SIZE)
+
+    # Only ids and two short strings per student: bounded by roster sizes
+    users: Dict[ObjectId, dict] = {}
+    batch = []
+
+    async def flush():
+        missing = list({e["student_id"] for e in batch} - users.keys())
+        if missing:
+            async for u in db.users.find({"_id": {"$in": missing}}, {"name": 1, "roll": 1}):
+                users[u["_id"]] = u
+            for oid in missing:
+                users.setdefault(oid, {})
+
+        rows = []
+        for e in batch:
+            subject = subjects[e["subject_id"]]
+            user = users[e["student_id"]]
+            rows.append([
+                e.get("date") or "",
+                e["session_id"],
+                subject.get("code") or "",
+                subject.get("name") or "",
+                str(e["student_id"]),
+                user.get("roll") or "",
+                user.get("name") or "",
+                e["status"],
+                e["marked_at"].isoformat() if e.get("marked_at") else "",
+            ])
+        return rows
+
+    async for event in cursor:
+        batch.append(event)
+        if len(batch) >= BATCH_SIZE:
+            yield await flush()
+            batch = []
+    if batch:
+        yield await flush()
+
+
+async def _csv_stream(rows: AsyncIterator[List[list]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    async for chunk in rows:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _write_rows(sheet, first_row: int, chunk: List[list]) -> int:
+    for offset, row in enumerate(chunk):
+        sheet.write_row(first_row + offset, 0, row)
+    return first_row + len(chunk)
+
+
+async def _xlsx_file(rows: AsyncIterator[List[list]]) -> str:
+    """
+    Write the workbook to a temp file. Rows and the final zip (the costly
+    part of close()) are written in a worker thread, one chunk at a time,
+    so the event loop keeps serving other requests.
+    """
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+
+    # constant_memory flushes each row to disk as soon as it is written
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    sheet = workbook.add_worksheet("Attendance")
+    sheet.write_row(0, 0, COLUMNS)
+    row_num = 1
+    try:
+        async for chunk in rows:
+            row_num = await asyncio.to_thread(_write_rows, sheet, row_num, chunk)
+        await asyncio.to_thread(workbook.close)
+    except BaseException:
+        await asyncio.to_thread(workbook.close)
+        os.unlink(path)
+        raise
+    return path
+
+
+@router.get("/export")
+async def export_attendance(
+    subject_id: Optional[str] = Query(None, description="Defaults to all of the teacher's subjects"),
+    start: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    current_user: dict = Depends(get_current_teacher)
+):
+    """
+    Attendance events as CSV (streamed, chunked) or XLSX.
+
+    XLSX is built off the event loop and sent as a file.
+    """
+    start, end = _parse_day(start, "start"), _parse_day(end, "end")
+    subjects = await _export_subjects(current_user, subject_id)
+
+    span = f"{start or 'all'}_{end or 'all'}"
+    filename = f"attendance_{subject_id or 'all-subjects'}_{span}.{format}"
+
+    if format == "xlsx":
+        path = await _xlsx_file(_rows(subjects, start, end))
+        return FileResponse(
+            path,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            filename=filename,
+            background=BackgroundTask(os.unlink, path),
+        )
+
+    return StreamingResponse(
+        _csv_stream(_rows(subjects, start, end)),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,16 +1,24 @@
 import uuid
 import os
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile, File
 from fastapi.responses import JSONResponse
 from bson import ObjectId
 
 from ...db.mongo import db
 from ...core.security import get_current_user
+from ...db.loaders import Loaders
+from ..deps import get_loaders
 from app.services.students import get_student_profile
 
-from cloudinary.uploader import upload
-import base64
-from app.services.ml_client import ml_client
+from fastapi.encoders import jsonable_encoder
+from app.services.enrollment_jobs import FACE_EXTENSIONS, enrollment_workers, public_job
+from app.services.roster_cache import (
+    get_catalogue,
+    invalidate_subject,
+)
+from app.services.change_counters import bump_subject, catalogue_key, student_key, versions
+from app.utils.http_cache import etag_matches, json_response, not_modified, version_etag
 
 
 router = APIRouter(prefix="/students", tags=["students"])
@@ -20,25 +28,32 @@ router = APIRouter(prefix="/students", tags=["students"])
 # ============================
 @router.get("/me/profile")
 async def api_get_my_profile(
-    current_user: dict = Depends(get_current_user)
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     if current_user.get("role") != "student":
         raise HTTPException(status_code=403, detail="Not a student")
 
-    profile = await get_student_profile(current_user["id"])
+    key = student_key(current_user["id"])
+    etag = version_etag(key, (await versions([key]))[key])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    profile = await get_student_profile(current_user["id"], loaders)
 
     if not profile:
         raise HTTPException(status_code=404, detail="Student profile not found")
 
-    return profile
+    return json_response(profile, etag)
 
 
 # ============================
 # GET STUDENT PROFILE (PUBLIC)
 # ============================
 @router.get("/{student_id}/profile")
-async def api_get_student_profile(student_id: str):
-    profile = await get_student_profile(student_id)
+async def api_get_student_profile(student_id: str, loaders: Loaders = Depends(get_loaders)):
+    profile = await get_student_profile(student_id, loaders)
 
     if not profile:
         raise HTTPException(status_code=404, detail="Student not found")
@@ -49,76 +64,60 @@ async def api_get_student_profile(student_id: str):
 # ============================
 # UPLOAD FACE IMAGE
 # ============================
-@router.post("/me/face-image")
+MAX_FACE_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+
+
+@router.post("/me/face-image", status_code=202)
 async def upload_image_url(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    Queue a face enrollment; poll the returned status_url for the outcome.
+
+    Encoding, storage and the profile update happen in the enrollment
+    workers (app/services/enrollment_jobs.py).
+    """
     if current_user.get("role") != "student":
         raise HTTPException(status_code=403, detail="Not a student")
 
-    if file.content_type not in ["image/jpeg", "image/png", "image/jpg"]:
+    if file.content_type not in FACE_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Only JPG/PNG allowed")
 
-    student_user_id = ObjectId(current_user["id"])
-    
-    # 1. Read image bytes
     image_bytes = await file.read()
-    
-    # 2. Convert to base64 for ML service
-    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-    
-    # 3. Generate face embeddings via ML service
-    try:
-        ml_response = await ml_client.encode_face(
-            image_base64=image_base64,
-            validate_single=True,
-            min_face_area_ratio=0.05,
-            num_jitters=5
-        )
-        
-        if not ml_response.get("success"):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Face encoding failed: {ml_response.get('error', 'Unknown error')}"
-            )
-        
-        embedding = ml_response.get("embedding")
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"ML service error: {str(e)}")
-    
-    # 4. Upload image to Cloudinary
-    upload_result = upload(
-        image_bytes,
-        folder = "student_faces",
-        public_id = str(current_user["id"]),
-        overwrite=True,
-        resource_type="image"
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Empty file")
+    if len(image_bytes) > MAX_FACE_IMAGE_SIZE:
+        raise HTTPException(status_code=413, detail="File too large. Max 5MB")
+
+    job = await enrollment_workers.submit(ObjectId(current_user["id"]), image_bytes, file.content_type)
+
+    status_url = f"/students/me/face-image/jobs/{job['_id']}"
+    return JSONResponse(
+        status_code=202,
+        content={**jsonable_encoder(public_job(job)), "status_url": status_url},
+        headers={"Location": status_url},
     )
 
-    image_url = upload_result.get("secure_url")
 
-    # 5. Store image_url + embeddings
-    await db.students.update_one(
-        {"userId": student_user_id},
-        {
-            "$set": {
-                "image_url": image_url,
-                "verified": True
-            },
-            "$push": {
-                "face_embeddings": embedding
-            }
-        }
-    )
+@router.get("/me/face-image/jobs/{job_id}")
+async def get_face_image_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user.get("role") != "student":
+        raise HTTPException(status_code=403, detail="Not a student")
+
+    try:
+        job_oid = ObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+
+    job = await enrollment_workers.get(job_oid, ObjectId(current_user["id"]))
+    if not job:
+        raise HTTPException(status_code=404, detail="Enrollment job not found")
 
-    return {
-        "message": "Photo uploaded and face registered successfully",
-        "image_url": image_url
-    }
+    return public_job(job)
 
 
 # ============================
@@ -126,15 +125,21 @@ async def upload_image_url(
 # ============================
 @router.get("/me/available-subjects")
 async def get_available_subjects(
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     if current_user.get("role") != "student":
         raise HTTPException(status_code=403, detail="Not a student")
 
-    subjects = await db.subjects.find({}).to_list(None)
+    key = catalogue_key()
+    etag = version_etag(key, (await versions([key]))[key])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    subjects = await get_catalogue()
 
     # 🔴 IMPORTANT: Serialize ObjectIds
-    return [
+    return json_response([
         {
             "_id": str(sub["_id"]),
             "name": sub["name"],
@@ -144,7 +149,7 @@ async def get_available_subjects(
             "created_at": sub["created_at"]
         }
         for sub in subjects
-    ]
+    ], etag)
 
 
 # ============================
@@ -153,7 +158,8 @@ async def get_available_subjects(
 @router.post("/me/subjects")
 async def add_subject(
     subject_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     if current_user.get("role") != "student":
         raise HTTPException(status_code=403, detail="Not a student")
@@ -161,18 +167,18 @@ async def add_subject(
     subject_oid = ObjectId(subject_id)
     student_oid = ObjectId(current_user["id"])
 
-    # 1️⃣ Fetch student
-    student = await db.students.find_one({"userId": student_oid})
+    # 1️⃣ Fetch student, user and subject together
+    student, user, subject = await asyncio.gather(
+        loaders.students("_id").load(student_oid),
+        loaders.users("name").load(student_oid),
+        loaders.subjects("professor_ids").load(subject_oid),
+    )
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    user = await db.users.find_one({"_id": student["userId"]})
-    student_name = user.get("name", "")
-    
-    print(student_name)
+    student_name = (user or {}).get("name", "")
 
-    # 2️⃣ Fetch subject
-    subject = await db.subjects.find_one({"_id": subject_oid})
+    # 2️⃣ Ensure subject exists
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
 
@@ -193,17 +199,13 @@ async def add_subject(
                 "students": {
                     "student_id": student_oid,           # ✅ FIX
                     "name": student_name,
-                    "verified": False,
-                    "attendance": {
-                        "present": 0,
-                        "absent": 0,
-                        "total": 0,
-                        "percentage": 0
-                    }
+                    "verified": False
                 }
             }
         }
     )
+    invalidate_subject(subject_oid, subject.get("professor_ids"))
+    await bump_subject(subject, student_oid)
 
     return {"message": "Subject added successfully"}
 
@@ -214,7 +216,8 @@ async def add_subject(
 @router.delete("/me/remove-subject/{subject_id}")
 async def remove_subject(
     subject_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     if current_user.get("role") != "student":
         raise HTTPException(status_code=403, detail="Not a student")
@@ -223,7 +226,7 @@ async def remove_subject(
     user_oid = ObjectId(current_user["id"])
     
     # Ensure subject exists
-    subject = await db.subjects.find_one({"_id": subject_oid})
+    subject = await loaders.subjects("professor_ids").load(subject_oid)
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
     
@@ -241,5 +244,7 @@ async def remove_subject(
         {"_id": subject_oid},
         {"$pull": {"students": {"student_id": user_oid}}}
     )
+    invalidate_subject(subject_oid, subject.get("professor_ids"))
+    await bump_subject(subject, user_oid)
     
     return {"message": "Subject removed successfully"}
\ No newline at end of file
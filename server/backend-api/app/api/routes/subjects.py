@@ -0,0 +1,63 @@
+import re
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+
+from app.core.security import get_current_user
+from app.db.mongo import db
+from app.services.change_counters import catalogue_key, versions
+from app.utils.http_cache import etag_matches, json_response, not_modified, version_etag
+
+router = APIRouter(prefix="/subjects", tags=["Subjects"])
+
+CATALOGUE_FIELDS = {"name": 1, "code": 1, "type": 1, "professor_ids": 1}
+
+
+@router.get("/catalogue")
+async def get_catalogue_page(
+    request: Request,
+    q: Optional[str] = Query(None, description="Prefix of the subject code or name"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Subjects ordered by code, without their embedded rosters.
+
+    Keyset pagination on the unique `code` index; `q` is matched as a
+    case-insensitive prefix of the code or of `name_lower`, both indexed.
+    """
+    key = catalogue_key()
+    etag = version_etag(key, (await versions([key]))[key], q, cursor, limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = {}
+    if cursor:
+        query["code"] = {"$gt": cursor}
+    if q and q.strip():
+        prefix = re.escape(q.strip())
+        # Codes are stored upper-case, names also as name_lower: plain anchored
+        # regexes, which can use the indexes (case-insensitive ones cannot)
+        query["$or"] = [
+            {"code": {"$regex": f"^{prefix.upper()}"}},
+            {"name_lower": {"$regex": f"^{prefix.lower()}"}},
+        ]
+
+    page = await db.subjects.find(query, CATALOGUE_FIELDS).sort("code", 1).limit(limit + 1).to_list(length=limit + 1)
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    return json_response({
+        "subjects": [
+            {
+                "_id": str(sub["_id"]),
+                "name": sub.get("name"),
+                "code": sub.get("code"),
+                "type": sub.get("type"),
+                "professor_ids": [str(pid) for pid in sub.get("professor_ids", [])],
+            }
+            for sub in page
+        ],
+        "next_cursor": page[-1]["code"] if has_more else None,
+    }, etag)
@@ -1,31 +1,38 @@
 # backend/app/api/routes/settings.py
 from app.db.mongo import db
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request, status
 from pathlib import Path
+from typing import Optional
+import asyncio
+import re
 from datetime import datetime
-import aiofiles
 
 from app.services.teacher_settings_service import (
     ensure_settings_for_user,
     patch_settings,
     replace_settings,
 )
-from app.db.teacher_settings_repo import create_index_once
-from app.db.subjects_repo import ensure_indexes as ensure_subject_indexes
 from app.utils.utils import serialize_bson
-from app.api.deps import get_current_teacher
+from app.utils.http_cache import etag_matches, json_response, json_with_etag, not_modified, version_etag
+from app.services.change_counters import bump, bump_subject, settings_key, subject_key, teacher_subjects_key, versions
+from app.api.deps import get_current_teacher, get_loaders
+from app.db.loaders import Loaders
 from app.services.subject_service import add_subject_for_teacher
+from app.services.principal_cache import principal_cache
+from app.services.storage import StorageError, storage_for
 from app.db.subjects_repo import get_subjects_by_ids
+from app.services.attendance_summaries import get_subject_summaries
+from app.services.roster_cache import (
+    get_subject,
+    get_students,
+    get_teacher_subjects,
+    embedding_lists,
+    invalidate_subject,
+)
 from bson import ObjectId, errors as bson_errors
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
-# ensure DB index
-@router.on_event("startup")
-async def _ensure_indexes():
-    await create_index_once()
-    await ensure_subject_indexes()
-
 def validate_object_id(id_str: str, field_name: str = "id") -> ObjectId:
     """Helper to validate and convert string to ObjectId"""
     try:
@@ -38,10 +45,18 @@ def validate_object_id(id_str: str, field_name: str = "id") -> ObjectId:
 
 # ---------------- GET SETTINGS ----------------
 @router.get("", response_model=dict)
-async def get_settings(current: dict = Depends(get_current_teacher)):
+async def get_settings(request: Request, current: dict = Depends(get_current_teacher)):
     user_id = current["id"]
     user = current["user"]
     teacher = current["teacher"]
+
+    # Persisted counters: the principal (user/teacher) may be up to
+    # AUTH_CACHE_TTL old, so it is no version input
+    keys = [settings_key(user_id), teacher_subjects_key(user_id)]
+    current_versions = await versions(keys)
+    etag = version_etag("settings", user_id, *(current_versions[k] for k in keys))
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
     profile = {
         "id": user_id,
@@ -57,12 +72,12 @@ async def get_settings(current: dict = Depends(get_current_teacher)):
 
     doc = await ensure_settings_for_user(user_id, profile)
     
-    subject_ids = teacher.get("profile", {}).get("subjects", [])
+    subject_ids = doc.get("profile", {}).get("subjects", [])
     populated_subjects = await get_subjects_by_ids(subject_ids)
     
     doc["profile"]["subjects"] = populated_subjects
     
-    return serialize_bson(doc)
+    return json_response(serialize_bson(doc), etag)
 
 # ---------------- PATCH SETTINGS ----------------
 @router.patch("", response_model=dict)
@@ -117,6 +132,9 @@ async def patch_settings_route(
 
     if cleaned_payload:
         await patch_settings(current["id"], cleaned_payload)
+    elif user_updates or teacher_updates:
+        principal_cache.invalidate_user(user_id)
+        await bump(settings_key(user_id))
     
     # ✅ FIXED: Return fresh data (query supports both field names)
     fresh_user = await db.users.find_one({"_id": user_id})
@@ -161,8 +179,6 @@ async def put_settings_route(
     return serialize_bson(updated)
 
 # ---------------- AVATAR UPLOAD ----------------
-UPLOAD_DIR = Path("app/static/avatars")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
 @router.post("/upload-avatar", response_model=dict)
@@ -182,17 +198,13 @@ async def upload_avatar(
     if len(contents) > MAX_FILE_SIZE:
         raise HTTPException(status_code=413, detail="File too large. Max 5MB")
     
-    fname = f"{current['id']}_{int(datetime.utcnow().timestamp())}{ext}"
-    dest = UPLOAD_DIR / fname
+    key = f"avatars/{current['id']}_{int(datetime.utcnow().timestamp())}{ext}"
 
     try:
-        async with aiofiles.open(dest, "wb") as out:
-            await out.write(contents)
-    except Exception as e:
+        avatar_url = await storage_for("avatars").put(key, contents, file.content_type)
+    except StorageError as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
 
-    avatar_url = f"/static/avatars/{fname}"
-
     updated = await patch_settings(
         current["id"],
         {"profile": {"avatarUrl": avatar_url}},
@@ -223,42 +235,40 @@ async def add_subject(
     return serialize_bson(subject)
 
 @router.get("/my-subjects", response_model=list)
-async def get_my_subjects(current_user: dict = Depends(get_current_teacher)):
+async def get_my_subjects(request: Request, current_user: dict = Depends(get_current_teacher)):
     prof_id = validate_object_id(current_user["id"])
+
+    key = teacher_subjects_key(prof_id)
+    etag = version_etag(key, (await versions([key]))[key])
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    subjects = await db.subjects.find(
-        {"professor_ids": prof_id}
-    ).to_list(length=100)
+    subjects = await get_teacher_subjects(prof_id)
     
-    return [
+    return json_response([
         {
             "_id": str(s["_id"]),
             "name": s["name"],
             "code": s.get("code"),
-            "student_count": len(s.get("students", []))
+            "student_count": s["student_count"]
         }
         for s in subjects
-    ]
+    ], etag)
     
 # GET STUDENTS OF A SUBJECT
 @router.get("/subjects/{subject_id}/students", response_model=list)
 async def get_subject_students(
     subject_id: str,
-    current_user: dict = Depends(get_current_teacher)
+    current_user: dict = Depends(get_current_teacher),
+    loaders: Loaders = Depends(get_loaders)
 ):
     prof_id = validate_object_id(current_user["id"])
     subj_id = validate_object_id(subject_id, "subject_id")
     
     # SECURITY: Ensure teacher teaches this subject
-    subject = await db.subjects.find_one(
-        {
-            "_id": subj_id,
-            "professor_ids": prof_id
-        },
-        {"students": 1, "name": 1}
-    )
+    subject = await get_subject(subj_id)
     
-    if not subject:
+    if not subject or prof_id not in subject.get("professor_ids", []):
         raise HTTPException(status_code=404, detail="Subject not found or access denied")
     
     subject_students = subject.get("students", [])
@@ -267,17 +277,12 @@ async def get_subject_students(
     
     student_user_ids = [s["student_id"] for s in subject_students]
     
-    students_cursor = db.students.find({"userId": {"$in": student_user_ids}})
-    users_cursor = db.users.find({"_id": {"$in": student_user_ids}})
-    
-    students_map = {
-        str(s["userId"]): s 
-        async for s in students_cursor
-    }
-    users = {
-        str(u["_id"]): u 
-        async for u in users_cursor
-    }
+    students_map, users_by_oid, counts = await asyncio.gather(
+        get_students(student_user_ids),
+        loaders.users("name", "roll", "year", "branch").load_many(student_user_ids),
+        get_subject_summaries(subj_id),
+    )
+    users = {str(oid): u for oid, u in users_by_oid.items()}
     
     response = []
     for s in subject_students:
@@ -294,14 +299,104 @@ async def get_subject_students(
             "roll": user.get("roll"),
             "year": user.get("year"),
             "branch": user.get("branch"),
-            "embeddings": student_doc.get("face_embeddings", []),
+            "embeddings": embedding_lists(student_doc) if student_doc else [],
             "avatar": student_doc.get("image_url"),
             "verified": s.get("verified", False),
-            "attendance": s.get("attendance", {"present": 0, "absent": 0}),
+            "attendance": counts.get(s["student_id"], {"present": 0, "absent": 0}),
         })
     
     return response
 
+ROSTER_FIELDS = ("name", "roll", "year", "branch", "avatar", "verified", "attendance")
+USER_FIELDS = ("name", "roll", "year", "branch")
+
+
+# LEAN, PAGINATED ROSTER (no embeddings)
+@router.get("/subjects/{subject_id}/roster")
+async def get_subject_roster(
+    request: Request,
+    subject_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    q: Optional[str] = Query(None, description="Name (substring) or roll (prefix) search"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of {','.join(ROSTER_FIELDS)}"),
+    verified: Optional[bool] = None,
+    current_user: dict = Depends(get_current_teacher),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """
+    One page of a subject's students, ordered by student id.
+
+    Responses carry an ETag; send it back as If-None-Match to get a 304
+    when the page is unchanged.
+    """
+    prof_id = validate_object_id(current_user["id"])
+    subj_id = validate_object_id(subject_id, "subject_id")
+    after = validate_object_id(cursor, "cursor") if cursor else None
+
+    selected = ROSTER_FIELDS
+    if fields:
+        selected = tuple(f for f in ROSTER_FIELDS if f in {x.strip() for x in fields.split(",")})
+        if not selected:
+            raise HTTPException(status_code=400, detail=f"fields must be among {', '.join(ROSTER_FIELDS)}")
+
+    subject = await get_subject(subj_id)
+    if not subject or prof_id not in subject.get("professor_ids", []):
+        raise HTTPException(status_code=404, detail="Subject not found or access denied")
+
+    enrolled = {
+        s["student_id"]: s
+        for s in subject.get("students", [])
+        if verified is None or s.get("verified", False) == verified
+    }
+
+    query = {"_id": {"$in": list(enrolled)}}
+    if after:
+        query["_id"]["$gt"] = after
+    if q:
+        pattern = re.escape(q.strip())
+        query["$or"] = [
+            {"name": {"$regex": pattern, "$options": "i"}},
+            {"roll": {"$regex": f"^{pattern}", "$options": "i"}},
+        ]
+
+    projection = {f: 1 for f in USER_FIELDS if f in selected} or {"_id": 1}
+    page = await db.users.find(query, projection).sort("_id", 1).limit(limit + 1).to_list(length=limit + 1)
+    has_more = len(page) > limit
+    page = page[:limit]
+    page_ids = [u["_id"] for u in page]
+
+    students_map, counts = await asyncio.gather(
+        loaders.students("image_url").load_many(page_ids) if "avatar" in selected else _none(),
+        get_subject_summaries(subj_id, page_ids) if "attendance" in selected else _none(),
+    )
+
+    students = []
+    for user in page:
+        oid = user["_id"]
+        row = {"student_id": str(oid)}
+        for f in USER_FIELDS:
+            if f in selected:
+                row[f] = user.get(f)
+        if "avatar" in selected:
+            row["avatar"] = (students_map.get(oid) or {}).get("image_url")
+        if "verified" in selected:
+            row["verified"] = enrolled[oid].get("verified", False)
+        if "attendance" in selected:
+            row["attendance"] = counts.get(oid, {"present": 0, "absent": 0})
+        students.append(row)
+
+    return json_with_etag(request, {
+        "students": students,
+        "next_cursor": str(page_ids[-1]) if has_more else None,
+        "enrolled": len(enrolled),
+    })
+
+
+async def _none():
+    return {}
+
+
 @router.post("/subjects/{subject_id}/students/{student_id}/verify")
 async def verify_student(
     subject_id: str,
@@ -329,6 +424,9 @@ async def verify_student(
             raise HTTPException(status_code=404, detail="Subject not found")
         raise HTTPException(status_code=404, detail="Student not enrolled in this subject")
     
+    invalidate_subject(subj_id)
+    await bump(subject_key(subj_id))
+
     return {"message": "Student verified successfully"}
 
 @router.delete("/subjects/{subject_id}/students/{student_id}")
@@ -343,7 +441,7 @@ async def remove_student(
     
     subject = await db.subjects.find_one(
         {"_id": subj_id, "professor_ids": prof_id},
-        {"_id": 1}
+        {"professor_ids": 1}
     )
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found or access denied")
@@ -352,10 +450,12 @@ async def remove_student(
         {"_id": subj_id},
         {"$pull": {"students": {"student_id": stud_id}}}
     )
+    invalidate_subject(subj_id)
 
     await db.students.update_one(
         {"userId": stud_id},
         {"$pull": {"subjects": subj_id}}
     )
+    await bump_subject(subject, stud_id)
 
     return {"message": "Student removed from subject"}
\ No newline at end of file
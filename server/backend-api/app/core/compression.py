@@ -0,0 +1,130 @@
+"""
+Response compression (brotli when the optional `brotli` package is
+installed and accepted, else gzip) for bodies above a size threshold.
+
+Streaming responses are compressed chunk by chunk with a sync flush, so
+clients still receive data as it is produced. Bytes before and after
+compression are recorded in app.utils.http_cache.http_stats.
+"""
+import zlib
+
+from app.core.config import HTTP_BROTLI_QUALITY, HTTP_COMPRESSION_MIN_SIZE, HTTP_GZIP_LEVEL
+from app.utils.http_cache import http_stats
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Already-compressed formats gain nothing
+SKIP_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip",
+              "application/vnd.openxmlformats")
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.compress(data)
+        return out + self._c.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+def _choose_encoding(accept: str):
+    accepted = {part.split(";")[0].strip() for part in accept.lower().split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware"""
+
+    def __init__(self, app, minimum_size: int = HTTP_COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        encoding = _choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+
+        start = None          # held back until we know whether to compress
+        pending = b""         # body bytes held back while below the threshold
+        compressor = None
+        passthrough = False
+
+        async def send_start(compressed: bool):
+            message = start
+            if compressed:
+                raw = [(k, v) for k, v in message["headers"] if k.lower() != b"content-length"]
+                raw.append((b"content-encoding", encoding.encode()))
+                vary = [v for k, v in raw if k.lower() == b"vary"]
+                if not vary:
+                    raw.append((b"vary", b"Accept-Encoding"))
+                elif b"accept-encoding" not in vary[0].lower():
+                    raw = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in raw]
+                message = {**message, "headers": raw}
+            await send(message)
+
+        async def send_wrapper(message):
+            nonlocal start, pending, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start = message
+                response_headers = {k.lower(): v for k, v in message["headers"]}
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (
+                    encoding is None
+                    or message["status"] in (204, 304)
+                    or b"content-encoding" in response_headers
+                    or content_type.startswith(SKIP_TYPES)
+                )
+                if passthrough:
+                    await send(start)
+                return
+
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            http_stats.bytes_uncompressed += len(body)
+
+            if passthrough:
+                http_stats.bytes_sent += len(body)
+                return await send(message)
+
+            if compressor is None:
+                pending += body
+                if len(pending) < self.minimum_size:
+                    if more:
+                        return
+                    # Whole body is small: send it as is
+                    await send_start(compressed=False)
+                    http_stats.bytes_sent += len(pending)
+                    return await send({"type": "http.response.body", "body": pending})
+
+                compressor = _Brotli(HTTP_BROTLI_QUALITY) if encoding == "br" else _Gzip(HTTP_GZIP_LEVEL)
+                http_stats.compressed_responses += 1
+                await send_start(compressed=True)
+                body, pending = pending, b""
+
+            out = compressor.compress(body, final=not more)
+            http_stats.bytes_sent += len(out)
+            await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
@@ -31,12 +31,43 @@ SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USER
+# Disable for local stand-ins such as `python -m aiosmtpd -n -l localhost:1025`
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "20"))
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "60"))
 BACKEND_BASE_URL = os.getenv("BACKEND_BASE_URL")
 
+# Email outbox worker (app/services/email_outbox.py)
+EMAIL_OUTBOX_ENABLED = os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+
 # ML Service Configuration
 ML_SERVICE_URL = os.getenv("ML_SERVICE_URL", "http://localhost:8001")
 ML_SERVICE_TIMEOUT = float(os.getenv("ML_SERVICE_TIMEOUT", "30"))
 ML_SERVICE_MAX_RETRIES = int(os.getenv("ML_SERVICE_MAX_RETRIES", "3"))
+ML_CONNECT_TIMEOUT = float(os.getenv("ML_CONNECT_TIMEOUT", "2"))
+# Per-endpoint read timeouts overriding ml_client.ENDPOINTS, e.g. "detect-faces=15,batch-match=5"
+ML_ENDPOINT_TIMEOUTS = {
+    name.strip(): float(seconds)
+    for name, _, seconds in (
+        item.partition("=") for item in os.getenv("ML_ENDPOINT_TIMEOUTS", "").split(",") if "=" in item
+    )
+}
+ML_RETRY_BACKOFF_BASE = float(os.getenv("ML_RETRY_BACKOFF_BASE", "0.2"))
+ML_RETRY_BACKOFF_MAX = float(os.getenv("ML_RETRY_BACKOFF_MAX", "2"))
+ML_POOL_MAX_CONNECTIONS = int(os.getenv("ML_POOL_MAX_CONNECTIONS", "20"))
+ML_POOL_MAX_KEEPALIVE = int(os.getenv("ML_POOL_MAX_KEEPALIVE", "10"))
+ML_POOL_TIMEOUT = float(os.getenv("ML_POOL_TIMEOUT", "5"))
+ML_BREAKER_FAILURE_THRESHOLD = int(os.getenv("ML_BREAKER_FAILURE_THRESHOLD", "5"))
+ML_BREAKER_RESET_SECONDS = float(os.getenv("ML_BREAKER_RESET_SECONDS", "30"))
+# Hedged requests for latency-sensitive endpoints (doubles load on slow calls)
+ML_HEDGE_ENABLED = os.getenv("ML_HEDGE_ENABLED", "false").lower() == "true"
+ML_HEDGE_DELAY_MS = float(os.getenv("ML_HEDGE_DELAY_MS", "500"))
 
 # ML Thresholds
 ML_CONFIDENT_THRESHOLD = float(os.getenv("ML_CONFIDENT_THRESHOLD", "0.50"))
@@ -46,3 +77,88 @@ CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 
+# Image storage backends (app/services/storage.py): local | cloudinary | s3
+FACE_STORAGE_BACKEND = os.getenv("FACE_STORAGE_BACKEND", "cloudinary")
+AVATAR_STORAGE_BACKEND = os.getenv("AVATAR_STORAGE_BACKEND", "local")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "app/static")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL")
+
+# Background face enrollment (app/services/enrollment_jobs.py)
+ENROLLMENT_WORKERS = int(os.getenv("ENROLLMENT_WORKERS", "2"))
+ENROLLMENT_BATCH_SIZE = min(int(os.getenv("ENROLLMENT_BATCH_SIZE", "8")), 32)  # ML /encode-faces limit
+ENROLLMENT_BATCH_LINGER = float(os.getenv("ENROLLMENT_BATCH_LINGER", "0.2"))
+ENROLLMENT_POLL_INTERVAL = float(os.getenv("ENROLLMENT_POLL_INTERVAL", "5"))
+ENROLLMENT_MAX_ATTEMPTS = int(os.getenv("ENROLLMENT_MAX_ATTEMPTS", "5"))
+ENROLLMENT_RETRY_BASE_SECONDS = float(os.getenv("ENROLLMENT_RETRY_BASE_SECONDS", "10"))
+
+# Admin endpoints (/admin/*) are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Sampling profiler (toggle at runtime via /admin/profiling)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+
+# In-process roster/embedding cache (invalidated on writes, TTL as a safety net)
+ROSTER_CACHE_TTL = float(os.getenv("ROSTER_CACHE_TTL", "60"))
+ROSTER_CACHE_SUBJECTS = int(os.getenv("ROSTER_CACHE_SUBJECTS", "256"))
+ROSTER_CACHE_STUDENTS = int(os.getenv("ROSTER_CACHE_STUDENTS", "2000"))
+
+# Password hashing: bcrypt cost (log2 rounds; changing it rehashes on next
+# login) and the dedicated thread pool it runs on
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_WAITING = int(os.getenv("PASSWORD_HASH_MAX_WAITING", "32"))
+
+# Login throttling: attempts per window, per client IP and per email
+LOGIN_THROTTLE_WINDOW = int(os.getenv("LOGIN_THROTTLE_WINDOW", "300"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+LOGIN_MAX_ATTEMPTS_PER_EMAIL = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_EMAIL", "10"))
+
+# Reverse proxies / load balancers in front of the app (comma-separated IPs
+# or CIDRs). Only requests from these peers have X-Forwarded-For honoured
+# when resolving the client IP (see app/utils/client_ip.py).
+TRUSTED_PROXIES = [p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()]
+
+# Resolved teacher principals, keyed by token id (see app/services/principal_cache.py)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+# Response compression (brotli needs the optional `brotli` package)
+HTTP_COMPRESSION_MIN_SIZE = int(os.getenv("HTTP_COMPRESSION_MIN_SIZE", "1024"))
+HTTP_GZIP_LEVEL = int(os.getenv("HTTP_GZIP_LEVEL", "6"))
+HTTP_BROTLI_QUALITY = int(os.getenv("HTTP_BROTLI_QUALITY", "4"))
+
+# Subject analytics cache (invalidated on attendance writes)
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "300"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "512"))
+
+# Logging: level and format ("json" for log shippers, "text" for a terminal)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# Prometheus metrics at GET /metrics; with METRICS_TOKEN set, scrapers must
+# send "Authorization: Bearer <token>". Off unless a token is configured;
+# METRICS_ENABLED=true serves it without one (private networks only)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true" if METRICS_TOKEN else "false").lower() == "true"
+
+# Vote tallies for /api/attendance/mark sessions live in worker memory;
+# new sessions are refused once this many are active on a worker
+LIVE_TALLY_MAX_SESSIONS = int(os.getenv("LIVE_TALLY_MAX_SESSIONS", "500"))
+
+# Offline sync: sessions accepted per POST /api/attendance/confirm/bulk
+ATTENDANCE_SYNC_MAX_SESSIONS = int(os.getenv("ATTENDANCE_SYNC_MAX_SESSIONS", "100"))
+
+# Attendance frames are normalised before the ML hop: downscaled so the
+# longer side is at most FRAME_MAX_SIDE px and re-encoded as JPEG. JPEGs
+# already within bounds and under FRAME_PASSTHROUGH_BYTES are forwarded as is.
+FRAME_MAX_SIDE = int(os.getenv("FRAME_MAX_SIDE", "1024"))
+FRAME_JPEG_QUALITY = int(os.getenv("FRAME_JPEG_QUALITY", "82"))
+FRAME_PASSTHROUGH_BYTES = int(os.getenv("FRAME_PASSTHROUGH_BYTES", "150000"))
+FRAME_MAX_UPLOAD_BYTES = int(os.getenv("FRAME_MAX_UPLOAD_BYTES", str(8 * 1024 * 1024)))
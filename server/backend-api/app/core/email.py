@@ -1,18 +1,34 @@
+"""
+Outgoing mail: message templates and a reusable SMTP session.
+
+Nothing here is called from request handlers. Handlers enqueue messages in
+the outbox (app/services/email_outbox.py), whose worker sends them through
+one SMTPSession from a dedicated thread.
+"""
 import smtplib
+import time
 from email.message import EmailMessage
-from .config import SMTP_HOST, SMTP_PASS, SMTP_PORT, SMTP_USER
+from typing import List, Optional
+
+from .config import (
+    SMTP_FROM,
+    SMTP_HOST,
+    SMTP_IDLE_TIMEOUT,
+    SMTP_PASS,
+    SMTP_PORT,
+    SMTP_STARTTLS,
+    SMTP_TIMEOUT,
+    SMTP_USER,
+)
 
-def send_verification_email(to_email: str, verification_link: str):
-    try:
-        print("SMTP CONFIG:", SMTP_HOST, SMTP_PORT, SMTP_USER)
+# Errors that will not go away by retrying the same message
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPNotSupportedError)
 
-        msg = EmailMessage()
-        msg["Subject"] = "Verify your email for Smart Attendance"
-        msg["From"] = SMTP_USER
-        msg["To"] = to_email
 
-        msg.set_content(
-            f"""
+def verification_email(verification_link: str) -> dict:
+    return {
+        "subject": "Verify your email for Smart Attendance",
+        "body": f"""
 Hi,
 
 Click the link below to verify your email:
@@ -21,15 +37,84 @@ Click the link below to verify your email:
 
 Thanks,
 Smart Attendance
-"""
-        )
+""",
+    }
+
+
+def build_message(to_email: str, subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = SMTP_FROM
+    msg["To"] = to_email
+    msg.set_content(body)
+    return msg
+
+
+class SMTPSession:
+    """
+    One SMTP connection, opened on first use and kept across batches.
+
+    STARTTLS and login happen once per connection instead of once per
+    message. The connection is dropped after SMTP_IDLE_TIMEOUT seconds
+    without sends, or as soon as the server closes it. Blocking: only use
+    it from a single worker thread.
+    """
+
+    def __init__(self):
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if SMTP_USER:
+                smtp.login(SMTP_USER, SMTP_PASS)
+        except Exception:
+            smtp.close()
+            raise
+        self.connections_opened += 1
+        return smtp
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT:
+            # The server has probably timed us out already
+            self.close()
+        if self._smtp is None:
+            self._smtp = self._connect()
+        return self._smtp
 
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=20) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.send_message(msg)
+    def send_batch(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        """Send each message; returns None or the error, per message"""
+        results: List[Optional[Exception]] = []
+        for msg in messages:
+            try:
+                try:
+                    self._connection().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Stale pooled connection: reconnect once and retry
+                    self.close()
+                    self._connection().send_message(msg)
+                results.append(None)
+            except Exception as e:
+                if not isinstance(e, PERMANENT_ERRORS):
+                    # Connection state unknown after a transient failure
+                    self.close()
+                results.append(e)
+            self._last_used = time.monotonic()
+        return results
 
-        print("Verification email sent to", to_email)
+    def close_if_idle(self):
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT:
+            self.close()
 
-    except Exception as e:
-        print("EMAIL ERROR:", str(e))
+    def close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
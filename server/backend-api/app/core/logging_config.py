@@ -0,0 +1,72 @@
+"""
+Structured, leveled logging for the API.
+
+configure_logging() sends every logger of the app to stderr, one record per
+line: JSON objects by default (LOG_FORMAT=json) or "key=value" text for a
+terminal. Each record carries the id of the request it was logged under
+(see app/core/request_timing.py), so a slow request in the access log can
+be joined with whatever it logged.
+
+Modules log through logging.getLogger(__name__) and pass structured fields
+as `extra`, never formatted into the message:
+
+    logger.warning("email failed", extra={"outbox_id": str(doc["_id"])})
+"""
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from .config import LOG_FORMAT, LOG_LEVEL
+from .request_timing import current_request_id
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    fields = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+    if "request_id" not in fields:
+        request_id = current_request_id()
+        if request_id:
+            fields["request_id"] = request_id
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    root = logging.getLogger()
+    # Replace, not add: safe to call again (e.g. under the reloader)
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    # Chatty at INFO and not ours
+    for name in ("pymongo", "httpx", "httpcore", "passlib"):
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
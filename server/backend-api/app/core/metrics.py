@@ -0,0 +1,159 @@
+"""
+Minimal in-process metrics registry, rendered in the Prometheus text format
+at GET /metrics.
+
+Two kinds of sources:
+- Counter / Histogram objects updated on the hot path (request timing,
+  Mongo commands, ML calls);
+- collectors: callables run at scrape time that turn the existing stats()
+  of caches, pools and workers into samples, so those components need no
+  second set of counters.
+
+Values are per worker process; Prometheus adds them up across targets.
+"""
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+# (labels, value)
+Sample = Tuple[Dict[str, object], Optional[float]]
+
+
+def _fmt_labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    if value is None:
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple((n, str(labels[n])) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_fmt_labels(dict(key))} {_fmt_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple((n, str(labels[n])) for n in self.labelnames)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            rows = sorted((k, list(v)) for k, v in self._values.items())
+        for key, row in rows:
+            labels = dict(key)
+            for bound, count in zip(self.buckets, row):
+                lines.append(f"{self.name}_bucket{_fmt_labels({**labels, 'le': _fmt_value(bound)})} {_fmt_value(count)}")
+            lines.append(f"{self.name}_bucket{_fmt_labels({**labels, 'le': '+Inf'})} {_fmt_value(row[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(labels)} {_fmt_value(row[-2])}")
+            lines.append(f"{self.name}_sum{_fmt_labels(labels)} {_fmt_value(row[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        # (name, type, help, collect)
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, name: str, type: str, help: str, collect: Callable[[], Iterable[Sample]]):
+        """`collect()` yields (labels, value) samples of `name`, read at scrape time"""
+        self._collectors.append((name, type, help, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, type, help, collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception:
+                continue  # one broken source must not take the scrape down
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# ---------------- SHARED INSTRUMENTS ----------------
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"),
+)
+http_request_mongo_seconds = registry.histogram(
+    "http_request_mongo_seconds", "Time per request spent in MongoDB commands", ("method", "route"),
+)
+http_request_ml_seconds = registry.histogram(
+    "http_request_ml_seconds", "Time per request spent waiting for the ML service", ("method", "route"),
+)
+mongo_command_seconds = registry.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command", "collection"),
+)
+mongo_command_failures = registry.counter(
+    "mongo_command_failures_total", "Failed MongoDB commands", ("command",),
+)
+ml_request_seconds = registry.histogram(
+    "ml_request_duration_seconds", "ML service call latency, retries included", ("endpoint", "outcome"),
+)
+
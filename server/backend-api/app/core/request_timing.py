@@ -0,0 +1,194 @@
+"""
+Per-request timing: where each request's time goes.
+
+TimingMiddleware opens a RequestTiming for every HTTP request and keeps it
+in a context variable. Two sources add to it while the request runs:
+
+- MongoTimingListener, a pymongo command listener. Motor runs each command
+  on its thread pool with a copy of the caller's context, so the listener
+  (called on that thread) still finds the request's RequestTiming;
+- MLClient._make_request, for every ML service call (retries included).
+
+When the request ends the middleware records, per route template:
+total latency, Mongo time and ML time (see app/core/metrics.py), adds a
+Server-Timing header the browser devtools and the load test read, and writes
+one structured access log line. Work outside requests (background workers)
+has no RequestTiming and only feeds the per-command histograms.
+"""
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+from .metrics import (
+    http_request_ml_seconds,
+    http_request_mongo_seconds,
+    http_request_seconds,
+    mongo_command_failures,
+    mongo_command_seconds,
+)
+
+access_log = logging.getLogger("app.access")
+
+
+class RequestTiming:
+    """
+    Durations are appended to lists (atomic under the GIL) because Mongo
+    commands of one request can finish concurrently on different threads.
+    """
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.mongo: List[float] = []
+        self.ml: List[float] = []
+
+    @property
+    def mongo_seconds(self) -> float:
+        return sum(self.mongo)
+
+    @property
+    def ml_seconds(self) -> float:
+        return sum(self.ml)
+
+    def server_timing(self, app_seconds: float) -> str:
+        return ", ".join([
+            f"app;dur={app_seconds * 1000:.1f}",
+            f'mongo;dur={self.mongo_seconds * 1000:.1f};desc="{len(self.mongo)} calls"',
+            f'ml;dur={self.ml_seconds * 1000:.1f};desc="{len(self.ml)} calls"',
+        ])
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _current.get()
+
+
+def current_request_id() -> Optional[str]:
+    timing = _current.get()
+    return timing.request_id if timing else None
+
+
+def add_ml_time(seconds: float):
+    timing = _current.get()
+    if timing is not None:
+        timing.ml.append(seconds)
+
+
+# ---------------- MONGO ----------------
+# Connection handshakes and driver housekeeping, not application queries
+_IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "saslStart", "saslContinue", "endSessions", "ping", "buildInfo"}
+
+
+def _collection(event: monitoring.CommandStartedEvent) -> str:
+    if event.command_name == "getMore":
+        return str(event.command.get("collection", ""))
+    target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else ""
+
+
+class MongoTimingListener(monitoring.CommandListener):
+    def __init__(self):
+        # (connection, request id) -> (command, collection), from started to succeeded/failed
+        self._inflight: Dict[Tuple, Tuple[str, str]] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        self._inflight[self._key(event)] = (event.command_name, _collection(event))
+
+    def _finish(self, event) -> Optional[Tuple[str, str]]:
+        labels = self._inflight.pop(self._key(event), None)
+        if labels is None:
+            return None
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_seconds.observe(seconds, command=labels[0], collection=labels[1])
+        timing = _current.get()
+        if timing is not None:
+            timing.mongo.append(seconds)
+        return labels
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        labels = self._finish(event)
+        if labels is not None:
+            mongo_command_failures.inc(command=labels[0])
+
+
+# ---------------- MIDDLEWARE ----------------
+def _route_template(scope) -> str:
+    """Path template of the matched route, so ids do not explode label cardinality"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware; add it outermost so the timing covers every other layer"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        timing = RequestTiming(request_id or uuid.uuid4().hex[:16])
+        token = _current.set(timing)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timing.server_timing(time.perf_counter() - started))
+                headers.append("X-Request-ID", timing.request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            _current.reset(token)
+            method = scope["method"]
+            route = _route_template(scope)
+            http_request_seconds.observe(duration, method=method, route=route, status=status)
+            http_request_mongo_seconds.observe(timing.mongo_seconds, method=method, route=route)
+            http_request_ml_seconds.observe(timing.ml_seconds, method=method, route=route)
+            access_log.info(
+                "request",
+                extra={
+                    "request_id": timing.request_id,
+                    "method": method,
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 1),
+                    "mongo_ms": round(timing.mongo_seconds * 1000, 1),
+                    "mongo_calls": len(timing.mongo),
+                    "ml_ms": round(timing.ml_seconds * 1000, 1),
+                    "ml_calls": len(timing.ml),
+                },
+            )
@@ -1,37 +1,23 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from app.core.config import settings  # adjust import if different
+from app.core.config import PASSWORD_HASH_MAX_WAITING, PASSWORD_HASH_ROUNDS, PASSWORD_HASH_WORKERS
+from app.utils.jwt_token import decode_jwt
 
 security = HTTPBearer(auto_error=False)
 
-JWT_SECRET = settings.JWT_SECRET
-JWT_ALGORITHM = settings.JWT_ALGORITHM
-
-def decode_jwt_token(token: str):
-    try:
-        if token.startswith("Bearer "):
-            token = token.split(" ")[1]
-
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET,
-            algorithms=[settings.JWT_ALGORITHM],
-        )
-        return payload
-    except JWTError as e:
-        print("JWT decode error:", e)
-        return None
-
 
-    
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials or not credentials.credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     token = credentials.credentials
-    payload = decode_jwt_token(token)
+    payload = decode_jwt(token)
     # print(settings.JWT_SECRET)
     
     if not payload:
@@ -51,10 +37,79 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         "email": payload.get("email")
     }
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min == max == default: hashes of any other cost are rehashed on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=PASSWORD_HASH_ROUNDS,
+    bcrypt__min_rounds=PASSWORD_HASH_ROUNDS,
+    bcrypt__max_rounds=PASSWORD_HASH_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+# ---------------- OFF-LOOP HASHING ----------------
+# bcrypt takes 100-300 ms of CPU per call (and releases the GIL while doing
+# so). Calling it inline froze the event loop, and every in-flight request
+# with it, for the duration of each login. The async helpers below run it on
+# a small dedicated pool instead; the semaphore bounds how many requests may
+# queue for that pool, beyond which logins get a 503 rather than piling up.
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_waiting: int):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = asyncio.Semaphore(workers + max_waiting)
+        self.calls = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_seconds = 0.0
+
+    async def _run(self, fn, *args):
+        if self._slots.locked():
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-ins in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            finally:
+                self.calls += 1
+                self.total_seconds += time.perf_counter() - started
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash); new_hash is set when the stored cost is outdated"""
+        valid, new_hash = await self._run(pwd_context.verify_and_update, password, hashed)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "rounds": PASSWORD_HASH_ROUNDS,
+            "workers": self.workers,
+            "max_waiting": self.max_waiting,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 2) if self.calls else None,
+        }
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_WAITING)
@@ -0,0 +1,25 @@
+"""
+Set `name_lower` on subjects created before the catalogue search existed.
+
+    python -m app.db.backfill_subject_names
+
+Idempotent; only subjects without the field are updated.
+"""
+import asyncio
+
+from app.db.indexes import ensure_indexes
+from app.db.mongo import db
+
+
+async def backfill() -> int:
+    await ensure_indexes()
+    result = await db.subjects.update_many(
+        {"name_lower": {"$exists": False}, "name": {"$type": "string"}},
+        [{"$set": {"name_lower": {"$toLower": "$name"}}}],
+    )
+    print(f"Backfilled name_lower on {result.modified_count} subjects")
+    return result.modified_count
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
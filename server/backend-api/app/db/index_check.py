@@ -0,0 +1,58 @@
+"""
+Query-plan check for the hot queries in app.db.indexes.HOT_QUERIES.
+
+Run against a local, disposable mongod (indexes are created on it):
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB=index_check python -m app.db.index_check
+
+Exits with status 1 if any winning plan contains a COLLSCAN, or a SORT
+stage for the sorted queries in HOT_SORTS.
+"""
+import asyncio
+import sys
+from typing import Iterator
+
+from app.db.indexes import HOT_QUERIES, HOT_SORTS, INDEXES, ensure_indexes
+from app.db.mongo import db
+
+
+def _stages(plan: dict) -> Iterator[str]:
+    """Every stage name in a (possibly nested) plan tree"""
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def check() -> int:
+    # explain() on a missing collection returns an EOF plan, which would pass
+    for collection in INDEXES:
+        if collection not in await db.list_collection_names():
+            await db.create_collection(collection)
+    await ensure_indexes()
+
+    failures = 0
+    for collection, query, label in HOT_QUERIES:
+        explained = await db[collection].find(query).explain()
+        stages = list(_stages(explained["queryPlanner"]["winningPlan"]))
+        ok = "COLLSCAN" not in stages
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {collection:<12} {label:<40} {' <- '.join(stages)}")
+
+    for collection, query, sort, label in HOT_SORTS:
+        explained = await db[collection].find(query).sort(sort).explain()
+        stages = list(_stages(explained["queryPlanner"]["winningPlan"]))
+        ok = "COLLSCAN" not in stages and "SORT" not in stages
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {collection:<12} {label + ' (sorted)':<40} {' <- '.join(stages)}")
+
+    total = len(HOT_QUERIES) + len(HOT_SORTS)
+    print(f"\n{total - failures}/{total} hot queries use an index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(check()))
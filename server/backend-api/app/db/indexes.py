@@ -0,0 +1,142 @@
+"""
+Central index registry.
+
+Every collection the code queries declares its indexes here, and
+`ensure_indexes()` applies them once at app startup. When adding a query on
+a new field, add the index below and the query shape to HOT_QUERIES so
+`python -m app.db.index_check` covers it.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.db.mongo import db
+
+logger = logging.getLogger(__name__)
+
+# Index options must stay identical to what is already deployed: MongoDB
+# refuses to re-create an index under the same name with different options.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel(
+            [("verification_token", ASCENDING)],
+            partialFilterExpression={"verification_token": {"$exists": True}},
+        ),
+    ],
+    "students": [
+        IndexModel(
+            [("userId", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"userId": {"$exists": True}},
+        ),
+    ],
+    "teachers": [
+        IndexModel(
+            [("userId", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"userId": {"$exists": True}},
+        ),
+        # Legacy teacher docs keyed by user_id (see get_current_teacher's $or)
+        IndexModel(
+            [("user_id", ASCENDING)],
+            partialFilterExpression={"user_id": {"$exists": True}},
+        ),
+    ],
+    "subjects": [
+        IndexModel([("code", ASCENDING)], unique=True),
+        IndexModel([("professor_ids", ASCENDING)]),
+        IndexModel([("students.student_id", ASCENDING)]),
+        # Catalogue prefix search (see app.db.backfill_subject_names)
+        IndexModel([("name_lower", ASCENDING)]),
+    ],
+    "attendance": [
+        IndexModel([("student_id", ASCENDING), ("date", DESCENDING)]),
+    ],
+    "attendance_events": [
+        # One event per student per session; also serves per-subject scans.
+        # (Time-series collections cannot carry unique indexes.)
+        IndexModel(
+            [("subject_id", ASCENDING), ("student_id", ASCENDING), ("session_id", ASCENDING)],
+            unique=True,
+        ),
+        IndexModel([("subject_id", ASCENDING), ("date", ASCENDING)]),
+        IndexModel([("student_id", ASCENDING), ("date", DESCENDING)]),
+    ],
+    "login_attempts": [
+        # Each counter expires at the end of its window (login_throttle)
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "email_outbox": [
+        # Worker claims: due pending/sending messages, oldest first
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        # Keep sent messages for a week
+        IndexModel([("sent_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "enrollment_jobs": [
+        # Worker claims: due queued/processing jobs, oldest first
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+    ],
+    "attendance_summaries": [
+        # Also the $merge key of the summary rebuild
+        IndexModel([("student_id", ASCENDING), ("subject_id", ASCENDING)], unique=True),
+        IndexModel([("subject_id", ASCENDING)]),
+    ],
+}
+
+
+# Representative filters of the hot paths, checked with explain() by
+# app.db.index_check. Values only need the right type.
+_OID = ObjectId()
+
+HOT_QUERIES = [
+    ("users", {"email": "someone@example.com"}, "login / register / resend verification"),
+    ("users", {"verification_token": "token"}, "email verification"),
+    ("users", {"_id": {"$in": [_OID]}}, "users loader"),
+    ("students", {"userId": {"$in": [_OID]}}, "students loader / roster cache"),
+    ("teachers", {"userId": _OID}, "teacher settings"),
+    ("teachers", {"$or": [{"user_id": _OID}, {"userId": _OID}]}, "get_current_teacher"),
+    ("subjects", {"code": "CS101"}, "subject lookup by code"),
+    ("subjects", {"professor_ids": _OID}, "teacher subject listing"),
+    ("subjects", {"students.student_id": _OID}, "subjects of a student"),
+    ("subjects", {"_id": _OID, "students.student_id": _OID}, "verify student"),
+    ("subjects", {"code": {"$gt": "CS101"}}, "catalogue page"),
+    ("subjects", {"$or": [{"code": {"$regex": "^CS"}}, {"name_lower": {"$regex": "^cs"}}]}, "catalogue search"),
+    ("attendance", {"student_id": _OID}, "attendance summary"),
+    ("attendance", {"student_id": _OID, "date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}}, "attendance range"),
+    ("attendance_events", {"subject_id": _OID}, "subject attendance counts"),
+    ("attendance_events", {"subject_id": _OID, "date": {"$gte": "2024-01-01"}}, "subject attendance by period"),
+    ("attendance_events", {"student_id": _OID}, "student attendance history"),
+    ("attendance_summaries", {"student_id": _OID}, "student profile summary"),
+    ("enrollment_jobs", {"status": {"$in": ["queued", "processing"]}, "next_attempt_at": {"$lte": datetime(2024, 1, 1)}}, "enrollment claim"),
+    ("email_outbox", {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": datetime(2024, 1, 1)}}, "outbox claim"),
+    ("attendance_summaries", {"subject_id": _OID}, "roster attendance counts"),
+]
+
+# Sorted hot queries: the index must also provide the order (no SORT stage)
+HOT_SORTS = [
+    (
+        "attendance_events",
+        {"subject_id": {"$in": [_OID, ObjectId()]}, "date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}},
+        [("subject_id", ASCENDING), ("date", ASCENDING)],
+        "report export",
+    ),
+]
+
+
+async def ensure_indexes():
+    """Create every registered index; existing ones are left untouched"""
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                # e.g. duplicate keys blocking a unique index: keep serving, but say so
+                logger.warning(
+                    "index not created",
+                    extra={"index": model.document["name"], "collection": collection, "error": str(e)},
+                )
@@ -0,0 +1,103 @@
+"""
+Request-scoped batching loaders (DataLoader pattern).
+
+Every `load(key)` issued in the same event-loop tick is coalesced into a
+single `{key_field: {"$in": [...]}}` query with a field projection, and
+results are memoised for the rest of the request. This replaces per-item
+`find_one` calls in loops (N+1 queries) and `next(...)` scans over lists.
+
+Get an instance per request with `Depends(get_loaders)` from app.api.deps.
+Loaded documents are shared between callers and must be treated as
+read-only; call `clear(key)` after writing a document you will re-read.
+"""
+import asyncio
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from app.db.mongo import db
+
+
+class Loader:
+    def __init__(self, collection: str, key_field: str, fields: Tuple[str, ...] = ()):
+        self.collection = collection
+        self.key_field = key_field
+        self.projection = {f: 1 for f in (*fields, key_field)} if fields else None
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        # The event loop only keeps weak references to tasks
+        self._dispatching: Set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable) -> Optional[dict]:
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                # Dispatch once the current tick has queued all its keys
+                loop.call_soon(self._start_dispatch)
+        return await future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, dict]:
+        """Docs keyed by lookup key; missing documents are left out"""
+        keys = list(dict.fromkeys(keys))
+        docs = await asyncio.gather(*(self.load(k) for k in keys))
+        return {k: d for k, d in zip(keys, docs) if d is not None}
+
+    def prime(self, key: Hashable, doc: dict):
+        if key not in self._futures:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(doc)
+            self._futures[key] = future
+
+    def clear(self, key: Hashable):
+        self._futures.pop(key, None)
+
+    def _start_dispatch(self):
+        task = asyncio.ensure_future(self._dispatch())
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        try:
+            cursor = db[self.collection].find({self.key_field: {"$in": keys}}, self.projection)
+            by_key = {doc[self.key_field]: doc async for doc in cursor}
+        except Exception as e:
+            for key in keys:
+                future = self._futures.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        for key in keys:
+            future = self._futures.get(key)
+            if future is not None and not future.done():
+                future.set_result(by_key.get(key))
+
+
+class Loaders:
+    """One loader per (collection, key, projection), created on first use"""
+
+    def __init__(self):
+        self._loaders: Dict[Tuple[Any, ...], Loader] = {}
+
+    def _get(self, collection: str, key_field: str, fields: Tuple[str, ...]) -> Loader:
+        ident = (collection, key_field, tuple(sorted(fields)))
+        loader = self._loaders.get(ident)
+        if loader is None:
+            loader = Loader(collection, key_field, ident[2])
+            self._loaders[ident] = loader
+        return loader
+
+    def users(self, *fields: str) -> Loader:
+        """users by _id"""
+        return self._get("users", "_id", fields)
+
+    def students(self, *fields: str) -> Loader:
+        """students by userId"""
+        return self._get("students", "userId", fields)
+
+    def subjects(self, *fields: str) -> Loader:
+        """subjects by _id"""
+        return self._get("subjects", "_id", fields)
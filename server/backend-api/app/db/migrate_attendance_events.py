@@ -0,0 +1,82 @@
+"""
+Migrate embedded `subjects.students[].attendance` counters to attendance_events.
+
+    python -m app.db.migrate_attendance_events [--unset]
+
+The embedded counters only hold totals, so each counted class becomes one
+legacy event (`session_id` "legacy-<n>", `date` None, `legacy` True); the
+last one carries `lastMarkedAt` as its date. Re-running is safe: events are
+upserted on their unique key. Summaries are rebuilt from the events
+afterwards, and `--unset` removes the counters.
+"""
+import asyncio
+import sys
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from app.db.indexes import ensure_indexes
+from app.db.mongo import db
+from app.services.attendance_events import ABSENT, PRESENT, events_col
+from app.services.attendance_summaries import rebuild
+
+BATCH_SIZE = 1000
+
+
+def legacy_events(subject_id, student: dict):
+    counters = student.get("attendance") or {}
+    present = int(counters.get("present") or 0)
+    absent = int(counters.get("absent") or 0)
+    total = present + absent
+
+    for n in range(total):
+        yield {
+            "subject_id": subject_id,
+            "student_id": student["student_id"],
+            "session_id": f"legacy-{n}",
+            "date": counters.get("lastMarkedAt") if n == total - 1 else None,
+            "status": PRESENT if n < present else ABSENT,
+            "marked_at": datetime.utcnow(),
+            "marked_by": None,
+            "legacy": True,
+        }
+
+
+async def migrate(unset: bool = False) -> int:
+    await ensure_indexes()
+
+    ops = []
+    migrated = 0
+    async for subject in db.subjects.find(
+        {"students.attendance": {"$exists": True}},
+        {"students.student_id": 1, "students.attendance": 1},
+    ):
+        for student in subject.get("students", []):
+            for event in legacy_events(subject["_id"], student):
+                ops.append(UpdateOne(
+                    {k: event[k] for k in ("subject_id", "student_id", "session_id")},
+                    {"$setOnInsert": event},
+                    upsert=True,
+                ))
+            if len(ops) >= BATCH_SIZE:
+                migrated += (await events_col.bulk_write(ops, ordered=False)).upserted_count
+                ops = []
+
+    if ops:
+        migrated += (await events_col.bulk_write(ops, ordered=False)).upserted_count
+
+    # Legacy events bypass the incremental summary updates
+    await rebuild()
+
+    if unset:
+        await db.subjects.update_many(
+            {"students.attendance": {"$exists": True}},
+            {"$unset": {"students.$[].attendance": ""}},
+        )
+
+    print(f"Inserted {migrated} legacy attendance events")
+    return migrated
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate(unset="--unset" in sys.argv[1:]))
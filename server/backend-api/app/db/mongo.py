@@ -2,10 +2,13 @@ import motor.motor_asyncio
 import os
 from dotenv import load_dotenv
 
+from app.core.request_timing import MongoTimingListener
+
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB", "smart_attendance")
 
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+# The listener times every command, per request and per collection
+client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI, event_listeners=[MongoTimingListener()])
 db = client[MONGO_DB]
@@ -0,0 +1,22 @@
+"""
+Recompute attendance_summaries from attendance_events.
+
+    python -m app.db.rebuild_attendance_summaries [subject_id]
+"""
+import asyncio
+import sys
+
+from bson import ObjectId
+
+from app.db.indexes import ensure_indexes
+from app.services.attendance_summaries import rebuild
+
+
+async def main(subject_id=None):
+    await ensure_indexes()
+    await rebuild(ObjectId(subject_id) if subject_id else None)
+    print(f"Rebuilt attendance summaries for {subject_id or 'all subjects'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*sys.argv[1:2]))
@@ -4,16 +4,13 @@ from app.db.mongo import db
 
 COLLECTION = "subjects"
 
-async def ensure_indexes():
-    await db[COLLECTION].create_index("code", unique=True)
-    await db[COLLECTION].create_index("professor_ids")
-    
 async def get_subject_by_code(code: str):
     return await db[COLLECTION].find_one({"code": code})
 
 async def create_subject(name: str, code: str, professor_id: ObjectId):
     doc = {
         "name": name,
+        "name_lower": name.lower(),
         "code": code,
         "professor_ids": [professor_id],
         "created_at": datetime.utcnow()
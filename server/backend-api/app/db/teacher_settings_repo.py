@@ -99,7 +99,8 @@ async def patch(user_id: str, patch_payload: Dict[str, Any]) -> Dict[str, Any]:
 
     _flatten("", remaining_payload, set_map)
 
-    if set_map:
+    # Stamped on every write, $addToSet-only ones included
+    if update_doc or set_map:
         set_map["updatedAt"] = datetime.utcnow()
         update_doc["$set"] = set_map
 
@@ -120,13 +121,3 @@ async def patch(user_id: str, patch_payload: Dict[str, Any]) -> Dict[str, Any]:
         upsert=True,
         return_document=ReturnDocument.AFTER,
     )
-
-
-
-async def create_index_once():
-    await db[COL].create_index(
-    "userId",
-    unique=True,
-    partialFilterExpression={"userId": {"$exists": True}}
-)
-
@@ -9,20 +9,34 @@ from starlette.middleware.sessions import SessionMiddleware
 
 from fastapi.staticfiles import StaticFiles  # for local files only
 
-from .core.config import APP_NAME, ORIGINS
+from .core.config import APP_NAME, EMAIL_OUTBOX_ENABLED, LOCAL_STORAGE_DIR, ORIGINS
 
 # Routes
 from .api.routes.auth import router as auth_router
 from .api.routes.students import router as students_router
 from .api.routes.attendance import router as attendance_router
+from .api.routes.admin import router as admin_router
+from .api.routes.analytics import router as analytics_router
+from .api.routes.reports import router as reports_router
+from .api.routes.subjects import router as subjects_router
+from .api.routes.metrics import router as metrics_router
+from .core.logging_config import configure_logging
+from .core.profiling import ProfilingMiddleware
+from .core.compression import CompressionMiddleware
+from .core.request_timing import TimingMiddleware
+from .core.security import password_hasher
 
 from app.api.routes import teacher_settings as settings_router
 from app.core.cloudinary_config import cloudinary
+from app.db.indexes import ensure_indexes
+from app.services.email_outbox import email_outbox
+from app.services.enrollment_jobs import enrollment_workers
 from app.services.ml_client import ml_client
 
 
 
 def create_app() -> FastAPI:
+    configure_logging()
     app = FastAPI(title=APP_NAME)
 
     # CORS
@@ -48,14 +62,53 @@ def create_app() -> FastAPI:
         https_only = False,
     )
 
+    app.add_middleware(CompressionMiddleware)
+
+    # Outside compression, sessions and CORS, so profiles cover all of them
+    app.add_middleware(ProfilingMiddleware)
+
+    # Outermost: per-request latency / Mongo / ML timing, profiling included
+    app.add_middleware(TimingMiddleware)
+
     # Routers
     app.include_router(auth_router)
     app.include_router(students_router)
     app.include_router(attendance_router)
     app.include_router(settings_router.router)
+    app.include_router(admin_router)
+    app.include_router(analytics_router)
+    app.include_router(reports_router)
+    app.include_router(subjects_router)
+    app.include_router(metrics_router)
     
-    # serve static files (avatars)
-    app.mount("/static", StaticFiles(directory="app/static"), name="static")
+    @app.on_event("startup")
+    async def _ensure_indexes():
+        await ensure_indexes()
+
+    @app.on_event("startup")
+    async def _start_email_outbox():
+        if EMAIL_OUTBOX_ENABLED:
+            email_outbox.start()
+
+    @app.on_event("startup")
+    async def _start_enrollment_workers():
+        enrollment_workers.start()
+
+    @app.on_event("shutdown")
+    async def _stop_enrollment_workers():
+        await enrollment_workers.stop()
+
+    @app.on_event("shutdown")
+    async def _stop_email_outbox():
+        await email_outbox.stop()
+
+    @app.on_event("shutdown")
+    async def _stop_password_hasher():
+        password_hasher.shutdown()
+
+    # serve static files (avatars, and any image on the local storage backend)
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount("/static", StaticFiles(directory=LOCAL_STORAGE_DIR), name="static")
 
     return app
 
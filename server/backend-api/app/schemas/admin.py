@@ -0,0 +1,9 @@
+from pydantic import BaseModel, StrictBool, confloat
+from typing import Optional
+
+
+class ProfilingConfig(BaseModel):
+    """PUT /admin/profiling; omitted fields keep their current value"""
+    enabled: Optional[StrictBool] = None
+    sample_rate: Optional[confloat(ge=0, le=1)] = None
+    interval_ms: Optional[confloat(gt=0)] = None
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, conlist, constr
 from datetime import date
 from typing import Optional
 
+from app.core.config import ATTENDANCE_SYNC_MAX_SESSIONS
+
 class AttendanceCreate(BaseModel):
     student_id: str
     class_id: str
@@ -13,3 +15,17 @@ class AttendanceCreate(BaseModel):
 class AttendanceOut(AttendanceCreate):
     id: str = Field(..., alias="_id")
     created_at: Optional[str]
+
+
+class SyncedSession(BaseModel):
+    """A reviewed session recorded while offline"""
+    idempotency_key: constr(min_length=8, max_length=128)
+    subject_id: str
+    date: date
+    period: Optional[int] = None
+    present_students: conlist(str, max_length=1000) = []
+    absent_students: conlist(str, max_length=1000) = []
+
+
+class BulkConfirmRequest(BaseModel):
+    sessions: conlist(SyncedSession, min_length=1, max_length=ATTENDANCE_SYNC_MAX_SESSIONS)
@@ -0,0 +1,206 @@
+"""
+Subject analytics computed with one $facet aggregation over attendance_events.
+
+Results are cached per (subject, range, thresholds, version). The version
+is the subject's persisted change counter (app/services/change_counters.py),
+bumped by every attendance write and roster change, so no worker serves an
+entry older than the last write.
+
+The per-student facets cover the students with events in range plus the
+subject's verified students without any, who count as 0%.
+"""
+from typing import Iterable, Optional
+
+from bson import ObjectId
+
+from app.core.config import ANALYTICS_CACHE_SIZE, ANALYTICS_CACHE_TTL
+from app.db.mongo import db
+from app.services.change_counters import subject_key, versions
+from app.utils.cache import TTLLRUCache
+
+events_col = db["attendance_events"]
+
+analytics_cache = TTLLRUCache(ANALYTICS_CACHE_SIZE, ANALYTICS_CACHE_TTL, "analytics")
+
+# Percentage buckets of the per-student distribution
+DISTRIBUTION_BOUNDARIES = [0, 50, 60, 70, 80, 90, 101]
+
+
+def _date_match(start: Optional[str], end: Optional[str]) -> dict:
+    if not start and not end:
+        return {}
+    bounds = {}
+    if start:
+        bounds["$gte"] = start
+    if end:
+        bounds["$lte"] = end
+    return {"date": bounds}
+
+
+def _rate(present, total):
+    return {"$cond": [
+        {"$gt": [total, 0]},
+        {"$round": [{"$multiply": [{"$divide": [present, total]}, 100]}, 2]},
+        0,
+    ]}
+
+
+_PRESENT = {"$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}}
+_TOTAL = {"$sum": 1}
+
+
+def _pipeline(subject_oid: ObjectId, start: Optional[str], end: Optional[str], warning: int, safe: int) -> list:
+    per_student = [
+        {"$group": {"_id": "$student_id", "present": _PRESENT, "total": _TOTAL}},
+        {"$set": {"percentage": _rate("$present", "$total")}},
+    ]
+    dated = {"$match": {"date": {"$type": "string"}}}
+
+    return [
+        {"$match": {"subject_id": subject_oid, **_date_match(start, end)}},
+        {"$facet": {
+            "overall": [
+                {"$group": {"_id": None, "present": _PRESENT, "total": _TOTAL, "sessions": {"$addToSet": "$session_id"}}},
+                {"$project": {
+                    "_id": 0,
+                    "present": 1,
+                    "absent": {"$subtract": ["$total", "$present"]},
+                    "total": 1,
+                    "rate": _rate("$present", "$total"),
+                    "sessions": {"$size": "$sessions"},
+                }},
+            ],
+            "daily": [
+                dated,
+                {"$group": {"_id": "$date", "present": _PRESENT, "total": _TOTAL}},
+                {"$sort": {"_id": 1}},
+                {"$project": {
+                    "_id": 0,
+                    "date": "$_id",
+                    "present": 1,
+                    "absent": {"$subtract": ["$total", "$present"]},
+                    "rate": _rate("$present", "$total"),
+                }},
+            ],
+            "weekly": [
+                dated,
+                {"$set": {"day": {"$dateFromString": {"dateString": "$date", "format": "%Y-%m-%d"}}}},
+                {"$group": {
+                    "_id": {"year": {"$isoWeekYear": "$day"}, "week": {"$isoWeek": "$day"}},
+                    "present": _PRESENT,
+                    "total": _TOTAL,
+                }},
+                {"$sort": {"_id.year": 1, "_id.week": 1}},
+                {"$project": {
+                    "_id": 0,
+                    "year": "$_id.year",
+                    "week": "$_id.week",
+                    "present": 1,
+                    "absent": {"$subtract": ["$total", "$present"]},
+                    "rate": _rate("$present", "$total"),
+                }},
+            ],
+            "distribution": per_student + [
+                {"$bucket": {
+                    "groupBy": "$percentage",
+                    "boundaries": DISTRIBUTION_BOUNDARIES,
+                    "default": "other",
+                    "output": {"students": {"$sum": 1}},
+                }},
+            ],
+            "risk": per_student + [
+                {"$group": {
+                    "_id": None,
+                    "at_risk": {"$sum": {"$cond": [{"$lt": ["$percentage", warning]}, 1, 0]}},
+                    "warning": {"$sum": {"$cond": [
+                        {"$and": [{"$gte": ["$percentage", warning]}, {"$lt": ["$percentage", safe]}]}, 1, 0
+                    ]}},
+                    "safe": {"$sum": {"$cond": [{"$gte": ["$percentage", safe]}, 1, 0]}},
+                }},
+                {"$project": {"_id": 0}},
+            ],
+            "students": per_student + [
+                {"$sort": {"percentage": 1}},
+                {"$project": {
+                    "_id": 0,
+                    "student_id": "$_id",
+                    "present": 1,
+                    "absent": {"$subtract": ["$total", "$present"]},
+                    "total": 1,
+                    "percentage": 1,
+                }},
+            ],
+        }},
+    ]
+
+
+def _add_unseen(facets: dict, unseen: int, warning: int, safe: int):
+    """Count students without events (0%) into the distribution and risk facets"""
+    if not unseen:
+        return
+    bucket = DISTRIBUTION_BOUNDARIES[0]
+    for b in facets["distribution"]:
+        if b["_id"] == bucket:
+            b["students"] += unseen
+            break
+    else:
+        facets["distribution"].insert(0, {"_id": bucket, "students": unseen})
+
+    risk = (facets["risk"] or [{"at_risk": 0, "warning": 0, "safe": 0}])[0]
+    band = "at_risk" if 0 < warning else "warning" if 0 < safe else "safe"
+    risk[band] += unseen
+    facets["risk"] = [risk]
+
+
+async def subject_analytics(
+    subject_oid: ObjectId,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    warning: int = 75,
+    safe: int = 85,
+    verified: Iterable[ObjectId] = (),
+) -> dict:
+    """
+    {overall, daily, weekly, distribution, risk, students} for a subject.
+
+    `verified` are the user ids of the subject's verified students; those
+    without events in range are included at 0%. students are sorted by
+    ascending percentage, with ObjectId student_id.
+    """
+    verified = frozenset(verified)
+    version = (await versions([subject_key(subject_oid)]))[subject_key(subject_oid)]
+    key = (str(subject_oid), start, end, warning, safe, version, verified)
+    result = analytics_cache.get(key)
+    if result is not None:
+        return result
+
+    facets = (await events_col.aggregate(_pipeline(subject_oid, start, end, warning, safe)).to_list(length=1))[0]
+
+    seen = {row["student_id"] for row in facets["students"]}
+    unseen = [
+        {"present": 0, "absent": 0, "total": 0, "percentage": 0, "student_id": oid}
+        for oid in verified
+        if oid not in seen
+    ]
+    _add_unseen(facets, len(unseen), warning, safe)
+
+    result = {
+        "range": {"start": start, "end": end},
+        "thresholds": {"warningVal": warning, "safeVal": safe},
+        "overall": (facets["overall"] or [{"present": 0, "absent": 0, "total": 0, "rate": 0, "sessions": 0}])[0],
+        "daily": facets["daily"],
+        "weekly": facets["weekly"],
+        "distribution": [
+            {
+                "from": b["_id"],
+                "to": min(DISTRIBUTION_BOUNDARIES[DISTRIBUTION_BOUNDARIES.index(b["_id"]) + 1], 100),
+                "students": b["students"],
+            }
+            for b in facets["distribution"]
+            if b["_id"] != "other"
+        ],
+        "risk": (facets["risk"] or [{"at_risk": 0, "warning": 0, "safe": 0}])[0],
+        "students": unseen + facets["students"],
+    }
+    analytics_cache.set(key, result)
+    return result
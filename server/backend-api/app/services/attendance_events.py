@@ -0,0 +1,171 @@
+"""
+Append-only attendance events.
+
+One document per (subject, student, session):
+
+    {subject_id, student_id, session_id, date, status, marked_at}
+
+`student_id` is the student's user id, like `subjects.students.student_id`.
+The unique index on (subject_id, student_id, session_id) makes recording
+idempotent: re-confirming a session only inserts the students it has not
+seen yet. When no session id is given the date is used, which keeps the
+previous "one mark per subject per day" behaviour.
+
+Offline sync (POST /api/attendance/confirm/bulk) uses the client's
+idempotency key as the session id, so a retried upload records nothing twice.
+Each key is bound to a fingerprint of the session it was first sent with
+(`attendance_sync_keys`), so a key reused for a different session is refused
+rather than merged into the first one.
+"""
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.db.mongo import db
+from app.services.attendance_summaries import apply_events
+from app.services.change_counters import bump, student_key, subject_key
+
+events_col = db["attendance_events"]
+sync_keys_col = db["attendance_sync_keys"]
+
+PRESENT = "present"
+ABSENT = "absent"
+
+DUPLICATE_KEY = 11000
+
+
+def session_key(session_id: Optional[str] = None, day: Optional[str] = None) -> str:
+    return session_id or day or date.today().isoformat()
+
+
+async def record_session(
+    subject_oid: ObjectId,
+    present_oids: Iterable[ObjectId],
+    absent_oids: Iterable[ObjectId],
+    session_id: Optional[str] = None,
+    marked_by: Optional[ObjectId] = None,
+) -> List[dict]:
+    """
+    Record one session for today (see record_sessions).
+
+    Returns the events that were newly inserted (students already marked in
+    this session are skipped).
+    """
+    today = date.today().isoformat()
+    [outcome] = await record_sessions([{
+        "subject_id": subject_oid,
+        "present": present_oids,
+        "absent": absent_oids,
+        "session_id": session_key(session_id, today),
+        "date": today,
+        "marked_by": marked_by,
+    }])
+    if outcome["error"]:
+        raise RuntimeError(outcome["error"])
+    return outcome["inserted"]
+
+
+def session_fingerprint(session: dict) -> str:
+    """Hash of what a synced session records; order of the student lists does not matter"""
+    canonical = {
+        "subject_id": str(session["subject_id"]),
+        "date": session["date"],
+        "period": session.get("period"),
+        "present": sorted(str(oid) for oid in session["present"]),
+        "absent": sorted(str(oid) for oid in session["absent"]),
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+async def bind_sync_keys(fingerprints: Dict[str, str]) -> Dict[str, bool]:
+    """
+    Bind each idempotency key to its session fingerprint, first use wins.
+
+    Returns, per key, whether it is bound to this fingerprint (first use, or
+    a retry of the same session). Concurrent requests race on the _id.
+    """
+    if not fingerprints:
+        return {}
+    now = datetime.utcnow()
+    await sync_keys_col.bulk_write(
+        [
+            UpdateOne({"_id": key}, {"$setOnInsert": {"fingerprint": fp, "created_at": now}}, upsert=True)
+            for key, fp in fingerprints.items()
+        ],
+        ordered=False,
+    )
+    bound = {d["_id"]: d["fingerprint"] async for d in sync_keys_col.find({"_id": {"$in": list(fingerprints)}})}
+    return {key: bound.get(key) == fp for key, fp in fingerprints.items()}
+
+
+async def record_sessions(sessions: List[dict]) -> List[dict]:
+    """
+    Insert one event per marked student of every session with a single
+    bulk_write, and fold the new ones into attendance_summaries.
+
+    Each session: {subject_id, present, absent, session_id, date, period?,
+    marked_by?}. Returns, per session in order:
+    {"inserted": [new events], "error": None or a message}. Students already
+    marked in a session are skipped; that includes a concurrent request
+    having recorded the same mark first (duplicate key).
+    """
+    now = datetime.utcnow()
+
+    events, owners = [], []
+    for i, session in enumerate(sessions):
+        for status, key in ((PRESENT, "present"), (ABSENT, "absent")):
+            for oid in session[key]:
+                event = {
+                    "subject_id": session["subject_id"],
+                    "student_id": oid,
+                    "session_id": session["session_id"],
+                    "date": session["date"],
+                    "status": status,
+                    "marked_at": now,
+                    "marked_by": session.get("marked_by"),
+                }
+                if session.get("period") is not None:
+                    event["period"] = session["period"]
+                events.append(event)
+                owners.append(i)
+
+    outcomes = [{"inserted": [], "error": None} for _ in sessions]
+    if not events:
+        return outcomes
+
+    ops = [
+        UpdateOne(
+            {k: e[k] for k in ("subject_id", "student_id", "session_id")},
+            {"$setOnInsert": e},
+            upsert=True,
+        )
+        for e in events
+    ]
+    try:
+        result = await events_col.bulk_write(ops, ordered=False)
+        upserted = result.upserted_ids
+    except BulkWriteError as e:
+        # Unordered: every other operation was still applied
+        upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+        for error in e.details.get("writeErrors", []):
+            if error.get("code") != DUPLICATE_KEY:
+                outcomes[owners[error["index"]]]["error"] = error.get("errmsg", "write failed")
+
+    inserted = []
+    for i, _id in upserted.items():
+        events[i]["_id"] = _id
+        inserted.append(events[i])
+        outcomes[owners[i]]["inserted"].append(events[i])
+
+    await apply_events(inserted)
+    if inserted:
+        await bump(
+            *(subject_key(e["subject_id"]) for e in inserted),
+            *(student_key(e["student_id"]) for e in inserted),
+        )
+    return outcomes
@@ -0,0 +1,152 @@
+"""
+Materialized attendance summaries, one document per (student, subject):
+
+    {student_id, subject_id, present, absent, total, percentage,
+     last_marked, recent: [{event_id, session_id, date, period, status}], updated_at}
+
+Each newly inserted attendance event is folded in with a pipeline update, so
+concurrent confirms never lose increments. `rebuild()` recomputes documents
+from the raw events (after a migration, or if the two ever disagree).
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.db.mongo import db
+
+summaries_col = db["attendance_summaries"]
+events_col = db["attendance_events"]
+
+RECENT_LIMIT = 10
+
+
+def _recent_item(event: dict) -> dict:
+    return {
+        "event_id": event.get("_id"),
+        "session_id": event["session_id"],
+        "date": event.get("date"),
+        "period": event.get("period"),
+        "status": event["status"],
+    }
+
+
+def _percentage(present, total):
+    return {"$cond": [
+        {"$gt": [total, 0]},
+        {"$round": [{"$multiply": [{"$divide": [present, total]}, 100]}, 2]},
+        0,
+    ]}
+
+
+async def apply_events(events: List[dict]):
+    """Fold newly inserted events into their summaries (one bulk_write)"""
+    grouped: Dict[tuple, List[dict]] = defaultdict(list)
+    for e in events:
+        grouped[(e["student_id"], e["subject_id"])].append(e)
+    if not grouped:
+        return
+
+    now = datetime.utcnow()
+    ops = []
+    for (student_id, subject_id), items in grouped.items():
+        present = sum(1 for e in items if e["status"] == "present")
+        absent = len(items) - present
+        newest_first = [_recent_item(e) for e in reversed(items)]
+        last_marked = max((e.get("date") or "" for e in items), default="") or None
+
+        ops.append(UpdateOne(
+            {"student_id": student_id, "subject_id": subject_id},
+            [
+                {"$set": {
+                    "present": {"$add": [{"$ifNull": ["$present", 0]}, present]},
+                    "absent": {"$add": [{"$ifNull": ["$absent", 0]}, absent]},
+                    "recent": {"$slice": [
+                        {"$concatArrays": [{"$literal": newest_first}, {"$ifNull": ["$recent", []]}]},
+                        RECENT_LIMIT,
+                    ]},
+                    "last_marked": {"$max": ["$last_marked", last_marked]},
+                    "updated_at": now,
+                }},
+                {"$set": {"total": {"$add": ["$present", "$absent"]}}},
+                {"$set": {"percentage": _percentage("$present", "$total")}},
+            ],
+            upsert=True,
+        ))
+
+    await summaries_col.bulk_write(ops, ordered=False)
+
+
+async def get_student_summaries(student_oid: ObjectId) -> List[dict]:
+    """All subject summaries of a student (one indexed query)"""
+    return await summaries_col.find({"student_id": student_oid}).to_list(length=None)
+
+
+async def get_subject_summaries(
+    subject_oid: ObjectId,
+    student_oids: Optional[List[ObjectId]] = None,
+) -> Dict[ObjectId, dict]:
+    """{student_id: {"present", "absent", "lastMarkedAt"}} for a subject roster (or part of it)"""
+    query = {"subject_id": subject_oid}
+    if student_oids is not None:
+        query["student_id"] = {"$in": student_oids}
+
+    cursor = summaries_col.find(
+        query,
+        {"student_id": 1, "present": 1, "absent": 1, "last_marked": 1},
+    )
+    return {
+        s["student_id"]: {
+            "present": s.get("present", 0),
+            "absent": s.get("absent", 0),
+            "lastMarkedAt": s.get("last_marked"),
+        }
+        async for s in cursor
+    }
+
+
+async def rebuild(subject_oid: Optional[ObjectId] = None):
+    """Recompute summaries from attendance_events (all subjects, or one)"""
+    match = {"subject_id": subject_oid} if subject_oid else {}
+    started = datetime.utcnow()
+
+    await events_col.aggregate([
+        {"$match": match},
+        {"$sort": {"marked_at": -1, "_id": -1}},
+        {"$group": {
+            "_id": {"student_id": "$student_id", "subject_id": "$subject_id"},
+            "present": {"$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}},
+            "absent": {"$sum": {"$cond": [{"$eq": ["$status", "absent"]}, 1, 0]}},
+            "last_marked": {"$max": "$date"},
+            "recent": {"$push": {
+                "event_id": "$_id",
+                "session_id": "$session_id",
+                "date": "$date",
+                "period": "$period",
+                "status": "$status",
+            }},
+        }},
+        {"$project": {
+            "_id": 0,
+            "student_id": "$_id.student_id",
+            "subject_id": "$_id.subject_id",
+            "present": 1,
+            "absent": 1,
+            "total": {"$add": ["$present", "$absent"]},
+            "percentage": _percentage("$present", {"$add": ["$present", "$absent"]}),
+            "last_marked": 1,
+            "recent": {"$slice": ["$recent", RECENT_LIMIT]},
+            "updated_at": {"$literal": started},
+        }},
+        {"$merge": {
+            "into": "attendance_summaries",
+            "on": ["student_id", "subject_id"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }},
+    ]).to_list(length=None)
+
+    # Summaries whose events no longer exist were not touched by the merge
+    await summaries_col.delete_many({**match, "updated_at": {"$lt": started}})
@@ -0,0 +1,70 @@
+"""
+Persisted change counters, used as version-based ETag inputs.
+
+Each key is a document {_id: key, v: int} in `change_counters`. Write paths
+bump the keys whose readers must see a new version; readers fetch the
+current versions with one indexed query and never need to rebuild a
+response to know whether it changed. Counters live in MongoDB rather than in
+process memory, so every worker agrees on them.
+
+Keys:
+    catalogue                   subject catalogue (/students/me/available-subjects)
+    teacher_subjects:<user_id>  subjects taught by a teacher (/settings/my-subjects)
+    settings:<user_id>          a teacher's settings document and profile (/settings)
+    student:<user_id>           a student's profile, subjects and attendance
+    subject:<subject_id>        a subject's attendance analytics (events and roster)
+"""
+from typing import Dict, Iterable
+
+from pymongo import UpdateOne
+
+from app.db.mongo import db
+
+counters_col = db["change_counters"]
+
+
+def catalogue_key() -> str:
+    return "catalogue"
+
+
+def teacher_subjects_key(user_id) -> str:
+    return f"teacher_subjects:{user_id}"
+
+
+def settings_key(user_id) -> str:
+    return f"settings:{user_id}"
+
+
+def student_key(user_id) -> str:
+    return f"student:{user_id}"
+
+
+def subject_key(subject_id) -> str:
+    return f"subject:{subject_id}"
+
+
+async def bump(*keys: str):
+    """Advance every key by one (single bulk_write)"""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return
+    await counters_col.bulk_write(
+        [UpdateOne({"_id": k}, {"$inc": {"v": 1}}, upsert=True) for k in keys],
+        ordered=False,
+    )
+
+
+async def bump_subject(subject: dict, *student_ids):
+    """After a subject's roster changes: its analytics, its professors' listings and the given students"""
+    await bump(
+        subject_key(subject["_id"]),
+        *(teacher_subjects_key(p) for p in subject.get("professor_ids", [])),
+        *(student_key(s) for s in student_ids),
+    )
+
+
+async def versions(keys: Iterable[str]) -> Dict[str, int]:
+    """Current version of each key (0 if never bumped)"""
+    keys = list(keys)
+    found = {d["_id"]: d["v"] async for d in counters_col.find({"_id": {"$in": keys}})}
+    return {k: found.get(k, 0) for k in keys}
@@ -0,0 +1,197 @@
+"""
+Persisted outbound email queue.
+
+Request handlers call enqueue(), which only inserts a document into
+`email_outbox`; registration latency no longer depends on the SMTP server.
+A worker task started with the app claims due messages in batches and sends
+them through one pooled SMTPSession on a dedicated thread, retrying
+transient failures with exponential backoff.
+
+Document states: pending -> sending -> sent | failed. Claiming a message
+pushes its next_attempt_at forward by CLAIM_LEASE_SECONDS, so a message left
+in `sending` by a crashed worker becomes due again on its own; with several
+app workers, each message is claimed by exactly one of them.
+"""
+import asyncio
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument, UpdateOne
+
+from app.core.config import (
+    EMAIL_BATCH_SIZE,
+    EMAIL_MAX_ATTEMPTS,
+    EMAIL_POLL_INTERVAL,
+    EMAIL_RETRY_BASE_SECONDS,
+    EMAIL_RETRY_MAX_SECONDS,
+)
+from app.core.email import PERMANENT_ERRORS, SMTPSession, build_message, verification_email
+from app.db.mongo import db
+
+logger = logging.getLogger(__name__)
+
+outbox_col = db["email_outbox"]
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+CLAIM_LEASE_SECONDS = 300
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with +-20% jitter, capped at EMAIL_RETRY_MAX_SECONDS"""
+    delay = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class EmailOutbox:
+    def __init__(self):
+        self._session = SMTPSession()
+        # A single thread owns the SMTP connection
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.enqueued = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+
+    # ---------------- PRODUCER ----------------
+    async def enqueue(self, to_email: str, subject: str, body: str, kind: str = "generic"):
+        now = datetime.utcnow()
+        await outbox_col.insert_one({
+            "to": to_email,
+            "subject": subject,
+            "body": body,
+            "kind": kind,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        })
+        self.enqueued += 1
+        if self._wake is not None:
+            self._wake.set()
+
+    # ---------------- WORKER ----------------
+    def start(self):
+        if self._task is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._session.close)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                processed = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("email outbox batch failed")
+                processed = 0
+
+            if processed >= EMAIL_BATCH_SIZE:
+                continue  # more may be due right away
+
+            await loop.run_in_executor(self._executor, self._session.close_if_idle)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=EMAIL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, now: datetime):
+        docs = []
+        lease_until = now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        for _ in range(EMAIL_BATCH_SIZE):
+            doc = await outbox_col.find_one_and_update(
+                {"status": {"$in": [PENDING, SENDING]}, "next_attempt_at": {"$lte": now}},
+                {"$set": {"status": SENDING, "next_attempt_at": lease_until}},
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                break
+            docs.append(doc)
+        return docs
+
+    async def process_batch(self) -> int:
+        """Claim and send one batch of due messages; returns how many were claimed"""
+        now = datetime.utcnow()
+        docs = await self._claim(now)
+        if not docs:
+            return 0
+
+        messages = [build_message(d["to"], d["subject"], d["body"]) for d in docs]
+        results = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._session.send_batch, messages
+        )
+        self.batches += 1
+
+        now = datetime.utcnow()
+        ops = []
+        for doc, error in zip(docs, results):
+            if error is None:
+                self.sent += 1
+                ops.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"status": SENT, "sent_at": now}, "$unset": {"next_attempt_at": ""}},
+                ))
+                continue
+
+            attempts = doc["attempts"] + 1
+            if isinstance(error, PERMANENT_ERRORS) or attempts >= EMAIL_MAX_ATTEMPTS:
+                self.failed += 1
+                logger.warning(
+                    "email failed",
+                    extra={"outbox_id": str(doc["_id"]), "kind": doc.get("kind"), "attempts": attempts, "error": str(error)},
+                )
+                update = {"status": FAILED, "failed_at": now}
+                unset = {"next_attempt_at": ""}
+            else:
+                self.retried += 1
+                update = {"status": PENDING, "next_attempt_at": now + timedelta(seconds=retry_delay(attempts))}
+                unset = {}
+            update.update({"attempts": attempts, "last_error": str(error)[:500]})
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update, **({"$unset": unset} if unset else {})}))
+
+        await outbox_col.bulk_write(ops, ordered=False)
+        return len(docs)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+            "smtp_connections_opened": self._session.connections_opened,
+        }
+
+
+email_outbox = EmailOutbox()
+
+
+async def enqueue_verification_email(to_email: str, verification_link: str):
+    await email_outbox.enqueue(to_email, kind="verification", **verification_email(verification_link))
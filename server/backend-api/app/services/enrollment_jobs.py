@@ -0,0 +1,305 @@
+"""
+Background face enrollment.
+
+POST /students/me/face-image only validates the image and inserts a job
+into `enrollment_jobs` (the image travels in the job document). Worker tasks
+started with the app claim queued jobs in batches, store each image while
+encoding the whole batch with one /encode-faces call, and then save the
+embedding on the student. At most ENROLLMENT_WORKERS batches are in flight
+per process, so an onboarding spike queues up instead of competing with
+live attendance requests for the ML service.
+
+Job states: queued -> processing -> succeeded | failed. Claiming a job
+counts an attempt and leases it for CLAIM_LEASE_SECONDS; a job whose worker
+died becomes due again when the lease runs out. Transient errors (ML service
+or storage unreachable) are retried with backoff up to ENROLLMENT_MAX_ATTEMPTS;
+an image the ML service rejects (no face, several faces) fails right away.
+"""
+import asyncio
+import base64
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from bson import Binary, ObjectId
+from pymongo import ReturnDocument
+
+from app.core.config import (
+    ENROLLMENT_BATCH_LINGER,
+    ENROLLMENT_BATCH_SIZE,
+    ENROLLMENT_MAX_ATTEMPTS,
+    ENROLLMENT_POLL_INTERVAL,
+    ENROLLMENT_RETRY_BASE_SECONDS,
+    ENROLLMENT_WORKERS,
+)
+from app.db.mongo import db
+from app.services.change_counters import bump, student_key
+from app.services.ml_client import ml_client
+from app.services.roster_cache import invalidate_student
+from app.services.storage import StorageError, storage_for
+
+logger = logging.getLogger(__name__)
+
+jobs_col = db["enrollment_jobs"]
+
+QUEUED = "queued"
+PROCESSING = "processing"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+CLAIM_LEASE_SECONDS = 300
+
+FACE_EXTENSIONS = {"image/jpeg": ".jpg", "image/jpg": ".jpg", "image/png": ".png"}
+
+# Same options the synchronous upload used
+ENCODE_OPTIONS = {"validate_single": True, "min_face_area_ratio": 0.05, "num_jitters": 5}
+
+
+class TransientError(Exception):
+    pass
+
+
+def _retry_delay(attempts: int) -> float:
+    return ENROLLMENT_RETRY_BASE_SECONDS * 2 ** (attempts - 1) * random.uniform(0.8, 1.2)
+
+
+def public_job(job: dict) -> dict:
+    """Job as returned to its student (never the image)"""
+    return {
+        "job_id": str(job["_id"]),
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "image_url": job.get("image_url"),
+        "error": job.get("error"),
+        "created_at": job.get("created_at"),
+        "updated_at": job.get("updated_at"),
+    }
+
+
+class EnrollmentWorkers:
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self.submitted = 0
+        self.succeeded = 0
+        self.rejected = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched_jobs = 0
+
+    # ---------------- PRODUCER ----------------
+    async def submit(self, student_user_id: ObjectId, image: bytes, content_type: str) -> dict:
+        now = datetime.utcnow()
+        job = {
+            "student_id": student_user_id,
+            "status": QUEUED,
+            "attempts": 0,
+            "image": Binary(image),
+            "content_type": content_type,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        job["_id"] = (await jobs_col.insert_one(job)).inserted_id
+        self.submitted += 1
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    async def get(self, job_id: ObjectId, student_user_id: ObjectId) -> Optional[dict]:
+        return await jobs_col.find_one({"_id": job_id, "student_id": student_user_id}, {"image": 0})
+
+    # ---------------- WORKERS ----------------
+    def start(self):
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(ENROLLMENT_WORKERS)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("enrollment batch failed")
+                processed = 0
+
+            if processed:
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=ENROLLMENT_POLL_INTERVAL)
+                # Woken by a submission: give a burst a moment to fill the batch
+                await asyncio.sleep(ENROLLMENT_BATCH_LINGER)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> List[dict]:
+        now = datetime.utcnow()
+        jobs = []
+        for _ in range(ENROLLMENT_BATCH_SIZE):
+            job = await jobs_col.find_one_and_update(
+                {"status": {"$in": [QUEUED, PROCESSING]}, "next_attempt_at": {"$lte": now}},
+                {
+                    "$set": {
+                        "status": PROCESSING,
+                        "next_attempt_at": now + timedelta(seconds=CLAIM_LEASE_SECONDS),
+                        "updated_at": now,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                break
+            if job["attempts"] > ENROLLMENT_MAX_ATTEMPTS:
+                # Its workers kept dying mid-job (lease expiries, not errors)
+                self.failed += 1
+                await self._fail(job, "Enrollment was interrupted too many times")
+                continue
+            jobs.append(job)
+        return jobs
+
+    async def process_batch(self) -> int:
+        """Claim and process one batch; returns how many jobs were claimed"""
+        jobs = await self._claim()
+        if not jobs:
+            return 0
+        self.batches += 1
+        self.batched_jobs += len(jobs)
+
+        storage = storage_for("faces")
+        keys = [f"student_faces/{j['student_id']}_{j['_id']}{FACE_EXTENSIONS.get(j['content_type'], '')}" for j in jobs]
+        puts = [
+            asyncio.create_task(storage.put(key, bytes(j["image"]), j["content_type"]))
+            for key, j in zip(keys, jobs)
+        ]
+
+        # One encode call for the batch, overlapping the uploads
+        try:
+            response = await ml_client.encode_faces(
+                [base64.b64encode(j["image"]).decode("utf-8") for j in jobs],
+                **ENCODE_OPTIONS,
+            )
+            if not response.get("success") or len(response.get("results", [])) != len(jobs):
+                raise TransientError(response.get("error") or "Unexpected encode response")
+            encodings = response["results"]
+            encode_error = None
+        except Exception as e:
+            encodings = [None] * len(jobs)
+            encode_error = e
+
+        uploads = await asyncio.gather(*puts, return_exceptions=True)
+
+        for job, key, encoding, upload in zip(jobs, keys, encodings, uploads):
+            try:
+                await self._finish(job, key, encoding, upload, encode_error)
+            except Exception:
+                # Leave it to the lease: the job becomes due again
+                logger.exception("enrollment job failed", extra={"job_id": str(job["_id"])})
+        return len(jobs)
+
+    async def _finish(self, job, key, encoding, upload, encode_error):
+        uploaded = not isinstance(upload, BaseException)
+
+        if encode_error is None and encoding.get("success") and uploaded:
+            await self._save(job, key, upload, encoding["embedding"])
+            return
+
+        if uploaded:
+            try:
+                await storage_for("faces").delete(key)
+            except StorageError as e:
+                logger.warning("failed to discard face image upload", extra={"key": key, "error": str(e)})
+
+        if encode_error is None and not encoding.get("success"):
+            # The image itself was rejected: retrying will not help
+            self.rejected += 1
+            await self._fail(job, f"Face encoding failed: {encoding.get('error', 'Unknown error')}")
+            return
+
+        error = encode_error or upload
+        if job["attempts"] >= ENROLLMENT_MAX_ATTEMPTS:
+            self.failed += 1
+            await self._fail(job, f"Enrollment failed after {job['attempts']} attempts: {error}")
+            return
+
+        self.retried += 1
+        now = datetime.utcnow()
+        await jobs_col.update_one({"_id": job["_id"]}, {"$set": {
+            "status": QUEUED,
+            "next_attempt_at": now + timedelta(seconds=_retry_delay(job["attempts"])),
+            "updated_at": now,
+            "last_error": str(error)[:500],
+        }})
+
+    async def _fail(self, job, error: str):
+        await jobs_col.update_one({"_id": job["_id"]}, {
+            "$set": {"status": FAILED, "error": error, "updated_at": datetime.utcnow()},
+            "$unset": {"image": "", "next_attempt_at": ""},
+        })
+
+    async def _save(self, job, key: str, image_url: str, embedding: List[float]):
+        student_user_id = job["student_id"]
+        # Keys are unique per job: a retry after the student was already
+        # updated (e.g. the status write below failed) matches nothing,
+        # instead of pushing the embedding a second time
+        previous = await db.students.find_one_and_update(
+            {"userId": student_user_id, "image_key": {"$ne": key}},
+            {
+                "$set": {
+                    "image_url": image_url,
+                    "image_key": key,
+                    "verified": True
+                },
+                "$push": {
+                    "face_embeddings": embedding
+                }
+            },
+            projection={"image_key": 1},
+        )
+        invalidate_student(student_user_id)
+        await bump(student_key(student_user_id))
+
+        await jobs_col.update_one({"_id": job["_id"]}, {
+            "$set": {"status": SUCCEEDED, "image_url": image_url, "updated_at": datetime.utcnow()},
+            "$unset": {"image": "", "next_attempt_at": ""},
+        })
+        self.succeeded += 1
+
+        # Keys are unique per job, so the replaced image is not overwritten:
+        # remove it (best effort)
+        if previous and previous.get("image_key") and previous["image_key"] != key:
+            try:
+                await storage_for("faces").delete(previous["image_key"])
+            except StorageError as e:
+                logger.warning(
+                    "failed to delete replaced face image",
+                    extra={"key": previous["image_key"], "error": str(e)},
+                )
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "rejected": self.rejected,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_jobs / self.batches, 2) if self.batches else None,
+        }
+
+
+enrollment_workers = EnrollmentWorkers()
@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import ML_CONFIDENT_THRESHOLD, ML_UNCERTAIN_THRESHOLD
+from app.db.loaders import Loaders
+from app.services.ml_client import ml_client
+from app.services.roster_cache import embedding_lists, get_students, get_subject
+from app.services.vote_tally import SESSION_TTL_SECONDS, VoteTally, tallies
+from app.utils.frames import scale_box
+
+
+@dataclass
+class LiveSession:
+    """
+    Everything a frame needs, resolved once at session start.
+
+    The roster, the ML gallery version and the thresholds are pinned for the
+    session's lifetime, so frames do no database work at all. Should the
+    pinned version be pruned anyway, the session re-pins to the current one.
+    """
+    id: str
+    subject_id: str
+    teacher_id: str
+    roster: Dict[str, dict]
+    gallery_id: str
+    gallery_version: int
+    confident_threshold: float
+    uncertain_threshold: float
+    tally: VoteTally
+    started_at: float = field(default_factory=time.time)
+
+
+# ML service error for a pinned gallery version that no longer exists
+GALLERY_VERSION_MISSING = "Gallery version not found"
+
+
+def gallery_id_for(subject_id: str) -> str:
+    return f"subject-{subject_id}"
+
+
+def gallery_fingerprint(candidates: List[dict]) -> str:
+    """Cheap content fingerprint: who is enrolled and how many embeddings each has"""
+    h = hashlib.sha1()
+    for c in sorted(candidates, key=lambda c: c["student_id"]):
+        h.update(f"{c['student_id']}:{len(c['embeddings'])};".encode())
+    return h.hexdigest()
+
+
+async def load_roster(subject_oid: ObjectId, loaders: Loaders) -> Tuple[Optional[dict], Dict[str, dict], List[dict]]:
+    """
+    Returns (subject, roster, candidates) for the verified students of a subject.
+
+    roster: {student_id: {"id", "name", "roll"}}
+    candidates: [{"student_id", "embeddings"}] for students with enrolled faces
+    """
+    subject = await get_subject(subject_oid)
+    if not subject:
+        return None, {}, []
+
+    verified_ids = [
+        s["student_id"]
+        for s in subject.get("students", [])
+        if s.get("verified", False)
+    ]
+    if not verified_ids:
+        return subject, {}, []
+
+    # Both lookups only depend on the id list: run them concurrently
+    students, users = await asyncio.gather(
+        get_students(verified_ids),
+        loaders.users("name", "roll").load_many(verified_ids),
+    )
+
+    names = {s["student_id"]: s.get("name") for s in subject.get("students", [])}
+
+    roster = {}
+    for oid in verified_ids:
+        user = users.get(oid, {})
+        roster[str(oid)] = {
+            "id": str(oid),
+            "name": user.get("name") or names.get(oid),
+            "roll": user.get("roll"),
+        }
+
+    candidates = [
+        {"student_id": str(s["userId"]), "embeddings": embedding_lists(s)}
+        for s in students.values()
+        if s["verified"] and s["face_embeddings"]
+    ]
+    return subject, roster, candidates
+
+
+async def ensure_gallery(subject_id: str, candidates: List[dict]) -> int:
+    """Publish the subject gallery to the ML service unless it already holds this content"""
+    gallery_id = gallery_id_for(subject_id)
+    fingerprint = gallery_fingerprint(candidates)
+
+    info = await ml_client.get_gallery(gallery_id)
+    if info.get("success") and info["gallery"].get("fingerprint") == fingerprint:
+        return info["gallery"]["version"]
+
+    published = await ml_client.publish_gallery(gallery_id, candidates, fingerprint=fingerprint)
+    if not published.get("success"):
+        raise RuntimeError(published.get("error", "Unknown error"))
+    return published["gallery"]["version"]
+
+
+class LiveSessionRegistry:
+    """In-process sessions; a session must be served by the worker that started it"""
+
+    def __init__(self, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, LiveSession] = {}
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        for sid in [sid for sid, s in self._sessions.items() if s.tally.last_seen < cutoff]:
+            self.stop(sid)
+
+    async def start(self, subject_id: str, teacher_id: str, roster: Dict[str, dict], candidates: List[dict]) -> LiveSession:
+        self._evict_idle()
+
+        version = await ensure_gallery(subject_id, candidates)
+
+        tally = VoteTally(subject_id, teacher_id=teacher_id)
+        tally.ensure_roster(roster.values())
+
+        session = LiveSession(
+            id=secrets.token_urlsafe(16),
+            subject_id=subject_id,
+            teacher_id=teacher_id,
+            roster=roster,
+            gallery_id=gallery_id_for(subject_id),
+            gallery_version=version,
+            confident_threshold=ML_CONFIDENT_THRESHOLD,
+            uncertain_threshold=ML_UNCERTAIN_THRESHOLD,
+            tally=tally,
+        )
+        self._sessions[session.id] = session
+        # Shares the roster endpoint with /mark-based sessions
+        tallies.put(session.id, tally)
+        return session
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        self._evict_idle()
+        return self._sessions.get(session_id)
+
+    def stop(self, session_id: str) -> Optional[LiveSession]:
+        tallies.drop(session_id)
+        return self._sessions.pop(session_id, None)
+
+
+live_sessions = LiveSessionRegistry()
+
+
+async def process_frame(session: LiveSession, image_b64: str, scale: float = 1.0) -> List[dict]:
+    """
+    Detect + match one frame against the pinned gallery and fold it into the
+    tally. `scale` maps face boxes back to the client's frame size.
+    """
+    async def recognize():
+        return await ml_client.recognize(
+            session.gallery_id,
+            image_b64,
+            version=session.gallery_version,
+            min_face_area_ratio=0.04,
+            confident_threshold=session.confident_threshold,
+            uncertain_threshold=session.uncertain_threshold,
+        )
+
+    response = await recognize()
+    if not response.get("success") and response.get("error") == GALLERY_VERSION_MISSING:
+        # The pinned version was pruned: re-pin to the current one. Matches
+        # outside the pinned roster are still ignored below.
+        info = await ml_client.get_gallery(session.gallery_id)
+        if info.get("success"):
+            session.gallery_version = info["gallery"]["version"]
+            response = await recognize()
+    if not response.get("success"):
+        raise RuntimeError(response.get("error", "Unknown error"))
+
+    results = []
+    for face in response.get("faces", []):
+        distance = face["distance"]
+        student = session.roster.get(face.get("student_id") or "")
+        status = face["status"] if student else "unknown"
+
+        results.append({
+            "box": scale_box(face.get("location", {}), scale),
+            "status": status,
+            "distance": None if not student else round(distance, 4),
+            "confidence": None if not student else round(max(0.0, 1.0 - distance), 3),
+            "student": None if not student else {
+                "id": student["id"],
+                "roll": student["roll"],
+                "name": student["name"]
+            }
+        })
+
+    session.tally.add_frame([
+        {
+            "student_id": r["student"]["id"],
+            "distance": r["distance"],
+            "status": r["status"],
+        }
+        for r in results
+        if r["student"] and r["status"] in ("present", "uncertain")
+    ])
+    return results
@@ -0,0 +1,99 @@
+"""
+Fixed-window login attempt counters, per client IP and per email.
+
+Counters are documents {_id: "<kind>:<value>:<window>", n, expires_at} in
+`login_attempts`, so every worker shares them; a TTL index removes them once
+their window is over. Attempts are counted before the password is checked,
+which keeps throttled requests away from the bcrypt pool entirely.
+
+Only failed attempts should count, so a successful login takes its own
+attempt back off the IP counter (many users can share one school NAT) and
+clears the email counter.
+"""
+import asyncio
+import time
+from datetime import datetime
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from app.core.config import (
+    LOGIN_MAX_ATTEMPTS_PER_EMAIL,
+    LOGIN_MAX_ATTEMPTS_PER_IP,
+    LOGIN_THROTTLE_WINDOW,
+)
+from app.db.mongo import db
+
+attempts_col = db["login_attempts"]
+
+
+class ThrottleStats:
+    def __init__(self):
+        self.checked = 0
+        self.throttled = 0
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": LOGIN_THROTTLE_WINDOW,
+            "max_per_ip": LOGIN_MAX_ATTEMPTS_PER_IP,
+            "max_per_email": LOGIN_MAX_ATTEMPTS_PER_EMAIL,
+            "checked": self.checked,
+            "throttled": self.throttled,
+        }
+
+
+throttle_stats = ThrottleStats()
+
+
+def _window():
+    now = time.time()
+    window = int(now // LOGIN_THROTTLE_WINDOW)
+    ends_at = (window + 1) * LOGIN_THROTTLE_WINDOW
+    return window, ends_at, int(ends_at - now) + 1
+
+
+def _ip_key(ip: str, window: int) -> str:
+    return f"ip:{ip}:{window}"
+
+
+def _email_key(email: str, window: int) -> str:
+    return f"email:{email.strip().lower()}:{window}"
+
+
+async def _count(key: str, expires_at: datetime) -> int:
+    doc = await attempts_col.find_one_and_update(
+        {"_id": key},
+        {"$inc": {"n": 1}, "$setOnInsert": {"expires_at": expires_at}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["n"]
+
+
+async def register_attempt(ip: str, email: str):
+    """Count one login attempt; 429 with Retry-After once either limit is exceeded"""
+    window, ends_at, retry_after = _window()
+    expires_at = datetime.utcfromtimestamp(ends_at)
+
+    by_ip, by_email = await asyncio.gather(
+        _count(_ip_key(ip, window), expires_at),
+        _count(_email_key(email, window), expires_at),
+    )
+    throttle_stats.checked += 1
+
+    if by_ip > LOGIN_MAX_ATTEMPTS_PER_IP or by_email > LOGIN_MAX_ATTEMPTS_PER_EMAIL:
+        throttle_stats.throttled += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts. Please try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+async def register_success(ip: str, email: str):
+    """After a successful login: un-count it for the IP, and forget the user's own earlier typos"""
+    window, _, _ = _window()
+    await asyncio.gather(
+        attempts_col.update_one({"_id": _ip_key(ip, window), "n": {"$gt": 0}}, {"$inc": {"n": -1}}),
+        attempts_col.delete_one({"_id": _email_key(email, window)}),
+    )
@@ -1,6 +1,29 @@
-import httpx
-import os
+import asyncio
+import random
+import time
+from collections import deque
 from typing import Optional, List, Dict, Any
+
+import httpx
+
+from app.core.config import (
+    ML_BREAKER_FAILURE_THRESHOLD,
+    ML_BREAKER_RESET_SECONDS,
+    ML_CONNECT_TIMEOUT,
+    ML_ENDPOINT_TIMEOUTS,
+    ML_HEDGE_DELAY_MS,
+    ML_HEDGE_ENABLED,
+    ML_POOL_MAX_CONNECTIONS,
+    ML_POOL_MAX_KEEPALIVE,
+    ML_POOL_TIMEOUT,
+    ML_RETRY_BACKOFF_BASE,
+    ML_RETRY_BACKOFF_MAX,
+    ML_SERVICE_MAX_RETRIES,
+    ML_SERVICE_TIMEOUT,
+    ML_SERVICE_URL,
+)
+from app.core.metrics import ml_request_seconds
+from app.core.request_timing import add_ml_time
 from app.schemas.ml_requests import (
     EncodeFaceRequest,
     DetectFacesRequest,
@@ -11,56 +34,325 @@ from app.schemas.ml_requests import (
 )
 
 
+class MLServiceError(Exception):
+    """The ML service answered with an error, or could not be reached"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MLServiceUnavailable(MLServiceError):
+    """Circuit open: the call was not attempted"""
+
+
+# Per-endpoint policy. Every ML endpoint is a pure computation (or, for PUT
+# galleries, an idempotent upsert keyed by fingerprint), so a request that
+# timed out may be repeated; `hedge` marks the latency-sensitive ones on the
+# attendance path, where a duplicate request is worth its cost.
+ENDPOINTS: Dict[str, Dict[str, Any]] = {
+    "encode-face":     {"timeout": 30.0,  "idempotent": True, "hedge": False},
+    "encode-faces":    {"timeout": 120.0, "idempotent": True, "hedge": False},
+    "detect-faces":    {"timeout": 20.0,  "idempotent": True, "hedge": True},
+    "match-faces":     {"timeout": 5.0,   "idempotent": True, "hedge": True},
+    "batch-match":     {"timeout": 10.0,  "idempotent": True, "hedge": True},
+    "gallery-publish": {"timeout": 30.0,  "idempotent": True, "hedge": False},
+    "gallery-get":     {"timeout": 5.0,   "idempotent": True, "hedge": False},
+    "gallery-match":   {"timeout": 5.0,   "idempotent": True, "hedge": True},
+    "recognize":       {"timeout": 20.0,  "idempotent": True, "hedge": True},
+    "health":          {"timeout": 2.0,   "idempotent": True, "hedge": False},
+}
+
+# Answers that mean "not processed, try later"
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class _Retryable(Exception):
+    """Attempt failed in a way that may succeed if repeated"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open fails
+    fast for `reset_seconds`, then half-open lets one probe through, whose
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.short_circuited = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release(self):
+        """The call let through was abandoned before it had an outcome"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opens += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.total_seconds = 0.0
+        self._recent = deque(maxlen=512)  # latencies of recent successful calls
+
+    def observe(self, seconds: float):
+        self.total_seconds += seconds
+        self._recent.append(seconds)
+
+    def stats(self) -> dict:
+        recent = sorted(self._recent)
+        pick = lambda q: round(recent[min(len(recent) - 1, int(q * len(recent)))] * 1000, 1) if recent else None
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50_ms": pick(0.50),
+            "p95_ms": pick(0.95),
+            "p99_ms": pick(0.99),
+        }
+
+
 class MLClient:
-    """HTTP client for communicating with ML Service"""
+    """
+    HTTP client for communicating with ML Service
+
+    - retries only what is safe to repeat (see _attempt), with exponential
+      backoff and full jitter, honouring Retry-After;
+    - a circuit breaker per endpoint fails fast while the service is down
+      instead of piling retries onto it; slow background batches
+      (encode-faces) cannot open the circuit of the attendance endpoints;
+    - optional hedging (ML_HEDGE_ENABLED): for endpoints marked `hedge`, a
+      second identical request is sent if the first has not answered after
+      ML_HEDGE_DELAY_MS, and the first answer wins;
+    - per-endpoint timeouts, pool limits from settings, metrics via stats().
+    """
     
     def __init__(self):
-        self.base_url = os.getenv("ML_SERVICE_URL", "http://localhost:8001")
-        self.timeout = float(os.getenv("ML_SERVICE_TIMEOUT", "30"))
-        self.max_retries = int(os.getenv("ML_SERVICE_MAX_RETRIES", "3"))
+        self.base_url = ML_SERVICE_URL
+        self.timeout = ML_SERVICE_TIMEOUT
+        self.max_retries = ML_SERVICE_MAX_RETRIES
+        self.hedge_enabled = ML_HEDGE_ENABLED
+        self.hedge_delay = ML_HEDGE_DELAY_MS / 1000
+
+        self.endpoints = {name: dict(policy) for name, policy in ENDPOINTS.items()}
+        for name, seconds in ML_ENDPOINT_TIMEOUTS.items():
+            if name in self.endpoints:
+                self.endpoints[name]["timeout"] = seconds
+
+        self.breakers = {
+            name: CircuitBreaker(ML_BREAKER_FAILURE_THRESHOLD, ML_BREAKER_RESET_SECONDS)
+            for name in self.endpoints
+        }
+        self._stats = {name: EndpointStats() for name in self.endpoints}
         
         # Create httpx client with connection pooling
         self.client = httpx.AsyncClient(
             base_url=self.base_url,
-            timeout=self.timeout,
-            limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
+            timeout=httpx.Timeout(self.timeout, connect=ML_CONNECT_TIMEOUT, pool=ML_POOL_TIMEOUT),
+            limits=httpx.Limits(
+                max_keepalive_connections=ML_POOL_MAX_KEEPALIVE,
+                max_connections=ML_POOL_MAX_CONNECTIONS,
+            )
         )
     
     async def close(self):
         """Close the HTTP client"""
         await self.client.aclose()
-    
+
+    def _backoff(self, retry: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(ML_RETRY_BACKOFF_MAX, ML_RETRY_BACKOFF_BASE * 2 ** retry))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, ML_RETRY_BACKOFF_MAX))
+        return delay
+
+    async def _attempt(self, name: str, method: str, endpoint: str, json_data: Optional[Dict]) -> Dict[str, Any]:
+        """
+        One HTTP exchange. Raises _Retryable when repeating it is safe:
+        the request never reached the service (connect/pool errors), or the
+        endpoint is idempotent and the service timed out or said it was
+        overloaded. Everything else (4xx, 500, bad JSON) raises MLServiceError.
+        """
+        policy = self.endpoints[name]
+        stats = self._stats[name]
+        timeout = httpx.Timeout(policy["timeout"], connect=ML_CONNECT_TIMEOUT, pool=ML_POOL_TIMEOUT)
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method=method, url=endpoint, json=json_data, timeout=timeout)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            raise _Retryable(f"ML Service unreachable: {e!r}")
+        except httpx.TimeoutException as e:
+            stats.timeouts += 1
+            if policy["idempotent"]:
+                raise _Retryable(f"ML Service timeout on {name}")
+            raise MLServiceError(f"ML Service timeout on {name}") from e
+        except httpx.HTTPError as e:
+            if policy["idempotent"]:
+                raise _Retryable(f"ML Service communication error: {e!r}")
+            raise MLServiceError(f"ML Service communication error: {e!r}") from e
+
+        if response.status_code in RETRYABLE_STATUS and policy["idempotent"]:
+            retry_after = response.headers.get("retry-after")
+            raise _Retryable(
+                f"ML Service error: {response.status_code} - {response.text[:200]}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        if response.is_error:
+            raise MLServiceError(
+                f"ML Service error: {response.status_code} - {response.text[:500]}",
+                status_code=response.status_code,
+            )
+
+        try:
+            payload = response.json()
+        except ValueError as e:
+            raise MLServiceError(f"ML Service returned invalid JSON on {name}") from e
+
+        stats.observe(time.perf_counter() - started)
+        return payload
+
+    async def _hedged(self, name: str, method: str, endpoint: str, json_data: Optional[Dict]) -> Dict[str, Any]:
+        """First successful answer of up to two identical requests"""
+        stats = self._stats[name]
+        first = asyncio.ensure_future(self._attempt(name, method, endpoint, json_data))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+
+        stats.hedges += 1
+        second = asyncio.ensure_future(self._attempt(name, method, endpoint, json_data))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            stats.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
     async def _make_request(
         self,
         method: str,
         endpoint: str,
         json_data: Optional[Dict] = None,
-        retries: int = 0
+        name: str = "health",
     ) -> Dict[str, Any]:
         """
-        Make HTTP request to ML service with retry logic
+        Make HTTP request to ML service through the breaker, with retries
         """
+        stats = self._stats[name]
+        stats.requests += 1
+        breaker = self.breakers[name]
+        hedge = self.hedge_enabled and self.endpoints[name]["hedge"]
+
+        # Retries and backoff included: this is what the caller waited
+        started = time.perf_counter()
+        outcome = "error"
         try:
-            response = await self.client.request(
-                method=method,
-                url=endpoint,
-                json=json_data
-            )
-            response.raise_for_status()
-            return response.json()
-            
-        except httpx.TimeoutException as e:
-            if retries < self.max_retries:
-                return await self._make_request(method, endpoint, json_data, retries + 1)
-            raise Exception(f"ML Service timeout after {self.max_retries} retries")
-            
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"ML Service error: {e.response.status_code} - {e.response.text}")
-            
-        except Exception as e:
-            if retries < self.max_retries:
-                return await self._make_request(method, endpoint, json_data, retries + 1)
-            raise Exception(f"ML Service communication error: {str(e)}")
+            for retry in range(self.max_retries + 1):
+                if not breaker.allow():
+                    stats.errors += 1
+                    outcome = "unavailable"
+                    raise MLServiceUnavailable("ML Service unavailable (circuit open)")
+                try:
+                    if hedge:
+                        result = await self._hedged(name, method, endpoint, json_data)
+                    else:
+                        result = await self._attempt(name, method, endpoint, json_data)
+                except _Retryable as e:
+                    breaker.record_failure()
+                    if retry >= self.max_retries:
+                        stats.errors += 1
+                        raise MLServiceError(f"{e} (after {retry} retries)")
+                    stats.retries += 1
+                    await asyncio.sleep(self._backoff(retry, e.retry_after))
+                    continue
+                except MLServiceError as e:
+                    # A 4xx is our fault, anything else counts against the service
+                    if e.status_code is not None and e.status_code < 500:
+                        breaker.record_success()
+                    else:
+                        breaker.record_failure()
+                    stats.errors += 1
+                    raise
+                except BaseException:
+                    # Cancelled by our caller
+                    breaker.release()
+                    raise
+
+                breaker.record_success()
+                outcome = "ok"
+                return result
+        finally:
+            elapsed = time.perf_counter() - started
+            add_ml_time(elapsed)
+            ml_request_seconds.observe(elapsed, endpoint=name, outcome=outcome)
+
+    def stats(self) -> dict:
+        return {
+            "breakers": {
+                name: b.stats() for name, b in self.breakers.items()
+                if self._stats[name].requests or b.state != "closed"
+            },
+            "hedging": {"enabled": self.hedge_enabled, "delay_ms": self.hedge_delay * 1000},
+            "pool": {"max_connections": ML_POOL_MAX_CONNECTIONS, "max_keepalive": ML_POOL_MAX_KEEPALIVE},
+            "endpoints": {name: s.stats() for name, s in self._stats.items() if s.requests},
+        }
     
     async def encode_face(
         self,
@@ -88,7 +380,37 @@ class MLClient:
             "num_jitters": num_jitters
         }
         
-        return await self._make_request("POST", "/api/ml/encode-face", request_data)
+        return await self._make_request("POST", "/api/ml/encode-face", request_data, name="encode-face")
+    
+    async def encode_faces(
+        self,
+        images_base64: List[str],
+        validate_single: bool = True,
+        min_face_area_ratio: float = 0.05,
+        num_jitters: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Encode one face in each of several images (at most 32) in one call
+        
+        Returns:
+            {
+                "success": bool,
+                "results": [<encode_face response>, ...]  # request order
+            }
+        """
+        request_data = {
+            "images": [
+                {
+                    "image_base64": image_base64,
+                    "validate_single": validate_single,
+                    "min_face_area_ratio": min_face_area_ratio,
+                    "num_jitters": num_jitters
+                }
+                for image_base64 in images_base64
+            ]
+        }
+        
+        return await self._make_request("POST", "/api/ml/encode-faces", request_data, name="encode-faces")
     
     async def detect_faces(
         self,
@@ -119,7 +441,7 @@ class MLClient:
             "model": model
         }
         
-        return await self._make_request("POST", "/api/ml/detect-faces", request_data)
+        return await self._make_request("POST", "/api/ml/detect-faces", request_data, name="detect-faces")
     
     async def match_faces(
         self,
@@ -158,7 +480,7 @@ class MLClient:
             "return_all_distances": return_all_distances
         }
         
-        return await self._make_request("POST", "/api/ml/match-faces", request_data)
+        return await self._make_request("POST", "/api/ml/match-faces", request_data, name="match-faces")
     
     async def batch_match(
         self,
@@ -201,8 +523,97 @@ class MLClient:
             "uncertain_threshold": uncertain_threshold
         }
         
-        return await self._make_request("POST", "/api/ml/batch-match", request_data)
-    
+        return await self._make_request("POST", "/api/ml/batch-match", request_data, name="batch-match")
+
+    async def publish_gallery(
+        self,
+        gallery_id: str,
+        candidate_embeddings: List[Dict[str, Any]],
+        fingerprint: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Store candidate embeddings as a new memory-mapped gallery snapshot
+
+        Returns:
+            {
+                "success": bool,
+                "gallery": {"gallery_id", "version", "fingerprint", "students", ...}
+            }
+        """
+        request_data = {
+            "candidate_embeddings": candidate_embeddings,
+            "fingerprint": fingerprint
+        }
+
+        return await self._make_request("PUT", f"/api/ml/galleries/{gallery_id}", request_data, name="gallery-publish")
+
+    async def get_gallery(self, gallery_id: str) -> Dict[str, Any]:
+        """Current snapshot manifest of a gallery ("success": False if none)"""
+        return await self._make_request("GET", f"/api/ml/galleries/{gallery_id}", name="gallery-get")
+
+    async def match_gallery(
+        self,
+        gallery_id: str,
+        detected_faces: List[Dict[str, Any]],
+        version: Optional[int] = None,
+        confident_threshold: float = 0.50,
+        uncertain_threshold: float = 0.60
+    ) -> Dict[str, Any]:
+        """
+        Match detected faces against a stored gallery snapshot
+
+        Returns:
+            {
+                "success": bool,
+                "version": int,
+                "matches": [{"face_index", "student_id", "distance", "status"}]
+            }
+        """
+        request_data = {
+            "detected_faces": detected_faces,
+            "version": version,
+            "confident_threshold": confident_threshold,
+            "uncertain_threshold": uncertain_threshold
+        }
+
+        return await self._make_request("POST", f"/api/ml/galleries/{gallery_id}/match", request_data, name="gallery-match")
+
+    async def recognize(
+        self,
+        gallery_id: str,
+        image_base64: str,
+        version: Optional[int] = None,
+        min_face_area_ratio: float = 0.04,
+        confident_threshold: float = 0.50,
+        uncertain_threshold: float = 0.60
+    ) -> Dict[str, Any]:
+        """
+        Detect faces and match them against a stored gallery in one call
+
+        Returns:
+            {
+                "success": bool,
+                "version": int,
+                "faces": [{
+                    "location": {...},
+                    "face_area_ratio": float,
+                    "student_id": str or None,
+                    "distance": float,
+                    "status": str  # "present", "uncertain" or "unknown"
+                }],
+                "count": int
+            }
+        """
+        request_data = {
+            "image_base64": image_base64,
+            "version": version,
+            "min_face_area_ratio": min_face_area_ratio,
+            "confident_threshold": confident_threshold,
+            "uncertain_threshold": uncertain_threshold
+        }
+
+        return await self._make_request("POST", f"/api/ml/galleries/{gallery_id}/recognize", request_data, name="recognize")
+
     async def health_check(self) -> Dict[str, Any]:
         """
         Check ML service health
@@ -216,7 +627,7 @@ class MLClient:
                 "uptime_seconds": float
             }
         """
-        return await self._make_request("GET", "/health")
+        return await self._make_request("GET", "/health", name="health")
 
 
 # Global ML client instance
@@ -0,0 +1,43 @@
+"""
+Short-TTL cache of resolved principals (user + teacher documents), keyed by
+token id, so authenticated polling does not hit MongoDB on every request.
+
+The token itself is still verified on every request; only the database
+lookups are cached. Profile writes call invalidate_user(); other workers
+pick the change up when their entry expires (AUTH_CACHE_TTL).
+"""
+from typing import Dict, Optional, Set
+
+from app.core.config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL
+from app.utils.cache import TTLLRUCache
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLLRUCache(maxsize, ttl, "principals")
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+
+    def get(self, token_id: str) -> Optional[dict]:
+        return self._cache.get(token_id)
+
+    def set(self, token_id: str, principal: dict):
+        self._cache.set(token_id, principal)
+        user_id = str(principal["id"])
+        # Drop ids of entries the LRU has already evicted or expired
+        tokens = {t for t in self._tokens_by_user.get(user_id, ()) if t in self._cache}
+        tokens.add(token_id)
+        self._tokens_by_user[user_id] = tokens
+
+    def invalidate_user(self, user_id):
+        """Call after a write to the user's users/teachers documents"""
+        for token_id in self._tokens_by_user.pop(str(user_id), ()):
+            self._cache.pop(token_id)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        # Each miss costs a users and a teachers lookup
+        stats["db_reads_avoided"] = stats["hits"] * 2
+        return stats
+
+
+principal_cache = PrincipalCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
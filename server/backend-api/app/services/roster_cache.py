@@ -0,0 +1,155 @@
+"""
+In-process cache for subject rosters and student embeddings.
+
+Subjects and enrolled faces change rarely compared to how often they are read
+(every attendance frame, every roster page). Write paths call the
+invalidate_* hooks below; the TTL bounds staleness across workers, which each
+hold their own cache.
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+from app.core.config import ROSTER_CACHE_STUDENTS, ROSTER_CACHE_SUBJECTS, ROSTER_CACHE_TTL
+from app.db.mongo import db
+from app.utils.cache import TTLLRUCache
+
+SUBJECT_FIELDS = {
+    "name": 1,
+    "code": 1,
+    "type": 1,
+    "professor_ids": 1,
+    "students": 1,
+    "created_at": 1,
+}
+STUDENT_FIELDS = {
+    "userId": 1,
+    "name": 1,
+    "verified": 1,
+    "image_url": 1,
+    "face_embeddings": 1,
+}
+
+subjects_cache = TTLLRUCache(ROSTER_CACHE_SUBJECTS, ROSTER_CACHE_TTL, "subjects")
+students_cache = TTLLRUCache(ROSTER_CACHE_STUDENTS, ROSTER_CACHE_TTL, "students")
+teacher_subjects_cache = TTLLRUCache(ROSTER_CACHE_SUBJECTS, ROSTER_CACHE_TTL, "teacher_subjects")
+catalogue_cache = TTLLRUCache(1, ROSTER_CACHE_TTL, "catalogue")
+
+
+def _compact_student(doc: dict) -> dict:
+    # float32 arrays take ~8x less memory than lists of Python floats
+    return {
+        "userId": doc["userId"],
+        "name": doc.get("name"),
+        "verified": doc.get("verified", False),
+        "image_url": doc.get("image_url"),
+        "face_embeddings": [array("f", e) for e in doc.get("face_embeddings") or []],
+    }
+
+
+def embedding_lists(student: dict) -> List[List[float]]:
+    """Embeddings of a cached student as plain lists (JSON-serialisable)"""
+    return [e.tolist() for e in student["face_embeddings"]]
+
+
+async def get_subject(subject_oid: ObjectId) -> Optional[dict]:
+    """Subject with its embedded students array (read-only)"""
+    key = str(subject_oid)
+    subject = subjects_cache.get(key)
+    if subject is not None:
+        return subject
+
+    subject = await db.subjects.find_one({"_id": subject_oid}, SUBJECT_FIELDS)
+    if subject:
+        subjects_cache.set(key, subject)
+    return subject
+
+
+async def get_students(user_oids: Iterable[ObjectId]) -> Dict[str, dict]:
+    """
+    Student docs keyed by str(userId); misses are fetched with one $in query.
+
+    Each entry has userId, name, verified, image_url and face_embeddings
+    (float32 arrays, see embedding_lists).
+    """
+    found: Dict[str, dict] = {}
+    missing = []
+    for oid in user_oids:
+        student = students_cache.get(str(oid))
+        if student is None:
+            missing.append(oid)
+        else:
+            found[str(oid)] = student
+
+    if missing:
+        async for doc in db.students.find({"userId": {"$in": missing}}, STUDENT_FIELDS):
+            student = _compact_student(doc)
+            students_cache.set(str(doc["userId"]), student)
+            found[str(doc["userId"])] = student
+
+    return found
+
+
+async def get_teacher_subjects(prof_oid: ObjectId) -> List[dict]:
+    """Subjects taught by a professor with their enrolment counts"""
+    key = str(prof_oid)
+    subjects = teacher_subjects_cache.get(key)
+    if subjects is not None:
+        return subjects
+
+    subjects = await db.subjects.aggregate([
+        {"$match": {"professor_ids": prof_oid}},
+        {"$limit": 100},
+        {"$project": {
+            "name": 1,
+            "code": 1,
+            "student_count": {"$size": {"$ifNull": ["$students", []]}},
+        }},
+    ]).to_list(length=None)
+
+    teacher_subjects_cache.set(key, subjects)
+    return subjects
+
+
+async def get_catalogue() -> List[dict]:
+    """All subjects without their embedded student arrays"""
+    subjects = catalogue_cache.get("all")
+    if subjects is not None:
+        return subjects
+
+    subjects = await db.subjects.find({}, {"students": 0}).to_list(None)
+    catalogue_cache.set("all", subjects)
+    return subjects
+
+
+# ---------------- INVALIDATION HOOKS ----------------
+def invalidate_subject(subject_id, professor_ids: Optional[Iterable] = None):
+    """Call after any write to a subject document (roster, verification, attendance)"""
+    subject = subjects_cache.pop(str(subject_id))
+    if professor_ids is None and subject is not None:
+        professor_ids = subject.get("professor_ids")
+
+    if professor_ids is None:
+        # Owners unknown: drop every teacher listing rather than serve stale counts
+        teacher_subjects_cache.clear()
+    else:
+        for prof_id in professor_ids:
+            teacher_subjects_cache.pop(str(prof_id))
+
+
+def invalidate_student(user_id):
+    """Call after a student's face embeddings or verification change"""
+    students_cache.pop(str(user_id))
+
+
+def invalidate_catalogue():
+    """Call after a subject is created"""
+    catalogue_cache.clear()
+
+
+def stats() -> List[dict]:
+    return [
+        c.stats()
+        for c in (subjects_cache, students_cache, teacher_subjects_cache, catalogue_cache)
+    ]
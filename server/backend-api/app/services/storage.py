@@ -0,0 +1,224 @@
+"""
+Object storage for uploaded images.
+
+Every backend exposes the same async interface:
+
+    url = await storage.put(key, data, content_type)
+    await storage.delete(key)
+
+- LocalStorage:      files under app/static, served at /static (aiofiles)
+- CloudinaryStorage: the Cloudinary SDK, whose calls block, run in a thread
+- S3Storage:         any S3-compatible service (AWS, MinIO, a local stand-in)
+                     over httpx with SigV4-signed requests
+
+Which backend serves faces and avatars is configured with
+FACE_STORAGE_BACKEND / AVATAR_STORAGE_BACKEND; see storage_for().
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+from urllib.parse import quote
+
+import aiofiles
+import httpx
+
+from app.core.config import (
+    AVATAR_STORAGE_BACKEND,
+    FACE_STORAGE_BACKEND,
+    LOCAL_STORAGE_DIR,
+    S3_ACCESS_KEY_ID,
+    S3_BUCKET,
+    S3_ENDPOINT_URL,
+    S3_PUBLIC_URL,
+    S3_REGION,
+    S3_SECRET_ACCESS_KEY,
+)
+
+
+class StorageError(Exception):
+    pass
+
+
+class Storage:
+    async def put(self, key: str, data: bytes, content_type: str) -> str:
+        """Store `data` under `key` (overwriting) and return its public URL"""
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        """Remove `key`; deleting a missing key is not an error"""
+        raise NotImplementedError
+
+
+# ---------------- LOCAL ----------------
+class LocalStorage(Storage):
+    def __init__(self, root: str = LOCAL_STORAGE_DIR, url_prefix: str = "/static"):
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise StorageError(f"Invalid key: {key}")
+        return path
+
+    async def put(self, key: str, data: bytes, content_type: str) -> str:
+        path = self._path(key)
+        try:
+            await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+            async with aiofiles.open(path, "wb") as out:
+                await out.write(data)
+        except OSError as e:
+            raise StorageError(str(e)) from e
+        return f"{self.url_prefix}/{key}"
+
+    async def delete(self, key: str):
+        try:
+            await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+        except OSError as e:
+            raise StorageError(str(e)) from e
+
+
+# ---------------- CLOUDINARY ----------------
+class CloudinaryStorage(Storage):
+    """Keys map to public ids (extension dropped; Cloudinary picks the format)"""
+
+    @staticmethod
+    def _public_id(key: str) -> str:
+        return os.path.splitext(key)[0]
+
+    async def put(self, key: str, data: bytes, content_type: str) -> str:
+        from cloudinary.uploader import upload
+
+        try:
+            result = await asyncio.to_thread(
+                upload,
+                data,
+                public_id=self._public_id(key),
+                overwrite=True,
+                resource_type="image",
+            )
+        except Exception as e:
+            raise StorageError(str(e)) from e
+        return result.get("secure_url")
+
+    async def delete(self, key: str):
+        from cloudinary.uploader import destroy
+
+        try:
+            await asyncio.to_thread(destroy, self._public_id(key), resource_type="image", invalidate=True)
+        except Exception as e:
+            raise StorageError(str(e)) from e
+
+
+# ---------------- S3-COMPATIBLE ----------------
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+class S3Storage(Storage):
+    """
+    Path-style requests (endpoint/bucket/key), so MinIO and local stand-ins
+    work without DNS tricks. Objects are expected to be publicly readable
+    through S3_PUBLIC_URL (defaults to endpoint/bucket).
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str = S3_ENDPOINT_URL,
+        bucket: str = S3_BUCKET,
+        region: str = S3_REGION,
+        access_key: str = S3_ACCESS_KEY_ID,
+        secret_key: str = S3_SECRET_ACCESS_KEY,
+        public_url: str = S3_PUBLIC_URL,
+    ):
+        if not endpoint_url or not bucket:
+            raise StorageError("S3 storage needs S3_ENDPOINT_URL and S3_BUCKET")
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key or ""
+        self.secret_key = secret_key or ""
+        self.public_url = (public_url or f"{self.endpoint_url}/{bucket}").rstrip("/")
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0))
+
+    def _path(self, key: str) -> str:
+        return f"/{self.bucket}/{quote(key, safe='/-_.~')}"
+
+    def _signed_headers(self, method: str, path: str, payload_hash: str, extra: Dict[str, str]) -> Dict[str, str]:
+        now = datetime.utcnow()
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        day = now.strftime("%Y%m%d")
+
+        headers = {
+            "host": httpx.URL(self.endpoint_url).netloc.decode(),
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+            **{k.lower(): v for k, v in extra.items()},
+        }
+        names = sorted(headers)
+        signed = ";".join(names)
+        canonical = "\n".join([
+            method,
+            path,
+            "",  # no query string
+            "".join(f"{n}:{headers[n].strip()}\n" for n in names),
+            signed,
+            payload_hash,
+        ])
+
+        scope = f"{day}/{self.region}/s3/aws4_request"
+        to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical.encode()).hexdigest(),
+        ])
+        key = _hmac(_hmac(_hmac(_hmac(f"AWS4{self.secret_key}".encode(), day), self.region), "s3"), "aws4_request")
+        signature = hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed}, Signature={signature}"
+        )
+        return headers
+
+    async def _request(self, method: str, key: str, data: bytes = b"", extra: Dict[str, str] = None):
+        path = self._path(key)
+        headers = self._signed_headers(method, path, hashlib.sha256(data).hexdigest(), extra or {})
+        try:
+            response = await self._client.request(method, f"{self.endpoint_url}{path}", content=data, headers=headers)
+        except httpx.HTTPError as e:
+            raise StorageError(f"S3 {method} failed: {e}") from e
+        if response.status_code >= 300 and not (method == "DELETE" and response.status_code == 404):
+            raise StorageError(f"S3 {method} returned {response.status_code}: {response.text[:200]}")
+
+    async def put(self, key: str, data: bytes, content_type: str) -> str:
+        await self._request("PUT", key, data, {"content-type": content_type})
+        return f"{self.public_url}/{quote(key, safe='/-_.~')}"
+
+    async def delete(self, key: str):
+        await self._request("DELETE", key)
+
+
+# ---------------- SELECTION ----------------
+BACKENDS = {
+    "local": LocalStorage,
+    "cloudinary": CloudinaryStorage,
+    "s3": S3Storage,
+}
+
+_instances: Dict[str, Storage] = {}
+
+
+def storage_for(purpose: str) -> Storage:
+    """Configured backend for "faces" or "avatars" (created on first use)"""
+    backend = {"faces": FACE_STORAGE_BACKEND, "avatars": AVATAR_STORAGE_BACKEND}[purpose]
+    if backend not in _instances:
+        if backend not in BACKENDS:
+            raise StorageError(f"Unknown storage backend: {backend}")
+        _instances[backend] = BACKENDS[backend]()
+    return _instances[backend]
@@ -1,43 +1,42 @@
+import asyncio
+
 from app.db.mongo import db
+from app.db.loaders import Loaders
+from app.services.attendance_summaries import get_student_summaries
 from bson import ObjectId
 from datetime import datetime
 
 students_col = db["students"]
 users_col = db["users"]
-attendance_col = db["attendance"]
 subjects_col = db["subjects"]
 
 
-async def get_student_profile(user_id: str):
-    # 1. Get user document
-    user = await users_col.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        return None
+async def get_student_profile(user_id: str, loaders: Loaders):
+    oid = ObjectId(user_id)
 
-    # 2. Get student document
-    student = await students_col.find_one({"userId": ObjectId(user_id)})
-    if not student:
+    # 1. Get user + student documents (one round trip each, concurrently)
+    user, student = await asyncio.gather(
+        loaders.users().load(oid),
+        loaders.students().load(oid),
+    )
+    if not user or not student:
         return None
 
     # 3. Attendance summary
-    attendance_summary = await build_attendance_summary(student["_id"])
+    attendance_summary = await build_attendance_summary(oid)
 
     # 4. Populate subjects (ObjectId → subject objects)
     subject_ids = student.get("subjects", [])
 
-    subjects = []
-    if subject_ids:
-        subject_cursor = subjects_col.find(
-            {"_id": {"$in": subject_ids}}
-        )
-        subjects = [
-            {
-                "_id": str(sub["_id"]),
-                "name": sub.get("name"),
-                "code": sub.get("code"),
-            }
-            async for sub in subject_cursor
-        ]
+    subjects_by_id = await loaders.subjects("name", "code").load_many(subject_ids)
+    subjects = [
+        {
+            "_id": str(sub["_id"]),
+            "name": sub.get("name"),
+            "code": sub.get("code"),
+        }
+        for sub in subjects_by_id.values()
+    ]
 
     # 5. Build clean API-safe profile
     profile = {
@@ -57,8 +56,10 @@ async def get_student_profile(user_id: str):
     return profile
 
 
-async def build_attendance_summary(student_doc_id: ObjectId):
+async def build_attendance_summary(user_oid: ObjectId):
     """
+    Totals across the student's subjects, from attendance_summaries.
+
     Returns:
     {
       total_classes,
@@ -69,31 +70,31 @@ async def build_attendance_summary(student_doc_id: ObjectId):
       recent_attendance: [...]
     }
     """
+    summaries = await get_student_summaries(user_oid)
 
-    q = {"student_id": student_doc_id}
-
-    total_classes = await attendance_col.count_documents(q)
-    present = await attendance_col.count_documents({**q, "present": True})
-    absent = total_classes - present
+    present = sum(s.get("present", 0) for s in summaries)
+    absent = sum(s.get("absent", 0) for s in summaries)
+    total_classes = present + absent
 
     percentage = round((present / total_classes) * 100, 2) if total_classes else 0
     forecasted_score = 2 if percentage < 50 else 5
 
-    # Last 5 attendance records
-    recent_cursor = (
-        attendance_col.find(q)
-        .sort("date", -1)
-        .limit(5)
-    )
+    # Last 5 attendance records across subjects
+    recent_items = [
+        (item, s["subject_id"])
+        for s in summaries
+        for item in s.get("recent", [])
+    ]
+    recent_items.sort(key=lambda r: r[0].get("date") or "", reverse=True)
 
     recent = []
-    async for r in recent_cursor:
+    for item, subject_id in recent_items[:5]:
         recent.append({
-            "id": str(r["_id"]),
-            "date": r.get("date"),
-            "period": r.get("period"),
-            "present": r.get("present"),
-            "class_id": str(r["class_id"]) if r.get("class_id") else None,
+            "id": str(item["event_id"]) if item.get("event_id") else None,
+            "date": item.get("date"),
+            "period": item.get("period"),
+            "present": item.get("status") == "present",
+            "class_id": str(subject_id),
         })
 
     return {
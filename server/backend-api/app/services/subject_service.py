@@ -1,6 +1,8 @@
 from bson import ObjectId
 from app.db.subjects_repo import (get_subject_by_code, create_subject, add_professor_to_subject)
 from app.services.teacher_settings_service import patch_settings
+from app.services.roster_cache import invalidate_catalogue, invalidate_subject
+from app.services.change_counters import bump, catalogue_key, teacher_subjects_key
 
 async def add_subject_for_teacher(teacher_id: ObjectId, name:str, code:str):
     subject = await get_subject_by_code(code)
@@ -10,6 +12,10 @@ async def add_subject_for_teacher(teacher_id: ObjectId, name:str, code:str):
             await add_professor_to_subject(subject["_id"], teacher_id)
     else:
         subject = await create_subject(name, code, teacher_id)
+
+    invalidate_catalogue()
+    invalidate_subject(subject["_id"], [teacher_id])
+    await bump(catalogue_key(), teacher_subjects_key(teacher_id))
     
     await patch_settings(
         teacher_id,
@@ -1,6 +1,8 @@
 # backend/app/services/settings_service.py
 from typing import Dict, Any
 from app.db.teacher_settings_repo import get_by_user, create_default, upsert, patch
+from app.services.change_counters import bump, settings_key
+from app.services.principal_cache import principal_cache
 from fastapi import HTTPException
 
 async def ensure_settings_for_user(user_id: str, profile: Dict[str, Any]) -> Dict[str, Any]:
@@ -25,6 +27,9 @@ async def patch_settings(user_id: str, payload: Dict[str, Any]) -> Dict[str, Any
         if sens is not None and not (50 <= int(sens) <= 99):
             raise HTTPException(status_code=400, detail="sensitivity must be 50..99")
     updated = await patch(user_id, payload)
+    # The cached principal holds the teacher document
+    principal_cache.invalidate_user(user_id)
+    await bump(settings_key(user_id))
     if not updated:
         # fallback to read
         updated = await get_by_user(user_id)
@@ -33,6 +38,8 @@ async def patch_settings(user_id: str, payload: Dict[str, Any]) -> Dict[str, Any
 async def replace_settings(user_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     # Validate payload shape if necessary
     updated = await upsert(user_id, payload)
+    principal_cache.invalidate_user(user_id)
+    await bump(settings_key(user_id))
     if not updated:
         updated = await get_by_user(user_id)
     return updated
@@ -0,0 +1,192 @@
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import LIVE_TALLY_MAX_SESSIONS
+
+# A student becomes present after PRESENT_VOTES confident matches within the
+# last WINDOW_FRAMES frames of the session. Present is sticky for the session.
+WINDOW_FRAMES = 10
+PRESENT_VOTES = 3
+
+# Sessions nobody has polled for this long are dropped
+SESSION_TTL_SECONDS = 30 * 60
+
+
+class VoteTally:
+    """
+    Incremental present/uncertain/absent roster for one attendance session.
+
+    Every frame bumps `version`; each student entry remembers the version it
+    last changed at, so clients can ask for only what changed since the
+    version they already have.
+
+    State is in-process: a session must be served by the same worker.
+    """
+
+    def __init__(
+        self,
+        subject_id: str,
+        window: int = WINDOW_FRAMES,
+        present_votes: int = PRESENT_VOTES,
+        teacher_id: Optional[str] = None,
+    ):
+        self.subject_id = subject_id
+        self.teacher_id = teacher_id
+        self.window = window
+        self.present_votes = present_votes
+        self.frames = 0
+        self.version = 0
+        self.students: Dict[str, dict] = {}
+        self.last_seen = time.monotonic()
+
+    def _entry(self, student_id: str, name: Optional[str] = None, roll: Optional[str] = None) -> dict:
+        entry = self.students.get(student_id)
+        if entry is None:
+            entry = {
+                "student_id": student_id,
+                "name": name,
+                "roll": roll,
+                "status": "absent",
+                "window": deque(),
+                "votes": 0,
+                "hits": 0,
+                "best_distance": None,
+                "last_distance": None,
+                "version": self.version,
+            }
+            self.students[student_id] = entry
+        else:
+            if name and not entry["name"]:
+                entry["name"] = name
+            if roll and not entry["roll"]:
+                entry["roll"] = roll
+        return entry
+
+    def ensure_roster(self, roster: Iterable[dict]):
+        """Register students that should show up as absent until seen: [{"id", "name", "roll"}]"""
+        for s in roster:
+            self._entry(s["id"], s.get("name"), s.get("roll"))
+
+    def add_frame(self, matches: List[dict]):
+        """
+        Fold one frame of results into the tally.
+
+        matches: [{"student_id", "distance", "status", "name", "roll"}] where
+        status is "present" or "uncertain"; unknown faces are not passed in.
+        """
+        self.frames += 1
+        self.version += 1
+        self.last_seen = time.monotonic()
+
+        # Keep only the best match per student in this frame
+        best: Dict[str, dict] = {}
+        for m in matches:
+            sid = m["student_id"]
+            if sid not in best or m["distance"] < best[sid]["distance"]:
+                best[sid] = m
+
+        for sid, m in best.items():
+            entry = self._entry(sid, m.get("name"), m.get("roll"))
+            entry["window"].append((self.frames, m["distance"], m["status"]))
+            entry["last_distance"] = round(m["distance"], 4)
+            if entry["best_distance"] is None or m["distance"] < entry["best_distance"]:
+                entry["best_distance"] = round(m["distance"], 4)
+            if m["status"] == "present":
+                entry["hits"] += 1
+            entry["version"] = self.version
+
+        # Re-evaluate students with votes in flight; others cannot change
+        oldest = self.frames - self.window
+        for entry in self.students.values():
+            window = entry["window"]
+            if not window:
+                continue
+            while window and window[0][0] <= oldest:
+                window.popleft()
+
+            votes = sum(1 for _, _, status in window if status == "present")
+            if entry["status"] == "present":
+                status = "present"
+            elif votes >= self.present_votes:
+                status = "present"
+            elif window:
+                status = "uncertain"
+            else:
+                status = "absent"
+
+            if status != entry["status"] or votes != entry["votes"]:
+                entry["status"] = status
+                entry["votes"] = votes
+                entry["version"] = self.version
+
+    def counts(self) -> Dict[str, int]:
+        out = {"present": 0, "uncertain": 0, "absent": 0}
+        for entry in self.students.values():
+            out[entry["status"]] += 1
+        return out
+
+    def delta(self, since: int = 0) -> dict:
+        """Roster entries changed after `since`; since=0 returns the full roster"""
+        self.last_seen = time.monotonic()
+        return {
+            "subject_id": self.subject_id,
+            "version": self.version,
+            "frames": self.frames,
+            "counts": self.counts(),
+            "students": [
+                {
+                    "student_id": e["student_id"],
+                    "name": e["name"],
+                    "roll": e["roll"],
+                    "status": e["status"],
+                    "votes": e["votes"],
+                    "hits": e["hits"],
+                    "best_distance": e["best_distance"],
+                    "last_distance": e["last_distance"],
+                }
+                for e in self.students.values()
+                if since <= 0 or e["version"] > since
+            ],
+        }
+
+
+class TallyLimitReached(Exception):
+    pass
+
+
+class TallyRegistry:
+    """Session id -> VoteTally, with idle sessions expired lazily"""
+
+    def __init__(self, ttl_seconds: float = SESSION_TTL_SECONDS, max_sessions: int = LIVE_TALLY_MAX_SESSIONS):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._tallies: Dict[str, VoteTally] = {}
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        for sid in [sid for sid, t in self._tallies.items() if t.last_seen < cutoff]:
+            del self._tallies[sid]
+
+    def get(self, session_id: str) -> Optional[VoteTally]:
+        self._evict_idle()
+        return self._tallies.get(session_id)
+
+    def get_or_create(self, session_id: str, subject_id: str, teacher_id: Optional[str] = None) -> VoteTally:
+        tally = self.get(session_id)
+        if tally is None:
+            if len(self._tallies) >= self.max_sessions:
+                raise TallyLimitReached(f"{len(self._tallies)} live sessions")
+            tally = VoteTally(subject_id, teacher_id=teacher_id)
+            self._tallies[session_id] = tally
+        return tally
+
+    def put(self, session_id: str, tally: VoteTally):
+        self._evict_idle()
+        self._tallies[session_id] = tally
+
+    def drop(self, session_id: str) -> Optional[VoteTally]:
+        return self._tallies.pop(session_id, None)
+
+
+tallies = TallyRegistry()
@@ -0,0 +1,44 @@
+"""
+Client IP resolution behind reverse proxies.
+
+Without TRUSTED_PROXIES the TCP peer is the client. When the peer is a
+trusted proxy, X-Forwarded-For is walked from the right (the hop the proxy
+itself appended) past every trusted proxy; the first other address is the
+client. Addresses left of it are client-supplied and never trusted.
+"""
+import ipaddress
+from typing import List, Optional
+
+from starlette.requests import Request
+
+from app.core.config import TRUSTED_PROXIES
+
+_networks = [ipaddress.ip_network(p, strict=False) for p in TRUSTED_PROXIES]
+
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _networks)
+
+
+def _forwarded_for(request: Request) -> List[str]:
+    hops = []
+    for header in request.headers.getlist("x-forwarded-for"):
+        hops.extend(h.strip() for h in header.split(",") if h.strip())
+    return hops
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """Address of the client that sent the request, or None if unknown"""
+    peer = request.client.host if request.client else None
+    if peer is None or not _trusted(peer):
+        return peer
+
+    for hop in reversed(_forwarded_for(request)):
+        if not _trusted(hop):
+            return hop
+    # Every hop is a proxy of ours (e.g. a health check)
+    return peer
@@ -0,0 +1,87 @@
+"""
+Attendance frame normalisation.
+
+Browsers send whatever the camera produced: often 1080p or larger, at high
+JPEG quality. Face detection gains nothing from that resolution (faces must
+cover min_face_area_ratio of the frame anyway), so before the ML hop each
+frame is downscaled to at most FRAME_MAX_SIDE px on its longer side and
+re-encoded at FRAME_JPEG_QUALITY. JPEG decoding uses Pillow's draft mode,
+which decodes straight at a reduced scale, so a large frame costs little CPU.
+
+Face boxes come back in the coordinates of the compact frame; scale_box()
+maps them back to the frame the client sent, which is what it draws on.
+"""
+import asyncio
+import base64
+import io
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import FRAME_JPEG_QUALITY, FRAME_MAX_SIDE, FRAME_PASSTHROUGH_BYTES
+
+ACCEPTED_FORMATS = {"JPEG", "PNG", "WEBP"}
+
+
+class FrameError(ValueError):
+    pass
+
+
+@dataclass
+class Frame:
+    data: bytes          # JPEG to forward
+    width: int
+    height: int
+    scale: float         # client frame size / forwarded frame size
+    source_bytes: int
+
+    @property
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("ascii")
+
+
+def _normalize(data: bytes, max_side: int, quality: int) -> Frame:
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.format not in ACCEPTED_FORMATS:
+            raise FrameError(f"Unsupported image format: {image.format}")
+
+        # Phone uploads may carry an EXIF rotation that browsers apply on display
+        orientation = image.getexif().get(0x0112, 1)
+        source_width, source_height = image.size
+        if orientation in (5, 6, 7, 8):
+            source_width, source_height = source_height, source_width
+
+        if (
+            image.format == "JPEG"
+            and orientation == 1
+            and max(image.size) <= max_side
+            and len(data) <= FRAME_PASSTHROUGH_BYTES
+        ):
+            return Frame(data, image.width, image.height, 1.0, len(data))
+
+        # thumbnail() keeps the aspect ratio and uses JPEG draft mode
+        image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=quality)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise FrameError("Invalid image") from e
+
+    return Frame(out.getvalue(), image.width, image.height, source_width / image.width, len(data))
+
+
+async def normalize_frame(data: bytes, max_side: int = FRAME_MAX_SIDE, quality: int = FRAME_JPEG_QUALITY) -> Frame:
+    """Compact JPEG for the ML service; decoding and encoding run off the event loop"""
+    return await asyncio.to_thread(_normalize, data, max_side, quality)
+
+
+def scale_box(location: dict, scale: float) -> dict:
+    """A face location from the compact frame, in client frame pixels"""
+    box = {k: location.get(k) for k in ("top", "right", "bottom", "left")}
+    if scale == 1.0:
+        return box
+    return {k: None if v is None else round(v * scale) for k, v in box.items()}
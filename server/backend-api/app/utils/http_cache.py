@@ -0,0 +1,103 @@
+"""
+Conditional GET helpers.
+
+Two kinds of ETag:
+- version_etag(): built from version inputs (updatedAt fields, change
+  counters) before the response is computed, so a matching If-None-Match
+  skips the work entirely;
+- json_with_etag(): hash of the serialized body, for responses without a
+  cheap version (the query still runs, the transfer is saved).
+
+Responses are `private, no-cache`: browsers keep them but revalidate on
+every use, which is what makes the 304s possible.
+"""
+import hashlib
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+CACHE_CONTROL = "private, no-cache"
+
+
+class HttpCacheStats:
+    def __init__(self):
+        self.conditional_requests = 0
+        self.not_modified = 0
+        self.full_responses = 0
+        self.bytes_uncompressed = 0
+        self.bytes_sent = 0
+        self.compressed_responses = 0
+
+    def stats(self) -> dict:
+        return {
+            "conditional_requests": self.conditional_requests,
+            "not_modified": self.not_modified,
+            "revalidation_hit_rate": (
+                round(self.not_modified / self.conditional_requests, 4)
+                if self.conditional_requests else None
+            ),
+            "full_responses": self.full_responses,
+            "bytes_uncompressed": self.bytes_uncompressed,
+            "bytes_sent": self.bytes_sent,
+            "compressed_responses": self.compressed_responses,
+            "compression_ratio": (
+                round(self.bytes_sent / self.bytes_uncompressed, 4)
+                if self.bytes_uncompressed else None
+            ),
+        }
+
+
+http_stats = HttpCacheStats()
+
+
+def version_etag(*parts) -> str:
+    """Weak ETag from version inputs (ids, timestamps, counters)"""
+    raw = "|".join(str(p) for p in parts).encode()
+    return f'W/"{hashlib.sha1(raw).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names `etag`"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    http_stats.conditional_requests += 1
+
+    # Weak comparison: W/"x" and "x" name the same representation
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    matched = header.strip() == "*" or etag.removeprefix("W/") in candidates
+    if matched:
+        http_stats.not_modified += 1
+    return matched
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def _serialize(payload) -> bytes:
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+
+
+def _json(body: bytes, etag: str) -> Response:
+    http_stats.full_responses += 1
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
+
+
+def json_response(payload, etag: str) -> Response:
+    """Serialize `payload` under a precomputed (version) ETag"""
+    return _json(_serialize(payload), etag)
+
+
+def json_with_etag(request: Request, payload) -> Response:
+    """Body-hash ETag; 304 without a body when the client already holds it"""
+    body = _serialize(payload)
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return _json(body, etag)
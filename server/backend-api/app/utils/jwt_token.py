@@ -1,6 +1,9 @@
+import hashlib
 import os
+import secrets
 import jwt
 from datetime import datetime, timedelta
+from typing import Optional
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
@@ -10,11 +13,23 @@ def create_jwt(user_id: str, role: str, email: str = None):
         "user_id": user_id,          # ✅ FIXED
         "role": role,
         "email": email,
+        "jti": secrets.token_hex(16),
         "iat": datetime.utcnow(),
         "exp": datetime.utcnow() + timedelta(days=30),
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
-def decode_jwt(token: str) -> dict:
-    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+def decode_jwt(token: str) -> Optional[dict]:
+    """Verified payload, or None if the token is malformed, forged or expired"""
+    if token.startswith("Bearer "):
+        token = token.split(" ", 1)[1]
+    try:
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+
+
+def token_id(token: str, payload: dict) -> str:
+    """jti claim; tokens issued before it existed are identified by their hash"""
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
@@ -0,0 +1,312 @@
+"""
+Load test of live attendance: N classrooms marking attendance at once.
+
+Each simulated teacher runs one session and posts a frame to
+/api/attendance/mark every --interval seconds (3 s, like the frontend), at a
+fixed rate: a slow answer makes the next frame late (counted), it never
+thins the load. Steps of growing N (--teachers 10,20,40) find the largest N
+that meets the SLO:
+
+    p95 latency <= --slo-ms (default: the frame interval)
+    error rate  <= --max-error-rate
+
+The Server-Timing header of every response (app/core/request_timing.py)
+splits its latency into Mongo, ML service, the rest of the app, and time
+outside the app (connection queueing, a saturated event loop, network). The
+stage with the largest share is reported as the bottleneck.
+
+Against a running server (real ML service, or benchmarks.fake_ml_service
+behind it), from server/backend-api:
+
+    python -m benchmarks.seed_loadtest --teachers 40 --drop
+    python -m benchmarks.attendance_load --base-url http://localhost:8000 --teachers 10,20,40
+
+In-process (the app on an in-memory Mongo via mongomock_motor, plus the fake
+ML service, in this process): a quick regression check of app-side cost, not
+a capacity figure. Mongo time is not measured in this mode.
+
+    python -m benchmarks.attendance_load --in-process --teachers 5,10 --duration 20
+
+Results go to benchmarks/results/ as JSON. --baseline <file> compares p95,
+p99, error rate and the sustainable N with an earlier run and exits with
+status 1 on a regression.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_FIXTURE = os.path.join(RESULTS_DIR, "loadtest_fixture.json")
+
+STAGES = ("mongo", "ml", "app_other", "outside_app")
+
+
+# ---------------- REQUEST SIDE ----------------
+def _frame(path: Optional[str], size: str) -> bytes:
+    """The image every teacher sends: a file, or a synthetic JPEG of `size`"""
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    try:
+        from PIL import Image, ImageFilter
+    except ImportError:
+        raise SystemExit("A synthetic frame needs Pillow; pass --image instead")
+    width, height = (int(v) for v in size.lower().split("x"))
+    image = Image.effect_noise((width, height), 48).filter(ImageFilter.GaussianBlur(1.5)).convert("RGB")
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=80)
+    return out.getvalue()
+
+
+def _server_timing(header: Optional[str]) -> Dict[str, float]:
+    """'app;dur=12.5, mongo;dur=3.1;desc="2 calls"' -> {"app": 12.5, "mongo": 3.1}"""
+    timings = {}
+    for metric in (header or "").split(","):
+        name, *params = [p.strip() for p in metric.split(";")]
+        for param in params:
+            if param.startswith("dur="):
+                try:
+                    timings[name] = float(param[4:])
+                except ValueError:
+                    pass
+    return timings
+
+
+async def _teacher(client: httpx.AsyncClient, teacher: dict, frame: bytes, args, start: float, samples: List[dict]):
+    # Multipart JPEG upload, like the frontend
+    fields = {"subject_id": teacher["subject_id"], "session_id": uuid.uuid4().hex}
+    files = {"image": ("frame.jpg", frame, "image/jpeg")}
+    headers = {"Authorization": f"Bearer {teacher['token']}"}
+    record_from = start + args.warmup
+    stop_at = record_from + args.duration
+
+    # Spread the sessions over one interval instead of firing in lockstep
+    scheduled = start + random.uniform(0, args.interval)
+    while scheduled < stop_at:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        sent = time.perf_counter()
+        try:
+            response = await client.post("/api/attendance/mark", data=fields, files=files, headers=headers)
+            status, timing = response.status_code, _server_timing(response.headers.get("server-timing"))
+        except httpx.HTTPError:
+            status, timing = None, {}
+        latency = time.perf_counter() - sent
+
+        if sent >= record_from:
+            samples.append({
+                "latency_ms": latency * 1000,
+                "status": status,
+                "late_ms": (sent - scheduled) * 1000,
+                "timing": timing,
+            })
+        scheduled += args.interval
+
+
+# ---------------- STATISTICS ----------------
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+
+def _stages(samples: List[dict]) -> Dict[str, float]:
+    """Mean milliseconds per stage, over responses that carried Server-Timing"""
+    totals = dict.fromkeys(STAGES, 0.0)
+    timed = [s for s in samples if "app" in s["timing"]]
+    for s in timed:
+        t = s["timing"]
+        mongo, ml, app = t.get("mongo", 0.0), t.get("ml", 0.0), t["app"]
+        totals["mongo"] += mongo
+        totals["ml"] += ml
+        totals["app_other"] += max(app - mongo - ml, 0.0)
+        totals["outside_app"] += max(s["latency_ms"] - app, 0.0)
+    return {k: round(v / len(timed), 1) for k, v in totals.items()} if timed else {}
+
+
+def _summarise(teachers: int, samples: List[dict], args) -> dict:
+    ok = [s for s in samples if s["status"] is not None and s["status"] < 400]
+    latencies = [s["latency_ms"] for s in ok]
+    errors = len(samples) - len(ok)
+    stages = _stages(ok)
+    total = sum(stages.values())
+
+    step = {
+        "teachers": teachers,
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / args.duration, 2),
+        "error_rate": round(errors / len(samples), 4) if samples else None,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "max_ms": round(max(latencies), 1) if latencies else None,
+        # Frames that went out more than 100 ms behind their schedule
+        "late_frame_rate": round(sum(s["late_ms"] > 100 for s in samples) / len(samples), 4) if samples else None,
+        "stages_ms": stages,
+        "bottleneck": max(stages, key=stages.get) if stages else None,
+        "bottleneck_share": round(max(stages.values()) / total, 3) if total else None,
+    }
+    step["meets_slo"] = bool(
+        samples
+        and step["p95_ms"] is not None
+        and step["p95_ms"] <= args.slo_ms
+        and step["error_rate"] <= args.max_error_rate
+    )
+    return step
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of `result` against `baseline`, as readable lines"""
+    regressions = []
+    earlier = {s["teachers"]: s for s in baseline.get("steps", [])}
+    for step in result["steps"]:
+        base = earlier.get(step["teachers"])
+        if base is None:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if base.get(key) and step.get(key) and step[key] > base[key] * (1 + tolerance):
+                regressions.append(f"teachers={step['teachers']} {key} {base[key]} -> {step[key]}")
+        if (step["error_rate"] or 0) > (base.get("error_rate") or 0) + 0.01:
+            regressions.append(f"teachers={step['teachers']} error_rate {base.get('error_rate')} -> {step['error_rate']}")
+    if result["sustainable_teachers"] < baseline.get("sustainable_teachers", 0):
+        regressions.append(
+            f"sustainable_teachers {baseline['sustainable_teachers']} -> {result['sustainable_teachers']}"
+        )
+    return regressions
+
+
+# ---------------- MODES ----------------
+async def _in_process(max_teachers: int, students: int):
+    """App + in-memory Mongo + fake ML in this process; returns (transport, fixture)"""
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/loadtest")
+    os.environ.setdefault("JWT_SECRET", "loadtest")
+    os.environ.setdefault("JWT_ALGORITHM", "HS256")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    try:
+        import mongomock_motor
+    except ImportError:
+        raise SystemExit("--in-process needs mongomock-motor (pip install mongomock-motor)")
+    import motor.motor_asyncio
+
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+
+    from app.db.mongo import db
+    from app.main import app
+    from app.services.ml_client import ml_client
+    from benchmarks.fake_ml_service import app as fake_ml
+    from benchmarks.seed_loadtest import seed
+
+    ml_client.client = httpx.AsyncClient(base_url="http://fake-ml", transport=httpx.ASGITransport(app=fake_ml))
+    fixture = await seed(db, max_teachers, students)
+    return httpx.ASGITransport(app=app), fixture
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Backend under test")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="Output of benchmarks.seed_loadtest")
+    parser.add_argument("--in-process", action="store_true", help="Run the app in this process (see above)")
+    parser.add_argument("--students", type=int, default=40, help="Students per classroom (--in-process)")
+    parser.add_argument("--teachers", default="10,20,40", help="Concurrent sessions, one step per value")
+    parser.add_argument("--interval", type=float, default=3.0, help="Seconds between frames of a session")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds per step")
+    parser.add_argument("--warmup", type=float, default=10, help="Unmeasured seconds before each step")
+    parser.add_argument("--image", help="Frame to send (default: synthetic JPEG)")
+    parser.add_argument("--frame-size", default="1280x720", help="Synthetic frame size")
+    parser.add_argument("--slo-ms", type=float, help="p95 target (default: the frame interval)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--server-cores", type=int, default=os.cpu_count(),
+                        help="CPU cores of the server, for sessions per core (default: this machine's)")
+    parser.add_argument("--label", default="", help="Free text stored with the results")
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/attendance_load-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed p95/p99 growth vs the baseline")
+    args = parser.parse_args()
+
+    steps = sorted({int(n) for n in args.teachers.split(",")})
+    if args.slo_ms is None:
+        args.slo_ms = args.interval * 1000
+
+    if args.in_process:
+        transport, fixture = await _in_process(steps[-1], args.students)
+        base_url = "http://loadtest"
+    else:
+        with open(args.fixture) as f:
+            fixture = json.load(f)
+        transport, base_url = None, args.base_url
+    if len(fixture["teachers"]) < steps[-1]:
+        raise SystemExit(f"fixture has {len(fixture['teachers'])} teachers, {steps[-1]} needed: seed more")
+
+    frame = _frame(args.image, args.frame_size)
+
+    result = {
+        "label": args.label,
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "mode": "in-process" if args.in_process else "http",
+        "base_url": base_url,
+        "host": platform.node(),
+        "server_cores": args.server_cores,
+        "config": {
+            "interval_s": args.interval,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "frame_bytes": len(frame),
+            "slo_p95_ms": args.slo_ms,
+            "max_error_rate": args.max_error_rate,
+        },
+        "steps": [],
+    }
+
+    for n in steps:
+        # One connection per teacher, like one browser per classroom
+        limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+        async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=30.0) as client:
+            samples: List[dict] = []
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                _teacher(client, teacher, frame, args, start, samples)
+                for teacher in fixture["teachers"][:n]
+            ))
+        step = _summarise(n, samples, args)
+        result["steps"].append(step)
+        print("  ".join(f"{k}={v}" for k, v in step.items()))
+
+    passing = [s["teachers"] for s in result["steps"] if s["meets_slo"]]
+    result["sustainable_teachers"] = max(passing) if passing else 0
+    result["sessions_per_core"] = (
+        round(result["sustainable_teachers"] / args.server_cores, 2) if args.server_cores else None
+    )
+    print(f"sustainable_teachers={result['sustainable_teachers']}  sessions_per_core={result['sessions_per_core']}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"attendance_load-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results -> {out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+        print("no regression against baseline")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
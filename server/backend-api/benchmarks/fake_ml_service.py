@@ -0,0 +1,86 @@
+"""
+Stand-in for the ML service, for load tests of the backend alone.
+
+Answers the endpoints /api/attendance/mark uses (detect-faces, batch-match)
+plus /health, with the real response shapes and a configurable, jittered
+delay instead of running dlib. Every frame "contains" FAKE_ML_FACES faces;
+batch-match recognises a share of them as the first candidates it was sent,
+so the backend's student lookups and vote tallies do their usual work.
+
+    uvicorn benchmarks.fake_ml_service:app --port 8001 --workers 4
+
+Settings (environment):
+    FAKE_ML_FACES            faces per frame (default 25)
+    FAKE_ML_UNKNOWN_RATIO    share of faces matching nobody (default 0.1)
+    FAKE_ML_DETECT_MS        detect-faces latency (default 300)
+    FAKE_ML_MATCH_MS         batch-match latency, per detected face (default 1)
+    FAKE_ML_JITTER           +- relative jitter on every delay (default 0.2)
+"""
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI
+
+FACES = int(os.getenv("FAKE_ML_FACES", "25"))
+UNKNOWN_RATIO = float(os.getenv("FAKE_ML_UNKNOWN_RATIO", "0.1"))
+DETECT_MS = float(os.getenv("FAKE_ML_DETECT_MS", "300"))
+MATCH_MS = float(os.getenv("FAKE_ML_MATCH_MS", "1"))
+JITTER = float(os.getenv("FAKE_ML_JITTER", "0.2"))
+
+EMBEDDING_SIZE = 128
+
+app = FastAPI(title="Fake ML Service")
+
+
+async def _delay(ms: float):
+    if ms > 0:
+        await asyncio.sleep(ms / 1000 * random.uniform(1 - JITTER, 1 + JITTER))
+
+
+def _face(i: int) -> dict:
+    top = 40 + (i // 8) * 90
+    left = 40 + (i % 8) * 90
+    return {
+        "embedding": [random.uniform(-0.2, 0.2) for _ in range(EMBEDDING_SIZE)],
+        "location": {"top": top, "right": left + 64, "bottom": top + 64, "left": left},
+        "face_area_ratio": 0.01,
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "service": "fake-ml-service", "version": "0", "models_loaded": True, "uptime_seconds": 0}
+
+
+@app.post("/api/ml/detect-faces")
+async def detect_faces(payload: dict):
+    await _delay(DETECT_MS)
+    faces = [_face(i) for i in range(FACES)]
+    return {
+        "success": True,
+        "faces": faces,
+        "count": len(faces),
+        "metadata": {"image_width": 1280, "image_height": 720, "model": payload.get("model", "hog")},
+    }
+
+
+@app.post("/api/ml/batch-match")
+async def batch_match(payload: dict):
+    faces = payload.get("detected_faces", [])
+    candidates = payload.get("candidate_embeddings", [])
+    await _delay(MATCH_MS * len(faces))
+
+    known = int(len(faces) * (1 - UNKNOWN_RATIO))
+    matches = []
+    for i in range(len(faces)):
+        if i < known and i < len(candidates):
+            matches.append({
+                "face_index": i,
+                "student_id": candidates[i]["student_id"],
+                "distance": round(random.uniform(0.30, 0.48), 4),
+                "status": "present",
+            })
+        else:
+            matches.append({"face_index": i, "student_id": None, "distance": 0.8, "status": "unknown"})
+    return {"success": True, "matches": matches}
@@ -0,0 +1,93 @@
+"""
+Event-loop lag under a login storm: bcrypt inline vs on the hashing pool.
+
+A ticker task sleeps TICK_MS at a time and records how late it wakes up,
+which is how long any other request (e.g. an attendance poll) would have
+waited for the loop. Meanwhile N concurrent "logins" each verify a password:
+
+- inline: pwd_context.verify() called directly in the coroutine (old code)
+- pool:   await password_hasher.verify_and_update() (current code)
+
+No database or server needed. From server/backend-api:
+
+    python -m benchmarks.login_event_loop_lag --logins 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# app.core.config reads these at import time
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/benchmark")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+from app.core.security import PasswordHasher, pwd_context  # noqa: E402
+from app.core.config import PASSWORD_HASH_WORKERS  # noqa: E402
+
+TICK_MS = 5
+
+
+async def _ticker(lags: list, stop: asyncio.Event):
+    interval = TICK_MS / 1000
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def _storm(mode: str, logins: int, password: str, hashed: str, hasher: PasswordHasher) -> dict:
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    await asyncio.sleep(0.05)
+
+    async def login():
+        if mode == "inline":
+            assert pwd_context.verify(password, hashed)
+        else:
+            valid, _ = await hasher.verify_and_update(password, hashed)
+            assert valid
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+
+    lags.sort()
+    pick = lambda q: round(lags[min(len(lags) - 1, int(q * len(lags)))], 1)
+    return {
+        "mode": mode,
+        "logins": logins,
+        "wall_s": round(elapsed, 2),
+        "ticks": len(lags),
+        "lag_p50_ms": pick(0.50),
+        "lag_p99_ms": pick(0.99),
+        "lag_max_ms": round(lags[-1], 1),
+        "lag_mean_ms": round(statistics.fmean(lags), 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50, help="Concurrent logins per run")
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS, help="Hashing pool size")
+    args = parser.parse_args()
+
+    password = "correct horse battery staple"
+    hashed = pwd_context.hash(password)
+    # max_waiting large enough that the storm is queued, not rejected
+    hasher = PasswordHasher(args.workers, max_waiting=args.logins)
+
+    try:
+        for mode in ("inline", "pool"):
+            result = await _storm(mode, args.logins, password, hashed, hasher)
+            print("  ".join(f"{k}={v}" for k, v in result.items()))
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
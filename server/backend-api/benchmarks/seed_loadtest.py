@@ -0,0 +1,125 @@
+"""
+Seed classrooms for the attendance load test.
+
+Creates N teachers, each with one subject of S verified students who have a
+face embedding, and writes a fixture file with each teacher's subject id
+and JWT for benchmarks.attendance_load. Every seeded document is tagged
+`loadtest: true`; --drop removes the previous run's documents first.
+
+Run against the database the server uses (same .env, same JWT_SECRET).
+From server/backend-api:
+
+    python -m benchmarks.seed_loadtest --teachers 100 --students 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+
+from bson import ObjectId
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "results", "loadtest_fixture.json")
+
+EMBEDDING_SIZE = 128
+
+SEEDED_COLLECTIONS = ("users", "teachers", "students", "subjects")
+
+
+async def drop(db):
+    for name in SEEDED_COLLECTIONS:
+        await db[name].delete_many({"loadtest": True})
+
+
+async def seed(db, teachers: int, students: int) -> dict:
+    """Insert the classrooms; returns the fixture"""
+    from app.utils.jwt_token import create_jwt
+
+    fixture = {"teachers": []}
+    for t in range(teachers):
+        teacher_id = ObjectId()
+        subject_id = ObjectId()
+        email = f"loadtest-teacher-{t}@example.com"
+
+        user_docs, student_docs, roster = [], [], []
+        for s in range(students):
+            user_id = ObjectId()
+            name = f"Student {t}-{s}"
+            user_docs.append({
+                "_id": user_id,
+                "name": name,
+                "email": f"loadtest-student-{t}-{s}@example.com",
+                "role": "student",
+                "roll": f"LT{t:04d}{s:03d}",
+                "is_verified": True,
+                "loadtest": True,
+            })
+            student_docs.append({
+                "userId": user_id,
+                "name": name,
+                "verified": True,
+                "face_embeddings": [[random.uniform(-0.2, 0.2) for _ in range(EMBEDDING_SIZE)]],
+                "subjects": [subject_id],
+                "loadtest": True,
+            })
+            roster.append({
+                "student_id": user_id,
+                "name": name,
+                "verified": True,
+                "attendance": {"present": 0, "absent": 0},
+            })
+
+        user_docs.append({
+            "_id": teacher_id,
+            "name": f"Teacher {t}",
+            "email": email,
+            "role": "teacher",
+            "is_verified": True,
+            "loadtest": True,
+        })
+        await db.users.insert_many(user_docs)
+        await db.students.insert_many(student_docs)
+        await db.teachers.insert_one({
+            "userId": teacher_id,
+            "name": f"Teacher {t}",
+            "profile": {"subjects": [subject_id]},
+            "loadtest": True,
+        })
+        await db.subjects.insert_one({
+            "_id": subject_id,
+            "name": f"Load Test {t}",
+            "code": f"LT{t:04d}",
+            "professor_ids": [teacher_id],
+            "students": roster,
+            "loadtest": True,
+        })
+
+        fixture["teachers"].append({
+            "subject_id": str(subject_id),
+            "token": create_jwt(user_id=str(teacher_id), role="teacher", email=email),
+        })
+    return fixture
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teachers", type=int, default=100, help="Classrooms to create")
+    parser.add_argument("--students", type=int, default=40, help="Enrolled students per classroom")
+    parser.add_argument("--drop", action="store_true", help="Remove previously seeded documents first")
+    parser.add_argument("--out", default=DEFAULT_FIXTURE, help="Fixture file for attendance_load")
+    args = parser.parse_args()
+
+    from app.db.mongo import db
+
+    if args.drop:
+        await drop(db)
+    fixture = await seed(db, args.teachers, args.students)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(fixture, f)
+    print(f"seeded {args.teachers} classrooms x {args.students} students -> {args.out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
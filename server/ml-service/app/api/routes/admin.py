@@ -0,0 +1,46 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.profiling import profiler
+from app.schemas.requests import ProfilingConfig
+
+
+async def require_admin(x_admin_token: str = Header(None)):
+    """Admin surface is off entirely unless ADMIN_TOKEN is configured"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiling")
+async def get_profiling():
+    """Profiler configuration and the most recent captured profiles"""
+    return profiler.status()
+
+
+@router.put("/profiling")
+async def configure_profiling(payload: ProfilingConfig):
+    """Toggle profiling: {"enabled": bool, "sample_rate": 0..1, "interval_ms": float} (all optional)"""
+    profiler.configure(
+        enabled=payload.enabled,
+        sample_rate=payload.sample_rate,
+        interval_ms=payload.interval_ms,
+    )
+    return profiler.status()
+
+
+@router.get("/profiling/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """Collapsed stacks, ready for flamegraph.pl / speedscope"""
+    collapsed = profiler.collapsed(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return collapsed
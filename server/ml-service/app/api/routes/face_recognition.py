@@ -8,12 +8,14 @@ import cv2
 
 from app.schemas.requests import (
     EncodeFaceRequest,
+    EncodeFacesRequest,
     DetectFacesRequest,
     MatchFacesRequest,
     BatchMatchRequest
 )
 from app.schemas.responses import (
     EncodeFaceResponse,
+    EncodeFacesResponse,
     DetectFacesResponse,
     MatchFacesResponse,
     BatchMatchResponse,
@@ -36,12 +38,12 @@ from app.core.constants import (
 from app.ml.face_detector import detect_faces
 from app.ml.face_encoder import get_face_embedding
 from app.ml.face_matcher import cosine_similarity
+from app.ml.pipeline import extract_faces
 
 router = APIRouter(prefix="/api/ml", tags=["ML"])
 
 
-@router.post("/encode-face", response_model=EncodeFaceResponse)
-async def encode_face(request: EncodeFaceRequest):
+def _encode_one(request: EncodeFaceRequest) -> EncodeFaceResponse:
     try:
         image_bytes = base64.b64decode(request.image_base64)
         image = Image.open(BytesIO(image_bytes)).convert("RGB")
@@ -79,6 +81,18 @@ async def encode_face(request: EncodeFaceRequest):
         return EncodeFaceResponse(success=False, error=str(e), error_code=ERROR_PROCESSING)
 
 
+@router.post("/encode-face", response_model=EncodeFaceResponse)
+async def encode_face(request: EncodeFaceRequest):
+    return _encode_one(request)
+
+
+# Plain def: a whole batch of CPU-bound encodes, keep it off the event loop
+@router.post("/encode-faces", response_model=EncodeFacesResponse)
+def encode_faces(request: EncodeFacesRequest):
+    """Encode several enrollment images in one round trip; one result per image"""
+    return EncodeFacesResponse(success=True, results=[_encode_one(item) for item in request.images])
+
+
 @router.post("/detect-faces", response_model=DetectFacesResponse)
 async def detect_faces_api(request: DetectFacesRequest):
     start = time.time()
@@ -88,23 +102,14 @@ async def detect_faces_api(request: DetectFacesRequest):
         image = Image.open(BytesIO(image_bytes)).convert("RGB")
         image_np = np.array(image)
 
-        faces = detect_faces(image_np)
         h, w, _ = image_np.shape
-        image_area = h * w
 
         detected = []
-        for top, right, bottom, left in faces:
-            face_area = (bottom - top) * (right - left)
-            if face_area / image_area < request.min_face_area_ratio:
-                continue
-
-            face_img = image_np[top:bottom, left:right]
-            embedding = get_face_embedding(face_img)
-
+        for (top, right, bottom, left), embedding, ratio in extract_faces(image_np, request.min_face_area_ratio):
             detected.append(DetectedFaceInfo(
                 embedding=embedding,
                 location=FaceLocation(top=top, right=right, bottom=bottom, left=left),
-                face_area_ratio=face_area / image_area
+                face_area_ratio=ratio
             ))
 
         return DetectFacesResponse(
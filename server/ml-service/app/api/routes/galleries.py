@@ -0,0 +1,143 @@
+from fastapi import APIRouter
+import base64
+from io import BytesIO
+import time
+import numpy as np
+from PIL import Image
+
+from app.schemas.requests import PublishGalleryRequest, GalleryMatchRequest, RecognizeRequest
+from app.schemas.responses import (
+    GalleryInfo,
+    GalleryResponse,
+    GalleryMatchResponse,
+    BatchMatchResult,
+    RecognizeResponse,
+    RecognizedFace,
+    FaceLocation,
+    DetectFacesMetadata,
+)
+from app.ml.face_matcher import best_matches
+from app.ml.gallery_store import gallery_store
+from app.ml.pipeline import extract_faces
+
+router = APIRouter(prefix="/api/ml/galleries", tags=["Galleries"])
+
+
+def match_against_gallery(gallery, embeddings, confident_threshold, uncertain_threshold):
+    """Match face embeddings against a loaded gallery snapshot"""
+    if not embeddings:
+        return []
+
+    best_index, best_score = best_matches(embeddings, gallery.matrix, gallery.offsets)
+
+    results = []
+    for idx, (student_idx, score) in enumerate(zip(best_index, best_score)):
+        distance = 1 - float(score)
+        if student_idx < 0 or distance >= uncertain_threshold:
+            status = "unknown"
+        elif distance < confident_threshold:
+            status = "present"
+        else:
+            status = "uncertain"
+
+        results.append(BatchMatchResult(
+            face_index=idx,
+            student_id=gallery.labels[student_idx] if status != "unknown" else None,
+            distance=distance,
+            status=status
+        ))
+    return results
+
+
+# Plain def: publishing writes the snapshot to disk, keep it off the event loop
+@router.put("/{gallery_id}", response_model=GalleryResponse)
+def publish_gallery(gallery_id: str, request: PublishGalleryRequest):
+    try:
+        manifest = gallery_store.publish(
+            gallery_id,
+            [c.model_dump() for c in request.candidate_embeddings],
+            fingerprint=request.fingerprint,
+        )
+        return GalleryResponse(success=True, gallery=GalleryInfo(**manifest))
+
+    except Exception as e:
+        return GalleryResponse(success=False, error=str(e))
+
+
+@router.get("/{gallery_id}", response_model=GalleryResponse)
+async def get_gallery(gallery_id: str):
+    try:
+        manifest = gallery_store.info(gallery_id)
+        if manifest is None:
+            return GalleryResponse(success=False, error="Gallery not found")
+        return GalleryResponse(success=True, gallery=GalleryInfo(**manifest))
+
+    except Exception as e:
+        return GalleryResponse(success=False, error=str(e))
+
+
+@router.post("/{gallery_id}/match", response_model=GalleryMatchResponse)
+async def match_gallery(gallery_id: str, request: GalleryMatchRequest):
+    try:
+        gallery = gallery_store.load(gallery_id, request.version)
+        if gallery is None:
+            return GalleryMatchResponse(success=False, error="Gallery version not found")
+
+        matches = match_against_gallery(
+            gallery,
+            [face.embedding for face in request.detected_faces],
+            request.confident_threshold,
+            request.uncertain_threshold,
+        )
+        return GalleryMatchResponse(success=True, version=gallery.version, matches=matches)
+
+    except Exception as e:
+        return GalleryMatchResponse(success=False, error=str(e))
+
+
+@router.post("/{gallery_id}/recognize", response_model=RecognizeResponse)
+async def recognize(gallery_id: str, request: RecognizeRequest):
+    """Detect faces and match them against the gallery without shipping embeddings back and forth"""
+    start = time.time()
+
+    try:
+        gallery = gallery_store.load(gallery_id, request.version)
+        if gallery is None:
+            return RecognizeResponse(success=False, error="Gallery version not found")
+
+        image_bytes = base64.b64decode(request.image_base64)
+        image = Image.open(BytesIO(image_bytes)).convert("RGB")
+        image_np = np.array(image)
+        h, w, _ = image_np.shape
+
+        faces = extract_faces(image_np, request.min_face_area_ratio)
+        matches = match_against_gallery(
+            gallery,
+            [embedding for _, embedding, _ in faces],
+            request.confident_threshold,
+            request.uncertain_threshold,
+        )
+
+        recognized = []
+        for ((top, right, bottom, left), _, ratio), match in zip(faces, matches):
+            recognized.append(RecognizedFace(
+                location=FaceLocation(top=top, right=right, bottom=bottom, left=left),
+                face_area_ratio=ratio,
+                student_id=match.student_id,
+                distance=match.distance,
+                status=match.status
+            ))
+
+        return RecognizeResponse(
+            success=True,
+            version=gallery.version,
+            faces=recognized,
+            count=len(recognized),
+            metadata=DetectFacesMetadata(
+                image_dimensions=[w, h],
+                processing_time_ms=(time.time() - start) * 1000
+            )
+        )
+
+    except Exception as e:
+        return RecognizeResponse(success=False, error=str(e))
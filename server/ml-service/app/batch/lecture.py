@@ -0,0 +1,263 @@
+"""
+Offline attendance for recorded lectures.
+
+Samples keyframes from a video file (or a folder of images), runs face
+detection + matching across a process pool and aggregates per-student
+presence votes over all frames. Results are written through the backend's
+/api/attendance/confirm endpoint, the same path the live MarkAttendance page
+uses.
+
+Usage:
+    python -m app.batch.lecture lecture.mp4 --subject <subject_id> \
+        --backend-url http://localhost:8000 --token <teacher JWT>
+
+    python -m app.batch.lecture ./frames/ --subject <id> --gallery roster.json --dry-run
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import httpx
+
+from app.core.constants import (
+    CONFIDENT_THRESHOLD,
+    DEFAULT_MIN_FACE_AREA_RATIO,
+    UNCERTAIN_THRESHOLD,
+)
+from app.ml.face_matcher import best_matches, build_gallery
+from app.ml.frame_sampler import iter_image_frames, iter_video_frames, select_keyframes
+
+# Per-process gallery, installed once by the pool initializer
+_gallery = None
+
+
+def _init_worker(labels, matrix, offsets):
+    global _gallery
+    _gallery = (labels, matrix, offsets)
+
+
+def _recognize_frame(frame, min_face_area_ratio, uncertain_threshold):
+    """Return {student_id: best distance} for faces matched in one frame"""
+    # Imported here so the detector is only built inside worker processes
+    from app.ml.pipeline import extract_faces
+
+    labels, matrix, offsets = _gallery
+    faces = extract_faces(frame, min_face_area_ratio)
+    if not faces or not labels:
+        return {}
+
+    best_index, best_score = best_matches([emb for _, emb, _ in faces], matrix, offsets)
+
+    seen = {}
+    for idx, score in zip(best_index, best_score):
+        distance = 1.0 - float(score)
+        if distance >= uncertain_threshold:
+            continue
+        student_id = labels[idx]
+        if student_id not in seen or distance < seen[student_id]:
+            seen[student_id] = distance
+    return seen
+
+
+def process_recording(
+    source: str,
+    candidates,
+    workers: int = None,
+    sample_fps: float = 2.0,
+    scene_threshold: float = 0.08,
+    min_gap_s: float = 1.0,
+    max_gap_s: float = 10.0,
+    min_votes: int = 2,
+    min_ratio: float = 0.2,
+    confident_threshold: float = CONFIDENT_THRESHOLD,
+    uncertain_threshold: float = UNCERTAIN_THRESHOLD,
+    min_face_area_ratio: float = DEFAULT_MIN_FACE_AREA_RATIO,
+):
+    """
+    Run the whole recording through the pool and return an attendance report.
+
+    A student is present when they were confidently matched in at least
+    max(min_votes, ceil(min_ratio * keyframes)) keyframes; uncertain when
+    confident + uncertain votes reach that bar; absent otherwise.
+    """
+    workers = workers or os.cpu_count() or 1
+    labels, matrix, offsets = build_gallery(candidates)
+
+    if os.path.isdir(source):
+        frames = iter_image_frames(source)
+    else:
+        frames = iter_video_frames(source, sample_fps=sample_fps)
+    keyframes = select_keyframes(frames, scene_threshold, min_gap_s, max_gap_s)
+
+    present_votes = Counter()
+    uncertain_votes = Counter()
+    best_distance = {}
+    processed = 0
+
+    def collect(future):
+        nonlocal processed
+        processed += 1
+        for student_id, distance in future.result().items():
+            if distance < confident_threshold:
+                present_votes[student_id] += 1
+            else:
+                uncertain_votes[student_id] += 1
+            best_distance[student_id] = min(distance, best_distance.get(student_id, 1.0))
+
+    # spawn: every worker builds its own detector instead of inheriting a forked one
+    ctx = multiprocessing.get_context("spawn")
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(labels, matrix, offsets),
+    ) as pool:
+        pending = set()
+        for _, frame in keyframes:
+            # Bound in-flight frames so memory stays flat on long recordings
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    collect(f)
+            pending.add(pool.submit(_recognize_frame, frame, min_face_area_ratio, uncertain_threshold))
+
+        for f in wait(pending).done:
+            collect(f)
+
+    elapsed = time.perf_counter() - started
+    required = max(min_votes, math.ceil(min_ratio * processed))
+
+    students = []
+    for student_id in labels:
+        present = present_votes[student_id]
+        uncertain = uncertain_votes[student_id]
+        if present >= required:
+            status = "present"
+        elif present + uncertain >= required:
+            status = "uncertain"
+        else:
+            status = "absent"
+
+        students.append({
+            "student_id": student_id,
+            "present_votes": present,
+            "uncertain_votes": uncertain,
+            "best_distance": round(best_distance[student_id], 4) if student_id in best_distance else None,
+            "status": status,
+        })
+
+    fps = processed / elapsed if elapsed else 0.0
+
+    return {
+        "source": source,
+        "keyframes": processed,
+        "required_votes": required,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(fps, 2),
+        "fps_per_core": round(fps / workers, 2),
+        "students": students,
+        "present": [s["student_id"] for s in students if s["status"] == "present"],
+        "uncertain": [s["student_id"] for s in students if s["status"] == "uncertain"],
+        "absent": [s["student_id"] for s in students if s["status"] == "absent"],
+    }
+
+
+def fetch_candidates(backend_url: str, token: str, subject_id: str):
+    """Load verified students with embeddings from the backend roster endpoint"""
+    resp = httpx.get(
+        f"{backend_url.rstrip('/')}/settings/subjects/{subject_id}/students",
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=60,
+    )
+    resp.raise_for_status()
+
+    return [
+        {"student_id": s["student_id"], "embeddings": s["embeddings"]}
+        for s in resp.json()
+        if s.get("verified") and s.get("embeddings")
+    ]
+
+
+def confirm_attendance(backend_url: str, token: str, subject_id: str, report):
+    """
+    Write results through /api/attendance/confirm.
+
+    Uncertain students are left unmarked so a teacher can review them.
+    """
+    resp = httpx.post(
+        f"{backend_url.rstrip('/')}/api/attendance/confirm",
+        headers={"Authorization": f"Bearer {token}"},
+        json={
+            "subject_id": subject_id,
+            "present_students": report["present"],
+            "absent_students": report["absent"],
+        },
+        timeout=60,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mark attendance from a recorded lecture")
+    parser.add_argument("source", help="Video file or folder of images")
+    parser.add_argument("--subject", required=True, help="Subject id")
+    parser.add_argument("--backend-url", default=os.getenv("BACKEND_URL", "http://localhost:8000"))
+    parser.add_argument("--token", default=os.getenv("BACKEND_TOKEN"), help="Teacher JWT")
+    parser.add_argument("--gallery", help="Candidate embeddings JSON (skips the backend roster fetch)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sample-fps", type=float, default=2.0)
+    parser.add_argument("--scene-threshold", type=float, default=0.08)
+    parser.add_argument("--min-gap", type=float, default=1.0)
+    parser.add_argument("--max-gap", type=float, default=10.0)
+    parser.add_argument("--min-votes", type=int, default=2)
+    parser.add_argument("--min-ratio", type=float, default=0.2)
+    parser.add_argument("--dry-run", action="store_true", help="Print the report without writing attendance")
+    args = parser.parse_args(argv)
+
+    if args.gallery:
+        with open(args.gallery) as fh:
+            candidates = json.load(fh)
+    else:
+        if not args.token:
+            parser.error("--token (or BACKEND_TOKEN) is required to fetch the roster")
+        candidates = fetch_candidates(args.backend_url, args.token, args.subject)
+
+    report = process_recording(
+        args.source,
+        candidates,
+        workers=args.workers,
+        sample_fps=args.sample_fps,
+        scene_threshold=args.scene_threshold,
+        min_gap_s=args.min_gap,
+        max_gap_s=args.max_gap,
+        min_votes=args.min_votes,
+        min_ratio=args.min_ratio,
+    )
+    report["subject_id"] = args.subject
+
+    if not args.dry_run:
+        if not args.token:
+            parser.error("--token (or BACKEND_TOKEN) is required to write attendance")
+        report["confirm"] = confirm_attendance(args.backend_url, args.token, args.subject, report)
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    print(
+        f"{report['keyframes']} keyframes in {report['elapsed_s']}s "
+        f"({report['fps']} fps, {report['fps_per_core']} fps/core on {report['workers']} workers)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
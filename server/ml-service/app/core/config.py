@@ -1,6 +1,6 @@
 import json
 from pydantic_settings import BaseSettings
-from typing import List, Union
+from typing import List, Optional, Union
 
 
 class Settings(BaseSettings):
@@ -14,11 +14,26 @@ class Settings(BaseSettings):
     NUM_JITTERS: int = 5
     MIN_FACE_AREA_RATIO: float = 0.04
 
+    # Gallery snapshots (memory-mapped .npy files shared by all workers)
+    GALLERY_DIR: str = "data/galleries"
+    GALLERY_KEEP_VERSIONS: int = 3
+    # A replaced version is kept at least this long, so live attendance
+    # sessions that pinned it keep working through later republishes
+    GALLERY_RETAIN_SECONDS: int = 6 * 3600
+
     # 👇 IMPORTANT FIX
     CORS_ORIGINS: Union[str, List[str]] = ["*"]
 
     LOG_LEVEL: str = "info"
 
+    # Admin endpoints (/admin/*) are disabled unless a token is configured
+    ADMIN_TOKEN: Optional[str] = None
+
+    # Sampling profiler (toggle at runtime via /admin/profiling)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.01
+    PROFILING_INTERVAL_MS: float = 5.0
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,167 @@
+"""
+Opt-in sampling profiler.
+
+When enabled, a configurable fraction of requests is profiled by a
+background thread that periodically snapshots the event-loop thread's Python
+stack. Results are kept in memory in collapsed-stack format
+("frame;frame;frame count" per line), which flamegraph.pl, speedscope and
+inferno read directly.
+
+Samples cover everything running on the event loop while the request is in
+flight, so concurrent requests show up in each other's profiles. Only one
+request is profiled at a time to bound overhead. When disabled the middleware
+is a single attribute check.
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Optional
+
+from app.core.config import settings
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    if path.startswith(_APP_ROOT):
+        path = os.path.relpath(path, _APP_ROOT)
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's stack every `interval` seconds into a Counter of collapsed stacks"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class Profiler:
+    def __init__(self, enabled: bool, sample_rate: float, interval_ms: float, max_profiles: int = 20):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.profiles = deque(maxlen=max_profiles)
+        self._busy = threading.Lock()
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        interval_ms: Optional[float] = None,
+    ):
+        if sample_rate is not None:
+            self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        if interval_ms is not None:
+            self.interval_ms = max(float(interval_ms), 0.5)
+        if enabled is not None:
+            self.enabled = bool(enabled)
+
+    def try_begin(self) -> Optional[StackSampler]:
+        """Start sampling the calling thread if this request is selected"""
+        if random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        sampler = StackSampler(threading.get_ident(), self.interval_ms / 1000)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler, method: str, path: str, status: Optional[int], duration: float):
+        try:
+            stacks = sampler.stop()
+        finally:
+            self._busy.release()
+
+        self.profiles.append({
+            "id": uuid.uuid4().hex[:12],
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(duration * 1000, 2),
+            "samples": sum(stacks.values()),
+            "captured_at": time.time(),
+            "stacks": stacks,
+        })
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval_ms,
+            "profiles": [
+                {k: v for k, v in p.items() if k != "stacks"}
+                for p in reversed(self.profiles)
+            ],
+        }
+
+    def collapsed(self, profile_id: str) -> Optional[str]:
+        for p in self.profiles:
+            if p["id"] == profile_id:
+                return "".join(f"{stack} {count}\n" for stack, count in p["stacks"].most_common())
+        return None
+
+
+profiler = Profiler(
+    settings.PROFILING_ENABLED,
+    settings.PROFILING_SAMPLE_RATE,
+    settings.PROFILING_INTERVAL_MS,
+)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; a no-op pass-through while profiling is disabled"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        sampler = profiler.try_begin()
+        if sampler is None:
+            return await self.app(scope, receive, send)
+
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.finish(sampler, scope["method"], scope["path"], status, time.perf_counter() - started)
@@ -10,6 +10,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.schemas.responses import HealthResponse
 from app.api.routes.face_recognition import router as ml_router
+from app.api.routes.galleries import router as galleries_router
+from app.api.routes.admin import router as admin_router
+from app.core.profiling import ProfilingMiddleware
+from app.ml.gallery_store import gallery_store
 
 # Track service start time
 service_start_time = time.time()
@@ -33,8 +37,18 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Outermost, so profiles cover the whole request
+    app.add_middleware(ProfilingMiddleware)
+    
     # Include routers
     app.include_router(ml_router)
+    app.include_router(galleries_router)
+    app.include_router(admin_router)
+
+    @app.on_event("startup")
+    async def _warm_galleries():
+        # Map existing snapshots so a restarted replica serves matches immediately
+        gallery_store.warm()
     
     return app
 
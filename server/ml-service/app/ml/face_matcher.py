@@ -4,3 +4,60 @@ def cosine_similarity(a, b):
     a = np.array(a)
     b = np.array(b)
     return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def build_gallery(candidates):
+    """
+    Flatten candidate embeddings into one matrix grouped by student.
+
+    candidates: [{"student_id": str, "embeddings": [[float], ...]}, ...]
+
+    Returns (labels, matrix, offsets): rows offsets[i]:offsets[i+1] of the
+    L2-normalised float32 matrix belong to labels[i].
+    """
+    labels = []
+    rows = []
+    offsets = [0]
+
+    for candidate in candidates:
+        embeddings = [e for e in candidate["embeddings"] if len(e)]
+        if not embeddings:
+            continue
+        labels.append(str(candidate["student_id"]))
+        rows.extend(embeddings)
+        offsets.append(offsets[-1] + len(embeddings))
+
+    if not rows:
+        return [], np.zeros((0, 0), dtype="float32"), np.array([0], dtype="int64")
+
+    matrix = np.asarray(rows, dtype="float32")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1, norms)
+    return labels, matrix, np.asarray(offsets, dtype="int64")
+
+
+def best_matches(queries, matrix, offsets):
+    """
+    Vectorised nearest-student search.
+
+    queries: (F, D) face embeddings. Returns (best_index, best_score) arrays of
+    length F, where best_index points into the gallery labels and best_score is
+    the cosine similarity of the closest embedding of that student.
+    """
+    queries = np.asarray(queries, dtype="float32")
+    if queries.ndim == 1:
+        queries = queries[None, :]
+
+    if len(queries) == 0 or len(offsets) < 2:
+        return np.full(len(queries), -1, dtype="int64"), np.full(len(queries), -1.0, dtype="float32")
+
+    norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    queries = queries / np.where(norms == 0, 1, norms)
+
+    # (F, R) similarities, then max over each student's block of rows
+    sims = queries @ np.asarray(matrix).T
+    per_student = np.maximum.reduceat(sims, offsets[:-1], axis=1)
+
+    best_index = per_student.argmax(axis=1)
+    best_score = per_student[np.arange(len(queries)), best_index]
+    return best_index, best_score
@@ -0,0 +1,101 @@
+import os
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+# Signature size used for scene-change detection (cheap, resolution independent)
+SIGNATURE_SIZE = (64, 36)
+
+
+def iter_video_frames(path: str, sample_fps: float = 2.0):
+    """
+    Yield (timestamp_s, frame_rgb) from a video file at roughly `sample_fps`.
+
+    Frames that fall between samples are skipped with grab() so they are never
+    decoded into full images.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, int(round(fps / sample_fps)))
+        index = 0
+
+        while True:
+            if index % step:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+
+            ok, frame = cap.read()
+            if not ok:
+                break
+
+            # The API decodes uploads with PIL (RGB); keep the same channel order
+            # so embeddings are comparable with the enrolled gallery.
+            yield index / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+    finally:
+        cap.release()
+
+
+def iter_image_frames(folder: str, seconds_per_image: float = 1.0):
+    """Yield (pseudo_timestamp_s, frame_rgb) for every image in a folder, sorted by name"""
+    names = sorted(
+        n for n in os.listdir(folder)
+        if os.path.splitext(n)[1].lower() in IMAGE_EXTENSIONS
+    )
+
+    for i, name in enumerate(names):
+        frame = cv2.imread(os.path.join(folder, name))
+        if frame is None:
+            continue
+        yield i * seconds_per_image, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def frame_signature(frame: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    return cv2.resize(gray, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype("float32")
+
+
+def select_keyframes(
+    frames,
+    scene_threshold: float = 0.08,
+    min_gap_s: float = 1.0,
+    max_gap_s: float = 10.0,
+):
+    """
+    Keep frames that differ enough from the last kept frame.
+
+    scene_threshold is the mean absolute pixel difference (0..1) between
+    downscaled grayscale signatures. A frame is also kept when max_gap_s has
+    passed without a keyframe, so a static classroom is still sampled
+    periodically, and never sooner than min_gap_s after the previous one.
+    """
+    last_sig = None
+    last_ts = None
+
+    for ts, frame in frames:
+        sig = frame_signature(frame)
+
+        if last_sig is None:
+            keep = True
+        else:
+            gap = ts - last_ts
+            if gap < min_gap_s:
+                keep = False
+            elif gap >= max_gap_s:
+                keep = True
+            else:
+                diff = float(np.mean(np.abs(sig - last_sig))) / 255.0
+                keep = diff >= scene_threshold
+
+        if keep:
+            last_sig = sig
+            last_ts = ts
+            yield ts, frame
@@ -0,0 +1,229 @@
+"""
+Versioned, memory-mapped gallery snapshots.
+
+Each subject gallery is written once as .npy files and opened by every worker
+with mmap, so N workers share a single copy through the page cache instead of
+holding N private copies. Layout:
+
+    <root>/<gallery_id>/manifest.json       current version (swapped atomically)
+    <root>/<gallery_id>/v<version>/matrix.npy
+    <root>/<gallery_id>/v<version>/offsets.npy
+    <root>/<gallery_id>/v<version>/labels.json
+
+Old versions are pruned after a publish, but only once they are beyond the
+newest `keep_versions` and were replaced more than `retain_seconds` ago:
+sessions pin a version for their lifetime. Workers that still have a pruned
+version mapped keep reading it safely.
+
+Manifest updates are a compare-and-swap under an exclusive flock on
+<root>/<gallery_id>/.lock, so concurrent publishers in any process can never
+roll the manifest back to an older version.
+"""
+import fcntl
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.ml.face_matcher import build_gallery
+
+_GALLERY_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+@dataclass
+class Gallery:
+    gallery_id: str
+    version: int
+    labels: List[str]
+    matrix: np.ndarray
+    offsets: np.ndarray
+
+
+def _write_json_atomic(path: str, data: dict):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            json.dump(data, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+@contextmanager
+def _locked(path: str):
+    with open(path, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+class GalleryStore:
+    def __init__(self, root: str, keep_versions: int = 3, retain_seconds: float = 0):
+        self.root = root
+        self.keep_versions = max(1, keep_versions)
+        self.retain_seconds = retain_seconds
+        # Per-process cache of opened snapshots and parsed manifests
+        self._galleries: Dict[Tuple[str, int], Gallery] = {}
+        self._manifests: Dict[str, Tuple[int, dict]] = {}
+
+    def _dir(self, gallery_id: str) -> str:
+        if not _GALLERY_ID_RE.match(gallery_id):
+            raise ValueError(f"Invalid gallery id: {gallery_id!r}")
+        return os.path.join(self.root, gallery_id)
+
+    def info(self, gallery_id: str) -> Optional[dict]:
+        """Current manifest, re-read only when the file changes"""
+        path = os.path.join(self._dir(gallery_id), "manifest.json")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        cached = self._manifests.get(gallery_id)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path) as fh:
+            manifest = json.load(fh)
+        self._manifests[gallery_id] = (mtime, manifest)
+        return manifest
+
+    def publish(self, gallery_id: str, candidates, fingerprint: Optional[str] = None) -> dict:
+        """Write a new snapshot and atomically make it the current version"""
+        gallery_dir = self._dir(gallery_id)
+        os.makedirs(gallery_dir, exist_ok=True)
+
+        labels, matrix, offsets = build_gallery(candidates)
+
+        current = self.info(gallery_id)
+        version = (current["version"] if current else 0) + 1
+        # mkdir is atomic: concurrent publishers each get their own version
+        while True:
+            version_dir = os.path.join(gallery_dir, f"v{version}")
+            try:
+                os.mkdir(version_dir)
+                break
+            except FileExistsError:
+                version += 1
+
+        np.save(os.path.join(version_dir, "matrix.npy"), matrix)
+        np.save(os.path.join(version_dir, "offsets.npy"), offsets)
+        with open(os.path.join(version_dir, "labels.json"), "w") as fh:
+            json.dump(labels, fh)
+
+        manifest = {
+            "gallery_id": gallery_id,
+            "version": version,
+            "fingerprint": fingerprint,
+            "students": len(labels),
+            "embeddings": int(matrix.shape[0]),
+            "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "created_at": time.time(),
+        }
+
+        # A slower concurrent publisher must not roll the manifest back:
+        # compare and swap with every other publisher locked out
+        manifest_path = os.path.join(gallery_dir, "manifest.json")
+        with _locked(os.path.join(gallery_dir, ".lock")):
+            latest = _read_json(manifest_path)
+            if latest is None or latest["version"] < version:
+                _write_json_atomic(manifest_path, manifest)
+            self._prune(gallery_id)
+        return manifest
+
+    def load(self, gallery_id: str, version: Optional[int] = None) -> Optional[Gallery]:
+        """Open a snapshot (current version by default) as read-only memory maps"""
+        if version is None:
+            manifest = self.info(gallery_id)
+            if manifest is None:
+                return None
+            version = manifest["version"]
+
+        key = (gallery_id, version)
+        gallery = self._galleries.get(key)
+        if gallery is not None:
+            return gallery
+
+        version_dir = os.path.join(self._dir(gallery_id), f"v{version}")
+        if not os.path.isdir(version_dir):
+            return None
+
+        with open(os.path.join(version_dir, "labels.json")) as fh:
+            labels = json.load(fh)
+
+        matrix_path = os.path.join(version_dir, "matrix.npy")
+        # np.load refuses to mmap zero-sized arrays
+        if labels:
+            matrix = np.load(matrix_path, mmap_mode="r")
+        else:
+            matrix = np.load(matrix_path)
+        offsets = np.load(os.path.join(version_dir, "offsets.npy"))
+
+        gallery = Gallery(gallery_id, version, labels, matrix, offsets)
+        self._galleries[key] = gallery
+        self._forget_old(gallery_id)
+        return gallery
+
+    def warm(self) -> int:
+        """Map the current version of every gallery; returns how many were opened"""
+        if not os.path.isdir(self.root):
+            return 0
+
+        opened = 0
+        for gallery_id in os.listdir(self.root):
+            if not _GALLERY_ID_RE.match(gallery_id):
+                continue
+            if self.load(gallery_id) is not None:
+                opened += 1
+        return opened
+
+    def _versions(self, gallery_id: str) -> List[int]:
+        versions = []
+        for name in os.listdir(self._dir(gallery_id)):
+            if name.startswith("v") and name[1:].isdigit():
+                versions.append(int(name[1:]))
+        return sorted(versions)
+
+    def _prune(self, gallery_id: str):
+        """Drop versions beyond the newest keep_versions that were replaced over retain_seconds ago"""
+        gallery_dir = self._dir(gallery_id)
+        versions = self._versions(gallery_id)
+        cutoff = time.time() - self.retain_seconds
+        for version, successor in zip(versions[:-self.keep_versions], versions[1:]):
+            # A version stops being handed out when its successor is created
+            try:
+                replaced_at = os.stat(os.path.join(gallery_dir, f"v{successor}")).st_mtime
+            except FileNotFoundError:
+                continue
+            if replaced_at < cutoff:
+                shutil.rmtree(os.path.join(gallery_dir, f"v{version}"), ignore_errors=True)
+
+    def _forget_old(self, gallery_id: str):
+        versions = sorted(v for g, v in self._galleries if g == gallery_id)
+        for version in versions[:-self.keep_versions]:
+            del self._galleries[(gallery_id, version)]
+
+
+gallery_store = GalleryStore(settings.GALLERY_DIR, settings.GALLERY_KEEP_VERSIONS, settings.GALLERY_RETAIN_SECONDS)
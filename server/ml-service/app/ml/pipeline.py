@@ -0,0 +1,28 @@
+import numpy as np
+
+from app.ml.face_detector import detect_faces
+from app.ml.face_encoder import get_face_embedding
+
+
+def extract_faces(image_np: np.ndarray, min_face_area_ratio: float):
+    """
+    Detect every face in an RGB image and embed the ones that are large enough.
+
+    Returns a list of (location, embedding, face_area_ratio) where location is
+    the (top, right, bottom, left) tuple produced by the detector.
+    """
+    faces = detect_faces(image_np)
+    h, w, _ = image_np.shape
+    image_area = h * w
+
+    extracted = []
+    for top, right, bottom, left in faces:
+        face_area = (bottom - top) * (right - left)
+        if face_area / image_area < min_face_area_ratio:
+            continue
+
+        face_img = image_np[top:bottom, left:right]
+        embedding = get_face_embedding(face_img)
+        extracted.append(((top, right, bottom, left), embedding, face_area / image_area))
+
+    return extracted
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, StrictBool
 from typing import Optional, List
 
 
@@ -10,6 +10,11 @@ class EncodeFaceRequest(BaseModel):
     num_jitters: int = Field(default=5, description="Number of times to re-sample face for encoding")
 
 
+class EncodeFacesRequest(BaseModel):
+    """Request to encode one face in each of several images"""
+    images: List[EncodeFaceRequest] = Field(..., max_length=32, description="Images to encode, each with its own options")
+
+
 class DetectFacesRequest(BaseModel):
     """Request to detect multiple faces from an image"""
     image_base64: str = Field(..., description="Base64 encoded image string")
@@ -43,3 +48,33 @@ class BatchMatchRequest(BaseModel):
     candidate_embeddings: List[CandidateEmbedding] = Field(..., description="Candidate students with embeddings")
     confident_threshold: float = Field(default=0.50, description="Threshold for confident match")
     uncertain_threshold: float = Field(default=0.60, description="Threshold for uncertain match")
+
+
+class PublishGalleryRequest(BaseModel):
+    """Request to publish a new gallery snapshot"""
+    candidate_embeddings: List[CandidateEmbedding] = Field(..., description="Candidate students with embeddings")
+    fingerprint: Optional[str] = Field(default=None, description="Caller-side content fingerprint, echoed back in gallery info")
+
+
+class GalleryMatchRequest(BaseModel):
+    """Request to match detected faces against a stored gallery"""
+    detected_faces: List[DetectedFace] = Field(..., description="List of detected faces to match")
+    version: Optional[int] = Field(default=None, description="Snapshot version to use; latest when omitted")
+    confident_threshold: float = Field(default=0.50, description="Distance below which a match is confident")
+    uncertain_threshold: float = Field(default=0.60, description="Distance below which a match is uncertain")
+
+
+class RecognizeRequest(BaseModel):
+    """Request to detect faces in an image and match them against a stored gallery in one call"""
+    image_base64: str = Field(..., description="Base64 encoded image string")
+    version: Optional[int] = Field(default=None, description="Snapshot version to use; latest when omitted")
+    min_face_area_ratio: float = Field(default=0.04, description="Minimum face area ratio")
+    confident_threshold: float = Field(default=0.50, description="Distance below which a match is confident")
+    uncertain_threshold: float = Field(default=0.60, description="Distance below which a match is uncertain")
+
+
+class ProfilingConfig(BaseModel):
+    """PUT /admin/profiling; omitted fields keep their current value"""
+    enabled: Optional[StrictBool] = Field(default=None, description="Turn sampling on or off")
+    sample_rate: Optional[float] = Field(default=None, ge=0, le=1, description="Share of requests profiled")
+    interval_ms: Optional[float] = Field(default=None, gt=0, description="Stack sampling interval")
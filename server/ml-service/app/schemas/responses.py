@@ -26,6 +26,13 @@ class EncodeFaceResponse(BaseModel):
     error_code: Optional[str] = None
 
 
+class EncodeFacesResponse(BaseModel):
+    """Response from batch encode endpoint; results are in request order"""
+    success: bool
+    results: List[EncodeFaceResponse] = []
+    error: Optional[str] = None
+
+
 class DetectedFaceInfo(BaseModel):
     """Information about a detected face"""
     embedding: List[float]
@@ -75,7 +82,7 @@ class BatchMatchResult(BaseModel):
     face_index: int
     student_id: Optional[str] = None
     distance: float
-    status: str  # "present", "unknown"
+    status: str  # "present", "uncertain" (gallery match only), "unknown"
 
 
 class BatchMatchResponse(BaseModel):
@@ -92,3 +99,48 @@ class HealthResponse(BaseModel):
     version: str
     models_loaded: bool
     uptime_seconds: float
+
+
+class GalleryInfo(BaseModel):
+    """Gallery snapshot manifest"""
+    gallery_id: str
+    version: int
+    fingerprint: Optional[str] = None
+    students: int
+    embeddings: int
+    dim: int
+    created_at: float
+
+
+class GalleryResponse(BaseModel):
+    """Response from gallery publish/info endpoints"""
+    success: bool
+    gallery: Optional[GalleryInfo] = None
+    error: Optional[str] = None
+
+
+class GalleryMatchResponse(BaseModel):
+    """Response from gallery match endpoint"""
+    success: bool
+    version: Optional[int] = None
+    matches: List[BatchMatchResult] = []
+    error: Optional[str] = None
+
+
+class RecognizedFace(BaseModel):
+    """A detected face with its gallery match"""
+    location: FaceLocation
+    face_area_ratio: float
+    student_id: Optional[str] = None
+    distance: float
+    status: str  # "present", "uncertain", "unknown"
+
+
+class RecognizeResponse(BaseModel):
+    """Response from gallery recognize endpoint"""
+    success: bool
+    version: Optional[int] = None
+    faces: List[RecognizedFace] = []
+    count: int = 0
+    metadata: Optional[DetectFacesMetadata] = None
+    error: Optional[str] = None